@@ -1,15 +1,23 @@
 import logging
-from collections import deque
+import math
 from dataclasses import dataclass
 from typing import Any, Dict, List, Optional, Tuple
 from datetime import datetime, timezone
 
-from indicators import ADX, MACD, SuperTrend
+import numpy as np
+
+from indicators import ADX, MACD, SuperTrend, update_st_macd_adx
+from indicators_njit import trail_stop_level
 from strategy_agent import AgentAction, AgentInputs, STAdxMacdAgent
 from time_utils import iso_to_ist_iso
 
 logger = logging.getLogger(__name__)
 
+# Entry actions -> option side; any other action is not an entry
+_ENTER_SIDE = {AgentAction.ENTER_CE: "CE", AgentAction.ENTER_PE: "PE"}
+
+_EXIT_REASON_BY_MODE = {"agent": "Agent Exit", "supertrend": "Flip Exit"}
+
 
 @dataclass
 class BacktestTrade:
@@ -30,12 +38,11 @@ def _calc_points_pnl(side: str, entry: float, exit_: float) -> float:
 
 
 def _equity_max_drawdown(equity: List[float]) -> float:
-    running_max = float("-inf")
-    max_dd = 0.0
-    for x in equity:
-        running_max = max(running_max, x)
-        max_dd = max(max_dd, running_max - x)
-    return max_dd
+    if not equity:
+        return 0.0
+    curve = np.asarray(equity, dtype=np.float64)
+    # Peak-to-trough in one pass: running peak minus current equity
+    return max(0.0, float((np.maximum.accumulate(curve) - curve).max()))
 
 
 def _parse_iso_to_dt(value: str) -> Optional[datetime]:
@@ -153,11 +160,25 @@ def run_backtest(
 
     agent = STAdxMacdAgent(adx_min=float(agent_adx_min), wave_reset_macd_abs=float(agent_wave_reset_macd_abs))
     agent.reset_session("BACKTEST")
+    inputs = AgentInputs(
+        timestamp="",
+        open=0.0,
+        high=0.0,
+        low=0.0,
+        close=0.0,
+        supertrend_direction=None,
+        supertrend_flipped=False,
+        adx_value=None,
+        macd_current=None,
+        macd_previous=None,
+        in_position=False,
+        current_position_side=None,
+    )
 
     last_st_dir: Optional[int] = None
     last_macd: Optional[float] = None
-    last_hist: Optional[float] = None
-    hist_window = deque(maxlen=3)
+    # Last three histograms, oldest first; NaN until filled (fails every comparison)
+    h1 = h2 = h3 = math.nan
 
     position_side: Optional[str] = None
     entry_time: Optional[str] = None
@@ -176,22 +197,19 @@ def run_backtest(
         low = float(row["low"])
         close = float(row["close"])
 
-        st_val, st_signal = st.add_candle(high, low, close)
-        macd_val, _ = macd.add_candle(high, low, close)
-        adx_val, _ = adx.add_candle(high, low, close)
-        hist_val = getattr(macd, "last_histogram", None)
+        (st_val, st_signal), (macd_val, _), (adx_val, _) = update_st_macd_adx(st, macd, adx, high, low, close)
+        hist_val = macd.last_histogram
 
         # Need enough warmup for indicators
         if st_val is None or macd_val is None or adx_val is None:
             last_macd = macd_val if macd_val is not None else last_macd
             last_st_dir = st.direction if st_val is not None else last_st_dir
-            if isinstance(hist_val, (int, float)):
-                last_hist = float(hist_val)
-                hist_window.append(float(hist_val))
+            if hist_val is not None:
+                h1, h2, h3 = h2, h3, hist_val
             continue
 
-        if isinstance(hist_val, (int, float)):
-            hist_window.append(float(hist_val))
+        # Past warmup every value is a float: MACD sets its histogram with the line
+        h1, h2, h3 = h2, h3, hist_val
 
         st_dir = st.direction
         supertrend_flipped = bool(last_st_dir in (1, -1) and st_dir in (1, -1) and last_st_dir != st_dir)
@@ -214,15 +232,12 @@ def run_backtest(
                 # SuperTrend-based trailing stop (spec):
                 # - initial SL = SuperTrend value at entry
                 # - trail to SuperTrend value each candle (never loosens)
-                if isinstance(st_val, (int, float)):
-                    st_line = float(st_val)
-                    if st_trailing_stop is None:
-                        st_trailing_stop = st_line
-                    else:
-                        if position_side == "CE":
-                            st_trailing_stop = max(float(st_trailing_stop), st_line)
-                        else:
-                            st_trailing_stop = min(float(st_trailing_stop), st_line)
+                if st_trailing_stop is None:
+                    st_trailing_stop = st_val
+                elif position_side == "CE":
+                    st_trailing_stop = max(st_trailing_stop, st_val)
+                else:
+                    st_trailing_stop = min(st_trailing_stop, st_val)
 
                 if st_trailing_stop is not None:
                     if position_side == "CE" and low <= st_trailing_stop:
@@ -258,32 +273,22 @@ def run_backtest(
                     best_favorable_points = 0.0
                     st_trailing_stop = None
 
-                    last_macd = float(macd_val)
-                    last_hist = float(hist_val) if isinstance(hist_val, (int, float)) else last_hist
+                    last_macd = macd_val
                     last_st_dir = st_dir
                     continue
 
             elif position_side == "CE":
                 best_favorable_points = max(best_favorable_points, high - entry_price)
 
-                # Stop level(s)
-                initial_stop_level = (entry_price - stoploss_points) if stoploss_points > 0 else None
-
-                trailing_level = None
-                if trail_start > 0 and trail_step_points > 0 and best_favorable_points >= trail_start:
-                    steps = int((best_favorable_points - trail_start) / trail_step_points)
-                    trailing_level = entry_price + (steps * trail_step_points)
-
-                effective_stop = None
-                if initial_stop_level is not None and trailing_level is not None:
-                    effective_stop = max(initial_stop_level, trailing_level)
-                else:
-                    effective_stop = trailing_level if trailing_level is not None else initial_stop_level
+                # Stop level(s): initial SL and/or step trailing, whichever is tighter
+                effective_stop, is_trailing = trail_stop_level(
+                    1.0, entry_price, best_favorable_points, stoploss_points, trail_start, trail_step_points
+                )
 
                 # Worst-case priority: stop first, then target
-                if effective_stop is not None and low <= effective_stop:
+                if not math.isnan(effective_stop) and low <= effective_stop:
                     exit_price = float(effective_stop)
-                    exit_reason = "Trailing SL Hit" if trailing_level is not None and effective_stop == trailing_level else "Stoploss Hit"
+                    exit_reason = "Trailing SL Hit" if is_trailing else "Stoploss Hit"
                 elif tgt_points > 0 and high >= (entry_price + tgt_points):
                     exit_price = float(entry_price + tgt_points)
                     exit_reason = "Target Hit"
@@ -291,22 +296,13 @@ def run_backtest(
             elif position_side == "PE":
                 best_favorable_points = max(best_favorable_points, entry_price - low)
 
-                initial_stop_level = (entry_price + stoploss_points) if stoploss_points > 0 else None
-
-                trailing_level = None
-                if trail_start > 0 and trail_step_points > 0 and best_favorable_points >= trail_start:
-                    steps = int((best_favorable_points - trail_start) / trail_step_points)
-                    trailing_level = entry_price - (steps * trail_step_points)
-
-                effective_stop = None
-                if initial_stop_level is not None and trailing_level is not None:
-                    effective_stop = min(initial_stop_level, trailing_level)
-                else:
-                    effective_stop = trailing_level if trailing_level is not None else initial_stop_level
+                effective_stop, is_trailing = trail_stop_level(
+                    -1.0, entry_price, best_favorable_points, stoploss_points, trail_start, trail_step_points
+                )
 
-                if effective_stop is not None and high >= effective_stop:
+                if not math.isnan(effective_stop) and high >= effective_stop:
                     exit_price = float(effective_stop)
-                    exit_reason = "Trailing SL Hit" if trailing_level is not None and effective_stop == trailing_level else "Stoploss Hit"
+                    exit_reason = "Trailing SL Hit" if is_trailing else "Stoploss Hit"
                 elif tgt_points > 0 and low <= (entry_price - tgt_points):
                     exit_price = float(entry_price - tgt_points)
                     exit_reason = "Target Hit"
@@ -327,27 +323,25 @@ def run_backtest(
                 best_favorable_points = 0.0
                 st_trailing_stop = None
 
-                last_macd = float(macd_val)
-                last_hist = float(hist_val) if isinstance(hist_val, (int, float)) else last_hist
+                last_macd = macd_val
                 last_st_dir = st_dir
                 continue
 
         action = AgentAction.HOLD
         if mode == "agent":
-            inputs = AgentInputs(
-                timestamp=ts,
-                open=float(row.get("open", close)),
-                high=high,
-                low=low,
-                close=close,
-                supertrend_direction=st_dir if st_dir in (1, -1) else None,
-                supertrend_flipped=supertrend_flipped,
-                adx_value=float(adx_val) if isinstance(adx_val, (int, float)) else None,
-                macd_current=float(macd_val) if isinstance(macd_val, (int, float)) else None,
-                macd_previous=float(last_macd) if isinstance(last_macd, (int, float)) else None,
-                in_position=bool(position_side),
-                current_position_side=position_side,
-            )
+            # Reuse one AgentInputs instance across bars
+            inputs.timestamp = ts
+            inputs.open = float(row.get("open", close))
+            inputs.high = high
+            inputs.low = low
+            inputs.close = close
+            inputs.supertrend_direction = st_dir if st_dir in (1, -1) else None
+            inputs.supertrend_flipped = supertrend_flipped
+            inputs.adx_value = adx_val
+            inputs.macd_current = macd_val
+            inputs.macd_previous = last_macd
+            inputs.in_position = bool(position_side)
+            inputs.current_position_side = position_side
             action = agent.decide(inputs)
         elif mode == "supertrend":
             # SuperTrend flip baseline
@@ -366,25 +360,15 @@ def run_backtest(
             # Bearish entry (PE): ST SELL + hist in (-1.25, -0.5) + last 3 hist decreasing
             # Exit:
             # - Exit: SuperTrend reversal (risk exits handled separately)
-            h1 = h2 = h3 = None
-            if len(hist_window) >= 3:
-                h1, h2, h3 = list(hist_window)[-3:]
-
             if not position_side:
                 if (
                     st_dir == 1
-                    and isinstance(h1, (int, float))
-                    and isinstance(h2, (int, float))
-                    and isinstance(h3, (int, float))
                     and (h1 < h2 < h3)
                     and (h3 > 0.5 and h3 < 1.25)
                 ):
                     action = AgentAction.ENTER_CE
                 elif (
                     st_dir == -1
-                    and isinstance(h1, (int, float))
-                    and isinstance(h2, (int, float))
-                    and isinstance(h3, (int, float))
                     and (h1 > h2 > h3)
                     and (h3 < -0.5 and h3 > -1.25)
                 ):
@@ -398,12 +382,13 @@ def run_backtest(
                         action = AgentAction.EXIT
 
         # Apply action at close
-        if action in (AgentAction.ENTER_CE, AgentAction.ENTER_PE) and not position_side:
-            position_side = "CE" if action == AgentAction.ENTER_CE else "PE"
+        enter_side = _ENTER_SIDE.get(action)
+        if enter_side is not None and not position_side:
+            position_side = enter_side
             entry_time = ts
             entry_price = close
             best_favorable_points = 0.0
-            st_trailing_stop = float(st_val) if mode == "st_macd_hist" and isinstance(st_val, (int, float)) else None
+            st_trailing_stop = st_val if mode == "st_macd_hist" else None
             trades.append(
                 BacktestTrade(
                     side=position_side,
@@ -426,12 +411,7 @@ def run_backtest(
             trades[-1].exit_time = ts
             trades[-1].exit_price = exit_price
             trades[-1].pnl_points = pnl
-            if mode == "agent":
-                trades[-1].exit_reason = "Agent Exit"
-            elif mode == "supertrend":
-                trades[-1].exit_reason = "Flip Exit"
-            else:
-                trades[-1].exit_reason = "Strategy Exit"
+            trades[-1].exit_reason = _EXIT_REASON_BY_MODE.get(mode, "Strategy Exit")
 
             position_side = None
             entry_time = None
@@ -439,8 +419,7 @@ def run_backtest(
             best_favorable_points = 0.0
             st_trailing_stop = None
 
-        last_macd = float(macd_val)
-        last_hist = float(hist_val) if isinstance(hist_val, (int, float)) else last_hist
+        last_macd = macd_val
         last_st_dir = st_dir
 
     if close_open_position_at_end and position_side and entry_price is not None and candles:
@@ -460,13 +439,14 @@ def run_backtest(
 
     closed_trades = [t for t in trades if t.pnl_points is not None]
     total_trades = len(closed_trades)
-    total_pnl = sum(t.pnl_points or 0.0 for t in closed_trades)
-    wins = [t for t in closed_trades if (t.pnl_points or 0.0) > 0]
-    losses = [t for t in closed_trades if (t.pnl_points or 0.0) < 0]
-
-    win_rate = (len(wins) / total_trades * 100.0) if total_trades else 0.0
-    avg_win = (sum(t.pnl_points for t in wins) / len(wins)) if wins else 0.0
-    avg_loss = (abs(sum(t.pnl_points for t in losses)) / len(losses)) if losses else 0.0
+    pnl = np.fromiter((t.pnl_points for t in closed_trades), dtype=np.float64, count=total_trades)
+    total_pnl = float(pnl.sum())
+    wins = pnl[pnl > 0]
+    losses = pnl[pnl < 0]
+
+    win_rate = (wins.size / total_trades * 100.0) if total_trades else 0.0
+    avg_win = float(wins.mean()) if wins.size else 0.0
+    avg_loss = float(abs(losses.sum()) / losses.size) if losses.size else 0.0
     max_dd = _equity_max_drawdown(equity_curve)
 
     return {
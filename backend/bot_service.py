@@ -5,6 +5,7 @@ import time
 from config import bot_state, config
 from indices import get_index_config, get_available_indices
 from database import save_config, load_config
+from utils import round_to_tick
 
 logger = logging.getLogger(__name__)
 
@@ -59,8 +60,8 @@ def get_bot_status() -> dict:
     logger.debug(f"[STATUS] Market check: Weekday={is_weekday}, Time={ist.strftime('%H:%M')}, Open={market_is_open}")
     
     return {
-        "is_running": bot_state['is_running'],
-        "mode": bot_state['mode'],
+        "is_running": bot_state.is_running,
+        "mode": bot_state.mode,
         "market_status": "open" if market_is_open else "closed",
         "market_details": {
             "is_weekday": is_weekday,
@@ -69,7 +70,7 @@ def get_bot_status() -> dict:
             "allow_weekend_trading": bool(config.get('allow_weekend_trading', False)),
         },
         "connection_status": "connected" if config['dhan_access_token'] else "disconnected",
-        "daily_max_loss_triggered": bot_state['daily_max_loss_triggered'],
+        "daily_max_loss_triggered": bot_state.daily_max_loss_triggered,
         "selected_index": config['selected_index'],
         "candle_interval": config['candle_interval']
     }
@@ -81,37 +82,37 @@ def get_market_data() -> dict:
     from datetime import datetime, timezone
     
     return {
-        "ltp": bot_state['index_ltp'],
-        "supertrend_signal": bot_state['last_supertrend_signal'],
-        "supertrend_value": bot_state['supertrend_value'],
-        "macd_value": bot_state['macd_value'],
-        "macd_hist": bot_state.get('macd_hist', 0.0),
+        "ltp": bot_state.index_ltp,
+        "supertrend_signal": bot_state.last_supertrend_signal,
+        "supertrend_value": bot_state.supertrend_value,
+        "macd_value": bot_state.macd_value,
+        "macd_hist": bot_state.macd_hist,
         # Fixed-contract option signal prices (CE/PE)
-        "signal_ce_ltp": bot_state.get('signal_ce_ltp', 0.0),
-        "signal_pe_ltp": bot_state.get('signal_pe_ltp', 0.0),
-        "signal_ce_supertrend_signal": bot_state.get('signal_ce_supertrend_signal'),
-        "signal_pe_supertrend_signal": bot_state.get('signal_pe_supertrend_signal'),
-        "signal_ce_supertrend_value": bot_state.get('signal_ce_supertrend_value', 0.0),
-        "signal_pe_supertrend_value": bot_state.get('signal_pe_supertrend_value', 0.0),
-        "signal_ce_macd_value": bot_state.get('signal_ce_macd_value', 0.0),
-        "signal_pe_macd_value": bot_state.get('signal_pe_macd_value', 0.0),
-        "signal_ce_macd_hist": bot_state.get('signal_ce_macd_hist', 0.0),
-        "signal_pe_macd_hist": bot_state.get('signal_pe_macd_hist', 0.0),
+        "signal_ce_ltp": bot_state.signal_ce_ltp,
+        "signal_pe_ltp": bot_state.signal_pe_ltp,
+        "signal_ce_supertrend_signal": bot_state.signal_ce_supertrend_signal,
+        "signal_pe_supertrend_signal": bot_state.signal_pe_supertrend_signal,
+        "signal_ce_supertrend_value": bot_state.signal_ce_supertrend_value,
+        "signal_pe_supertrend_value": bot_state.signal_pe_supertrend_value,
+        "signal_ce_macd_value": bot_state.signal_ce_macd_value,
+        "signal_pe_macd_value": bot_state.signal_pe_macd_value,
+        "signal_ce_macd_hist": bot_state.signal_ce_macd_hist,
+        "signal_pe_macd_hist": bot_state.signal_pe_macd_hist,
         # Fixed-contract metadata
-        "fixed_option_strike": bot_state.get('fixed_option_strike'),
-        "fixed_option_expiry": bot_state.get('fixed_option_expiry'),
-        "fixed_ce_security_id": bot_state.get('fixed_ce_security_id'),
-        "fixed_pe_security_id": bot_state.get('fixed_pe_security_id'),
+        "fixed_option_strike": bot_state.fixed_option_strike,
+        "fixed_option_expiry": bot_state.fixed_option_expiry,
+        "fixed_ce_security_id": bot_state.fixed_ce_security_id,
+        "fixed_pe_security_id": bot_state.fixed_pe_security_id,
         # Multi-contract universe (optional)
-        "option_universe_enabled": bool(bot_state.get('option_universe_enabled', False)),
-        "option_universe_center_strike": bot_state.get('option_universe_center_strike'),
-        "option_universe_expiry": bot_state.get('option_universe_expiry'),
-        "option_universe_strikes": bot_state.get('option_universe_strikes', []),
-        "option_universe_contracts": bot_state.get('option_universe_contracts', {}),
+        "option_universe_enabled": bool(bot_state.option_universe_enabled),
+        "option_universe_center_strike": bot_state.option_universe_center_strike,
+        "option_universe_expiry": bot_state.option_universe_expiry,
+        "option_universe_strikes": bot_state.option_universe_strikes,
+        "option_universe_contracts": bot_state.option_universe_contracts,
         # Kept for backward compatibility with older UI builds.
         "adx_value": 0.0,
-        "signal_status": bot_state['signal_status'],
-        "strategy_mode": bot_state.get('strategy_mode', 'st_macd_hist'),
+        "signal_status": bot_state.signal_status,
+        "strategy_mode": bot_state.strategy_mode,
         "selected_index": config['selected_index'],
         "timestamp": datetime.now(timezone.utc).isoformat()
     }
@@ -147,29 +148,29 @@ async def get_market_data_live() -> dict:
         try:
             idx = bot.dhan.get_index_ltp(index_name)
             if idx and float(idx) > 0:
-                bot_state['index_ltp'] = float(idx)
+                bot_state.index_ltp = float(idx)
         except Exception:
             pass
 
         # Ensure fixed contract or option-universe exists
         steps = int(config.get('option_universe_strike_steps', 0) or 0)
         if steps > 0:
-            if not bool(bot_state.get('option_universe_enabled', False)):
+            if not bool(bot_state.option_universe_enabled):
                 try:
-                    await bot._ensure_option_universe(index_name, float(bot_state.get('index_ltp', 0.0) or 0.0))
+                    await bot._ensure_option_universe(index_name, float(bot_state.index_ltp or 0.0))
                 except Exception:
                     pass
         else:
-            if not (bot_state.get('fixed_ce_security_id') and bot_state.get('fixed_pe_security_id')):
+            if not (bot_state.fixed_ce_security_id and bot_state.fixed_pe_security_id):
                 try:
-                    await bot._ensure_fixed_option_contract(index_name, float(bot_state.get('index_ltp', 0.0) or 0.0))
+                    await bot._ensure_fixed_option_contract(index_name, float(bot_state.index_ltp or 0.0))
                 except Exception:
                     pass
 
-        ce_sid = bot_state.get('fixed_ce_security_id')
-        pe_sid = bot_state.get('fixed_pe_security_id')
-        fixed_strike = bot_state.get('fixed_option_strike')
-        fixed_expiry = bot_state.get('fixed_option_expiry')
+        ce_sid = bot_state.fixed_ce_security_id
+        pe_sid = bot_state.fixed_pe_security_id
+        fixed_strike = bot_state.fixed_option_strike
+        fixed_expiry = bot_state.fixed_option_expiry
 
         ids: list[int] = []
         for x in (ce_sid, pe_sid):
@@ -184,7 +185,7 @@ async def get_market_data_live() -> dict:
             try:
                 idx2, option_ltps = bot.dhan.get_index_and_options_ltp(index_name, ids)
                 if idx2 and float(idx2) > 0:
-                    bot_state['index_ltp'] = float(idx2)
+                    bot_state.index_ltp = float(idx2)
             except Exception:
                 option_ltps = {}
 
@@ -213,11 +214,14 @@ async def get_market_data_live() -> dict:
                             current = 0.0
 
                     if current > 0:
-                        current = round(float(current) / 0.05) * 0.05
+                        current = round_to_tick(current)
                         if opt_type == 'CE':
-                            bot_state['signal_ce_ltp'] = round(float(current), 2)
+                            bot_state.signal_ce_ltp = current
                         else:
-                            bot_state['signal_pe_ltp'] = round(float(current), 2)
+                            bot_state.signal_pe_ltp = current
+
+        if bot.running:
+            bot.notify_tick()
 
     except Exception:
         # Never fail UI polling due to refresh errors.
@@ -264,8 +268,8 @@ async def debug_quotes() -> dict:
 
         # Read any existing fixed contract IDs first (these may already be available even
         # if index last_price is temporarily 0 on special sessions).
-        ce_sid = bot_state.get('fixed_ce_security_id')
-        pe_sid = bot_state.get('fixed_pe_security_id')
+        ce_sid = bot_state.fixed_ce_security_id
+        pe_sid = bot_state.fixed_pe_security_id
         ids: list[int] = []
         for x in (ce_sid, pe_sid):
             if x:
@@ -276,7 +280,7 @@ async def debug_quotes() -> dict:
 
         # If fixed IDs are not present, attempt to derive them (requires a valid index LTP).
         fixed_ready = bool(ids)
-        index_ltp = float(bot_state.get('index_ltp') or 0.0)
+        index_ltp = float(bot_state.index_ltp or 0.0)
         if not fixed_ready:
             try:
                 derived_index_ltp = float(bot.dhan.get_index_ltp(index_name) or 0.0)
@@ -296,7 +300,7 @@ async def debug_quotes() -> dict:
                         "current_time_ist": ist.strftime('%H:%M:%S'),
                         "market_open": bool(is_market_open()),
                         "allow_weekend_trading": bool(config.get('allow_weekend_trading', False)),
-                        "bot_state_index_ltp": float(bot_state.get('index_ltp') or 0.0),
+                        "bot_state_index_ltp": float(bot_state.index_ltp or 0.0),
                     },
                 }
 
@@ -305,8 +309,8 @@ async def debug_quotes() -> dict:
             except Exception:
                 fixed_ready = False
 
-            ce_sid = bot_state.get('fixed_ce_security_id')
-            pe_sid = bot_state.get('fixed_pe_security_id')
+            ce_sid = bot_state.fixed_ce_security_id
+            pe_sid = bot_state.fixed_pe_security_id
             ids = []
             for x in (ce_sid, pe_sid):
                 if x:
@@ -323,14 +327,14 @@ async def debug_quotes() -> dict:
                         "index_name": index_name,
                         "index_ltp": float(index_ltp or 0.0),
                         "fixed_ready": bool(fixed_ready),
-                        "fixed_option_strike": bot_state.get('fixed_option_strike'),
-                        "fixed_option_expiry": bot_state.get('fixed_option_expiry'),
+                        "fixed_option_strike": bot_state.fixed_option_strike,
+                        "fixed_option_expiry": bot_state.fixed_option_expiry,
                         "fixed_ce_security_id": ce_sid,
                         "fixed_pe_security_id": pe_sid,
                         "current_time_ist": ist.strftime('%H:%M:%S'),
                         "market_open": bool(is_market_open()),
                         "allow_weekend_trading": bool(config.get('allow_weekend_trading', False)),
-                        "bot_state_index_ltp": float(bot_state.get('index_ltp') or 0.0),
+                        "bot_state_index_ltp": float(bot_state.index_ltp or 0.0),
                     },
                 }
 
@@ -387,8 +391,8 @@ async def debug_quotes() -> dict:
 
         # Option-chain-derived prices (uses cached option chain when available)
         option_ltps_chain: dict[int, float] = {}
-        fixed_strike = bot_state.get('fixed_option_strike')
-        fixed_expiry = bot_state.get('fixed_option_expiry')
+        fixed_strike = bot_state.fixed_option_strike
+        fixed_expiry = bot_state.fixed_option_expiry
         if fixed_strike and fixed_expiry:
             try:
                 await bot.dhan.get_option_chain(index_name=index_name, expiry=str(fixed_expiry))
@@ -422,8 +426,8 @@ async def debug_quotes() -> dict:
                 "segment": segment,
                 "fno_segment": fno_segment,
                 "index_security_id": index_security_id,
-                "fixed_option_strike": bot_state.get('fixed_option_strike'),
-                "fixed_option_expiry": bot_state.get('fixed_option_expiry'),
+                "fixed_option_strike": bot_state.fixed_option_strike,
+                "fixed_option_expiry": bot_state.fixed_option_expiry,
                 "fixed_ce_security_id": ce_sid,
                 "fixed_pe_security_id": pe_sid,
                 "missing": missing,
@@ -440,9 +444,9 @@ async def debug_quotes() -> dict:
                 "option_ltps": option_ltps,
                 "option_ltps_options_only": option_ltps_options_only,
                 "option_ltps_chain": option_ltps_chain,
-                "bot_state_index_ltp": float(bot_state.get('index_ltp') or 0.0),
-                "bot_state_signal_ce_ltp": bot_state.get('signal_ce_ltp', 0.0),
-                "bot_state_signal_pe_ltp": bot_state.get('signal_pe_ltp', 0.0),
+                "bot_state_index_ltp": float(bot_state.index_ltp or 0.0),
+                "bot_state_signal_ce_ltp": bot_state.signal_ce_ltp,
+                "bot_state_signal_pe_ltp": bot_state.signal_pe_ltp,
             },
             "raw": {
                 "options": raw_options,
@@ -463,23 +467,23 @@ async def debug_quotes() -> dict:
 
 def get_position() -> dict:
     """Get current position info"""
-    if not bot_state['current_position']:
+    if not bot_state.current_position:
         return {"has_position": False}
 
     index_config = get_index_config(config['selected_index'])
     qty = config['order_qty'] * index_config['lot_size']
-    unrealized_pnl = (bot_state['current_option_ltp'] - bot_state['entry_price']) * qty
+    unrealized_pnl = (bot_state.current_option_ltp - bot_state.entry_price) * qty
 
     return {
         "has_position": True,
-        "option_type": bot_state['current_position'].get('option_type'),
-        "strike": bot_state['current_position'].get('strike'),
-        "expiry": bot_state['current_position'].get('expiry'),
-        "index_name": bot_state['current_position'].get('index_name', config['selected_index']),
-        "entry_price": bot_state['entry_price'],
-        "current_ltp": bot_state['current_option_ltp'],
+        "option_type": bot_state.current_position.get('option_type'),
+        "strike": bot_state.current_position.get('strike'),
+        "expiry": bot_state.current_position.get('expiry'),
+        "index_name": bot_state.current_position.get('index_name', config['selected_index']),
+        "entry_price": bot_state.entry_price,
+        "current_ltp": bot_state.current_option_ltp,
         "unrealized_pnl": unrealized_pnl,
-        "trailing_sl": bot_state['trailing_sl'],
+        "trailing_sl": bot_state.trailing_sl,
         "qty": qty
     }
 
@@ -487,36 +491,36 @@ def get_position() -> dict:
 def get_daily_summary() -> dict:
     """Get daily trading summary"""
     return {
-        "total_trades": bot_state['daily_trades'],
-        "total_pnl": bot_state['daily_pnl'],
-        "max_drawdown": bot_state['max_drawdown'],
-        "daily_stop_triggered": bot_state['daily_max_loss_triggered']
+        "total_trades": bot_state.daily_trades,
+        "total_pnl": bot_state.daily_pnl,
+        "max_drawdown": bot_state.max_drawdown,
+        "daily_stop_triggered": bot_state.daily_max_loss_triggered
     }
 
 
 def get_strategy_status() -> dict:
     """Get live strategy/agent state for debugging (read-only)."""
     return {
-        "strategy_mode": bot_state.get('strategy_mode', 'st_macd_hist'),
+        "strategy_mode": bot_state.strategy_mode,
         "rules": {
             "entry": "ST BUY + MACD hist in (0.5, 1.25) + last 3 candles increasing",
             "exit": "ST reversal OR trailing SL OR target",
-            "candle_interval_seconds": int(bot_state.get('candle_interval', 5) or 5),
+            "candle_interval_seconds": int(bot_state.candle_interval or 5),
         },
         "indicators": {
-            "supertrend_value": bot_state.get('supertrend_value', 0.0),
-            "macd_value": bot_state.get('macd_value', 0.0),
-            "macd_hist": bot_state.get('macd_hist', 0.0),
-            "signal_ce_supertrend_value": bot_state.get('signal_ce_supertrend_value', 0.0),
-            "signal_pe_supertrend_value": bot_state.get('signal_pe_supertrend_value', 0.0),
-            "signal_ce_macd_value": bot_state.get('signal_ce_macd_value', 0.0),
-            "signal_pe_macd_value": bot_state.get('signal_pe_macd_value', 0.0),
-            "signal_ce_macd_hist": bot_state.get('signal_ce_macd_hist', 0.0),
-            "signal_pe_macd_hist": bot_state.get('signal_pe_macd_hist', 0.0),
+            "supertrend_value": bot_state.supertrend_value,
+            "macd_value": bot_state.macd_value,
+            "macd_hist": bot_state.macd_hist,
+            "signal_ce_supertrend_value": bot_state.signal_ce_supertrend_value,
+            "signal_pe_supertrend_value": bot_state.signal_pe_supertrend_value,
+            "signal_ce_macd_value": bot_state.signal_ce_macd_value,
+            "signal_pe_macd_value": bot_state.signal_pe_macd_value,
+            "signal_ce_macd_hist": bot_state.signal_ce_macd_hist,
+            "signal_pe_macd_hist": bot_state.signal_pe_macd_hist,
         },
         "position": {
-            "in_position": bool(bot_state.get('current_position')),
-            "current_position_side": bot_state.get('current_position', {}).get('option_type') if bot_state.get('current_position') else None,
+            "in_position": bool(bot_state.current_position),
+            "current_position_side": bot_state.current_position.get('option_type') if bot_state.current_position else None,
         },
     }
 
@@ -528,7 +532,7 @@ def get_config() -> dict:
     return {
         # API Settings
         "has_credentials": bool(config['dhan_access_token'] and config['dhan_client_id']),
-        "mode": bot_state['mode'],
+        "mode": bot_state.mode,
         # Index & Timeframe
         "selected_index": config['selected_index'],
         "candle_interval": int(config.get('candle_interval', 5) or 5),
@@ -666,7 +670,7 @@ async def update_config_values(updates: dict) -> dict:
         mode = mode_map.get(normalized)
         if mode in ('agent', 'supertrend', 'st_macd_hist'):
             config['strategy_mode'] = mode
-            bot_state['strategy_mode'] = mode
+            bot_state.strategy_mode = mode
             updated_fields.append('strategy_mode')
             logger.info(f"[CONFIG] Strategy mode changed to: {mode} (requested: {requested})")
         else:
@@ -703,7 +707,7 @@ async def update_config_values(updates: dict) -> dict:
         available = get_available_indices()
         if new_index in available:
             config['selected_index'] = new_index
-            bot_state['selected_index'] = new_index
+            bot_state.selected_index = new_index
             updated_fields.append('selected_index')
             logger.info(f"[CONFIG] Index changed to: {new_index}")
         else:
@@ -714,7 +718,7 @@ async def update_config_values(updates: dict) -> dict:
         new_interval = int(updates['candle_interval'])
         if new_interval in valid_intervals:
             config['candle_interval'] = new_interval
-            bot_state['candle_interval'] = new_interval
+            bot_state.candle_interval = new_interval
             updated_fields.append('candle_interval')
             logger.info(f"[CONFIG] Candle interval changed to: {new_interval}s")
             # Reset indicator when interval changes
@@ -753,6 +757,9 @@ async def update_config_values(updates: dict) -> dict:
             except (ValueError, TypeError) as e:
                 logger.warning(f"[CONFIG] Invalid value for {param}: {e}")
     
+    # Refresh the bot's per-tick risk snapshot (SL/target/loss limits)
+    get_trading_bot().refresh_risk_config()
+
     await save_config()
     logger.info(f"[CONFIG] Updated: {updated_fields}")
     
@@ -761,13 +768,13 @@ async def update_config_values(updates: dict) -> dict:
 
 async def set_trading_mode(mode: str) -> dict:
     """Set trading mode (paper/live)"""
-    if bot_state['current_position']:
+    if bot_state.current_position:
         return {"status": "error", "message": "Cannot change mode with open position"}
     
     if mode not in ['paper', 'live']:
         return {"status": "error", "message": "Invalid mode. Use 'paper' or 'live'"}
     
-    bot_state['mode'] = mode
+    bot_state.mode = mode
     logger.info(f"[CONFIG] Trading mode changed to: {mode}")
     
     return {"status": "success", "mode": mode}
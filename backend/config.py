@@ -1,5 +1,6 @@
 # Configuration and state management
 import os
+from dataclasses import asdict, dataclass, field
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -10,47 +11,61 @@ load_dotenv(ROOT_DIR / '.env')
 VALID_TIMEFRAMES = [5, 15, 30, 60, 300, 900]  # 5s, 15s, 30s, 1m, 5m, 15m
 
 # Global bot state
-bot_state = {
-    "is_running": False,
-    "mode": "paper",  # paper or live (default to paper for safety)
-    "current_position": None,
-    "daily_trades": 0,
-    "daily_pnl": 0.0,
-    "daily_max_loss_triggered": False,
-    "last_supertrend_signal": None,
-    "index_ltp": 0.0,
-    "supertrend_value": 0.0,
-    "macd_value": 0.0,  # MACD line value
-    "adx_value": 0.0,
-    "signal_status": "waiting",  # waiting, buy (GREEN), sell (RED)
-    "trailing_sl": None,
-    "entry_price": 0.0,
-    "current_option_ltp": 0.0,
-    "max_drawdown": 0.0,
-    "selected_index": "NIFTY",  # Current selected index
-    "strategy_mode": "agent",
+#
+# Slotted so the per-tick writes (LTPs, trailing SL, P&L) are plain attribute
+# stores rather than string-keyed dict updates. API/WS payloads read the
+# fields they need; as_dict() is there for full snapshots.
+@dataclass(slots=True)
+class BotState:
+    is_running: bool = False
+    mode: str = "paper"  # paper or live (default to paper for safety)
+    current_position: dict | None = None
+    daily_trades: int = 0
+    daily_pnl: float = 0.0
+    daily_max_loss_triggered: bool = False
+    last_supertrend_signal: str | None = None
+    index_ltp: float = 0.0
+    supertrend_value: float = 0.0
+    macd_value: float = 0.0  # MACD line value
+    macd_hist: float = 0.0
+    adx_value: float = 0.0
+    signal_status: str = "waiting"  # waiting, buy (GREEN), sell (RED)
+    trailing_sl: float | None = None
+    entry_price: float = 0.0
+    current_option_ltp: float = 0.0
+    max_drawdown: float = 0.0
+    selected_index: str = "NIFTY"  # Current selected index
+    strategy_mode: str = "agent"
+    candle_interval: int = 5
     # Fixed-contract option signal metadata (best-effort)
-    "fixed_option_strike": None,
-    "fixed_option_expiry": None,
-    "fixed_ce_security_id": None,
-    "fixed_pe_security_id": None,
-    "signal_ce_ltp": 0.0,
-    "signal_pe_ltp": 0.0,
+    fixed_option_strike: int | None = None
+    fixed_option_expiry: str | None = None
+    fixed_ce_security_id: str | None = None
+    fixed_pe_security_id: str | None = None
+    signal_ce_ltp: float = 0.0
+    signal_pe_ltp: float = 0.0
     # Multi-contract option universe (optional; configured via option_universe_strike_steps)
     # When enabled, the bot maintains CE+PE contracts for strikes around the ATM strike.
-    "option_universe_enabled": False,
-    "option_universe_center_strike": None,
-    "option_universe_expiry": None,
-    "option_universe_strikes": [],
-    "option_universe_contracts": {},
+    option_universe_enabled: bool = False
+    option_universe_center_strike: int | None = None
+    option_universe_expiry: str | None = None
+    option_universe_strikes: list = field(default_factory=list)
+    option_universe_contracts: dict = field(default_factory=dict)
     # Per-option indicators for the fixed ATM contracts (for UI/validation)
-    "signal_ce_supertrend_signal": None,
-    "signal_pe_supertrend_signal": None,
-    "signal_ce_supertrend_value": 0.0,
-    "signal_pe_supertrend_value": 0.0,
-    "signal_ce_macd_hist": 0.0,
-    "signal_pe_macd_hist": 0.0,
-}
+    signal_ce_supertrend_signal: str | None = None
+    signal_pe_supertrend_signal: str | None = None
+    signal_ce_supertrend_value: float = 0.0
+    signal_pe_supertrend_value: float = 0.0
+    signal_ce_macd_value: float = 0.0
+    signal_pe_macd_value: float = 0.0
+    signal_ce_macd_hist: float = 0.0
+    signal_pe_macd_hist: float = 0.0
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+bot_state = BotState()
 
 # Configuration (can be updated from frontend)
 config = {
@@ -1,6 +1,9 @@
 # Database operations
+import asyncio
+import os
 import aiosqlite
 from config import DB_PATH, config
+from datetime import datetime, timezone
 import logging
 from typing import Optional
 
@@ -9,6 +12,11 @@ logger = logging.getLogger(__name__)
 async def init_db():
     """Initialize SQLite database"""
     async with aiosqlite.connect(DB_PATH) as db:
+        # WAL is persistent per database file: API reads no longer block the background writers
+        try:
+            await db.execute("PRAGMA journal_mode=WAL")
+        except Exception as e:
+            logger.error(f"[DB] Could not enable WAL: {e}")
         await db.execute('''
             CREATE TABLE IF NOT EXISTS trades (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -120,43 +128,105 @@ async def save_config():
     except Exception as e:
         logger.error(f"Error saving config: {e}")
 
-async def save_trade(trade_data: dict):
-    """Save trade to database"""
+_INSERT_TRADE_SQL = '''
+    INSERT INTO trades (trade_id, entry_time, option_type, strike, expiry, entry_price, qty, mode, index_name, created_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+_UPDATE_TRADE_EXIT_SQL = '''
+    UPDATE trades 
+    SET exit_time = ?, exit_price = ?, pnl = ?, exit_reason = ?
+    WHERE trade_id = ?
+'''
+
+
+# Background trade writer: one ordered queue for entry inserts and exit updates, so an
+# exit is never applied before its entry row exists and bursts share one commit.
+_TRADE_QUEUE_MAXSIZE = 64
+_TRADE_BATCH_SIZE = max(1, int(os.getenv("TRADE_DB_BATCH_SIZE", "16")))
+# How long the writer lingers after the first op so a burst (entry + exit, re-entries) shares a commit
+_TRADE_FLUSH_SEC = max(0, int(os.getenv("TRADE_DB_FLUSH_MS", "20"))) / 1000.0
+_trade_queue: Optional[asyncio.Queue] = None
+_trade_writer_task: Optional[asyncio.Task] = None
+
+
+def _ensure_trade_writer() -> asyncio.Queue:
+    global _trade_queue, _trade_writer_task
+    if _trade_queue is None:
+        _trade_queue = asyncio.Queue(maxsize=_TRADE_QUEUE_MAXSIZE)
+    if _trade_writer_task is None or _trade_writer_task.done():
+        _trade_writer_task = asyncio.create_task(_trade_writer(_trade_queue))
+    return _trade_queue
+
+
+async def _trade_writer(queue: asyncio.Queue):
+    """Apply queued trade writes in order, committing up to _TRADE_BATCH_SIZE per connection."""
+    while True:
+        ops = [await queue.get()]
+        deadline = asyncio.get_running_loop().time() + _TRADE_FLUSH_SEC
+        while len(ops) < _TRADE_BATCH_SIZE:
+            if not queue.empty():
+                ops.append(queue.get_nowait())
+                continue
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                break
+            try:
+                ops.append(await asyncio.wait_for(queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        try:
+            async with aiosqlite.connect(DB_PATH) as db:
+                await db.execute("PRAGMA synchronous=NORMAL")
+                for sql, params in ops:
+                    try:
+                        await db.execute(sql, params)
+                    except Exception as e:
+                        logger.error(f"[DB] Error writing trade {params}: {e}")
+                await db.commit()
+            logger.info(f"[DB] Trade writes committed: {len(ops)}")
+        except Exception as e:
+            logger.error(f"[DB] Error committing trade writes ({len(ops)} ops): {e}")
+        finally:
+            for _ in ops:
+                queue.task_done()
+
+
+def start_trade_writer() -> None:
+    """Start the background trade writer ahead of the first trade (idempotent)."""
+    _ensure_trade_writer()
+
+
+async def flush_trade_writes(timeout: float = 5.0) -> None:
+    """Wait until queued trade writes are committed (bot stop / shutdown)."""
+    if _trade_queue is None or _trade_writer_task is None or _trade_writer_task.done():
+        return
     try:
-        async with aiosqlite.connect(DB_PATH) as db:
-            await db.execute('''
-                INSERT INTO trades (trade_id, entry_time, option_type, strike, expiry, entry_price, qty, mode, index_name, created_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                trade_data['trade_id'],
-                trade_data['entry_time'],
-                trade_data['option_type'],
-                trade_data['strike'],
-                trade_data['expiry'],
-                trade_data['entry_price'],
-                trade_data['qty'],
-                trade_data['mode'],
-                trade_data.get('index_name', 'NIFTY'),
-                trade_data['created_at']
-            ))
-            await db.commit()
-            logger.info(f"[DB] Trade saved: {trade_data['trade_id']}")
-    except Exception as e:
-        logger.error(f"[DB] Error saving trade: {e}")
+        await asyncio.wait_for(_trade_queue.join(), timeout)
+    except asyncio.TimeoutError:
+        logger.warning(f"[DB] Timed out flushing trade writes ({_trade_queue.qsize()} pending)")
+
 
-async def update_trade_exit(trade_id: str, exit_time: str, exit_price: float, pnl: float, exit_reason: str):
-    """Update trade with exit details"""
+async def _enqueue_trade_op(op: tuple, trade_id: str) -> None:
+    queue = _ensure_trade_writer()
     try:
-        async with aiosqlite.connect(DB_PATH) as db:
-            await db.execute('''
-                UPDATE trades 
-                SET exit_time = ?, exit_price = ?, pnl = ?, exit_reason = ?
-                WHERE trade_id = ?
-            ''', (exit_time, exit_price, pnl, exit_reason, trade_id))
-            await db.commit()
-            logger.info(f"[DB] Trade exit updated: {trade_id}, PnL: {pnl:.2f}")
-    except Exception as e:
-        logger.error(f"[DB] Error updating trade exit: {e}")
+        queue.put_nowait(op)
+    except asyncio.QueueFull:
+        # Never write around the queue: a direct exit UPDATE could run before its queued INSERT
+        logger.warning(f"[DB] Trade queue full, waiting to queue write for {trade_id}")
+        await queue.put(op)
+
+
+async def queue_trade(trade_id: str, entry_time: str, option_type: str, strike: int, expiry: str,
+                      entry_price: float, qty: int, mode: str, index_name: str, created_at: str) -> None:
+    """Queue a trade insert for the background writer (waits only if the queue is full)"""
+    row = (trade_id, entry_time, option_type, strike, expiry, entry_price, qty, mode, index_name, created_at)
+    await _enqueue_trade_op((_INSERT_TRADE_SQL, row), trade_id)
+
+
+async def queue_trade_exit(trade_id: str, exit_time: str, exit_price: float, pnl: float, exit_reason: str) -> None:
+    """Queue a trade exit update for the background writer (waits only if the queue is full)"""
+    await _enqueue_trade_op((_UPDATE_TRADE_EXIT_SQL, (exit_time, exit_price, pnl, exit_reason, trade_id)), trade_id)
 
 async def get_trades(limit: int = None) -> list:
     """Get trade history
@@ -353,23 +423,52 @@ async def get_trade_analytics() -> dict:
             'daily_stats': daily_stats,
             'trades': trades
         }
+# Live candle rows are written by a background task so callers never wait on DB I/O.
+_CANDLE_QUEUE_MAXSIZE = 1000
+_CANDLE_BATCH_SIZE = 32
+_candle_queue: Optional[asyncio.Queue] = None
+_candle_writer_task: Optional[asyncio.Task] = None
+
+
+def _ensure_candle_writer() -> asyncio.Queue:
+    global _candle_queue, _candle_writer_task
+    if _candle_queue is None:
+        _candle_queue = asyncio.Queue(maxsize=_CANDLE_QUEUE_MAXSIZE)
+    if _candle_writer_task is None or _candle_writer_task.done():
+        _candle_writer_task = asyncio.create_task(_candle_writer(_candle_queue))
+    return _candle_queue
+
+
+async def _candle_writer(queue: asyncio.Queue):
+    """Drain queued candle rows, inserting up to _CANDLE_BATCH_SIZE per executemany."""
+    while True:
+        rows = [await queue.get()]
+        while len(rows) < _CANDLE_BATCH_SIZE and not queue.empty():
+            rows.append(queue.get_nowait())
+        try:
+            async with aiosqlite.connect(DB_PATH) as db:
+                await db.execute("PRAGMA synchronous=NORMAL")
+                await db.executemany(
+                    '''INSERT INTO candle_data 
+                       (timestamp, candle_number, index_name, high, low, close, supertrend_value, macd_value, signal_status, created_at)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                    rows,
+                )
+                await db.commit()
+        except Exception as e:
+            logger.error(f"[DB] Error saving candle data ({len(rows)} rows): {e}")
+
+
 async def save_candle_data(candle_number: int, index_name: str, high: float, low: float, close: float, 
                           supertrend_value: float, macd_value: float, signal_status: str):
-    """Save candle data for analysis"""
+    """Queue candle data for analysis (non-blocking; rows are dropped if the writer falls behind)"""
+    timestamp = datetime.now(timezone.utc).isoformat()
     try:
-        from datetime import datetime, timezone
-        timestamp = datetime.now(timezone.utc).isoformat()
-        
-        async with aiosqlite.connect(DB_PATH) as db:
-            await db.execute(
-                '''INSERT INTO candle_data 
-                   (timestamp, candle_number, index_name, high, low, close, supertrend_value, macd_value, signal_status, created_at)
-                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-                (timestamp, candle_number, index_name, high, low, close, supertrend_value, macd_value, signal_status, timestamp)
-            )
-            await db.commit()
-    except Exception as e:
-        logger.error(f"[DB] Error saving candle data: {e}")
+        _ensure_candle_writer().put_nowait(
+            (timestamp, candle_number, index_name, high, low, close, supertrend_value, macd_value, signal_status, timestamp)
+        )
+    except asyncio.QueueFull:
+        logger.warning(f"[DB] Candle queue full, dropping candle {candle_number} ({index_name})")
 
 
 async def bulk_insert_candle_data(
@@ -14,6 +14,12 @@ class DhanAPI:
         self.access_token = access_token
         self.client_id = client_id
         self.dhan = dhanhq(client_id, access_token)
+        # dhanhq keeps one requests.Session (HTTP keep-alive), but its calls block the event loop,
+        # so cap each request well below the SDK's 60s default.
+        try:
+            self.dhan.timeout = max(1.0, float(os.getenv("DHAN_HTTP_TIMEOUT_SEC", "10")))
+        except Exception:
+            self.dhan.timeout = 10.0
         # Cache for option chain to avoid rate limiting
         self._option_chain_cache = {}
         self._option_chain_cache_time = {}
@@ -37,7 +43,21 @@ class DhanAPI:
 
         # Fallback throttling for quote segment retries
         self._last_multi_quote_fallback_ts = 0.0
+
+        # Nearest expiry per (index, IST date, after 15:00 roll) -> (monotonic ts, expiry)
+        self._expiry_cache = {}
+        self._expiry_cache_ttl = 3600
+        # (index, strike, CE/PE, expiry) -> security ID; static for the day, cleared on IST date change
+        self._secid_cache = {}
+        self._secid_cache_date = None
     
+    def close(self) -> None:
+        """Release the pooled HTTP connections."""
+        try:
+            self.dhan.session.close()
+        except Exception:
+            pass
+
     def get_index_ltp(self, index_name: str = "NIFTY") -> float:
         """Get index spot LTP"""
         try:
@@ -266,7 +286,7 @@ class DhanAPI:
             cache_key = f"{index_name}_{expiry}"
             now = datetime.now()
             
-            cache_duration = self._position_cache_duration if bot_state.get('current_position') else self._cache_duration
+            cache_duration = self._position_cache_duration if bot_state.current_position else self._cache_duration
             
             cache_time = self._option_chain_cache_time.get(cache_key)
             if (not force_refresh and 
@@ -294,7 +314,13 @@ class DhanAPI:
         return {}
     
     async def get_nearest_expiry(self, index_name: str = "NIFTY") -> str:
-        """Get nearest expiry date"""
+        """Get nearest expiry date (API result cached per index for the session/day)"""
+        ist_now = datetime.now(timezone.utc) + timedelta(hours=5, minutes=30)
+        cache_key = (index_name, ist_now.date(), ist_now.hour >= 15)
+        cached = self._expiry_cache.get(cache_key)
+        if cached and time.monotonic() - cached[0] < self._expiry_cache_ttl:
+            return cached[1]
+
         try:
             index_config = get_index_config(index_name)
             security_id = index_config["security_id"]
@@ -339,6 +365,7 @@ class DhanAPI:
                             valid_expiries.sort(key=lambda x: x[0])
                             nearest = valid_expiries[0][1]
                             logger.info(f"Nearest expiry for {index_name}: {nearest}")
+                            self._expiry_cache[cache_key] = (time.monotonic(), nearest)
                             return nearest
             
             logger.warning(f"Could not get expiry list from API for {index_name}")
@@ -359,11 +386,69 @@ class DhanAPI:
         logger.info(f"Using calculated expiry for {index_name}: {calculated_expiry}")
         return calculated_expiry
     
+    def _roll_secid_cache(self) -> None:
+        """Drop cached security IDs when the IST trading day changes."""
+        today = (datetime.now(timezone.utc) + timedelta(hours=5, minutes=30)).date()
+        if self._secid_cache_date != today:
+            self._secid_cache.clear()
+            self._secid_cache_date = today
+
+    async def get_option_security_ids_bulk(self, index_name: str, strikes: list[int], expiry: str) -> dict[tuple[int, str], str]:
+        """Get CE/PE security IDs for many strikes from a single option-chain read.
+
+        Returns {(strike, 'CE'|'PE'): security_id}; contracts that are not found are omitted.
+        """
+        found: dict[tuple[int, str], str] = {}
+        try:
+            self._roll_secid_cache()
+            missing: list[tuple[int, str]] = []
+            for strike in strikes:
+                for option_type in ('CE', 'PE'):
+                    cached = self._secid_cache.get((index_name, int(strike), option_type, str(expiry)))
+                    if cached:
+                        found[(int(strike), option_type)] = cached
+                    else:
+                        missing.append((int(strike), option_type))
+            if not missing:
+                return found
+
+            chain = await self.get_option_chain(index_name=index_name, expiry=expiry)
+            if chain and chain.get('status') == 'success':
+                data = chain.get('data', {})
+                if isinstance(data, dict) and 'data' in data:
+                    data = data.get('data', {})
+
+                # Chain strike keys are float strings ("24500.000000"); index them by int once
+                by_strike: dict[int, dict] = {}
+                for strike_key, strike_data in data.get('oc', {}).items():
+                    try:
+                        by_strike[int(float(strike_key))] = strike_data
+                    except (TypeError, ValueError):
+                        continue
+
+                for strike, option_type in missing:
+                    opt_data = (by_strike.get(strike) or {}).get(option_type.lower()) or {}
+                    security_id = opt_data.get('security_id')
+                    if security_id:
+                        found[(strike, option_type)] = str(security_id)
+                        self._secid_cache[(index_name, strike, option_type, str(expiry))] = str(security_id)
+
+            logger.info(f"Resolved {len(found)}/{2 * len(strikes)} security IDs for {index_name} {expiry}")
+        except Exception as e:
+            logger.error(f"Error getting option security IDs: {e}")
+        return found
+
     async def get_atm_option_security_id(self, index_name: str, strike: int, option_type: str, expiry: str = None) -> str:
         """Get security ID for ATM option"""
         try:
             if not expiry:
                 expiry = await self.get_nearest_expiry(index_name)
+
+            self._roll_secid_cache()
+            cache_key = (index_name, int(strike), option_type.upper(), str(expiry))
+            cached = self._secid_cache.get(cache_key)
+            if cached:
+                return cached
             
             chain = await self.get_option_chain(index_name=index_name, expiry=expiry)
             
@@ -391,6 +476,7 @@ class DhanAPI:
                             security_id = opt_data.get('security_id')
                             if security_id:
                                 logger.info(f"Found security ID {security_id} for {index_name} {strike} {option_type}")
+                                self._secid_cache[cache_key] = str(security_id)
                                 return str(security_id)
                 
                 available_strikes = list(oc_data.keys())[:10]
@@ -416,7 +502,7 @@ class DhanAPI:
                     cache_time = self._option_chain_cache_time.get(cache_key)
                     refresh_sec = self._ltp_chain_refresh_sec
                     try:
-                        if bot_state.get('current_position'):
+                        if bot_state.current_position:
                             refresh_sec = max(1, min(refresh_sec, 2))
                     except Exception:
                         pass
@@ -1,117 +1,75 @@
 # Multiple Trading Indicators
 import logging
+import math
+from collections import deque
+from typing import Optional
+
+import numpy as np
+
+from indicators_njit import (
+    MACD_STATE_SIZE,
+    ST_STATE_SIZE,
+    adx_step,
+    macd_step,
+    new_adx_state,
+    new_macd_state,
+    new_supertrend_state,
+    supertrend_step,
+    update_indicators,
+    update_st_macd as _update_st_macd,
+    update_st_macd_rows as _update_st_macd_rows,
+)
 
 logger = logging.getLogger(__name__)
 
+
+def _copy_with_state(self, memo=None):
+    """__deepcopy__ for the kernel-backed indicators: scalar attributes plus a copy of `_state`."""
+    new = self.__class__.__new__(self.__class__)
+    new.__dict__.update(self.__dict__)
+    new._state = self._state.copy()
+    return new
+
+
 class SuperTrend:
+    # Class-level defaults so callers can read these attributes directly
+    value: Optional[float] = None
+    direction: int = 1
+
     def __init__(self, period=7, multiplier=4):
         self.period = period
         self.multiplier = multiplier
-        self.candles = []
-        self.atr_values = []
-        self.supertrend_values = []
-        self.direction = 1  # 1 = GREEN (bullish), -1 = RED (bearish)
+        self.reset()
     
     def reset(self):
         """Reset indicator state"""
-        self.candles = []
-        self.atr_values = []
-        self.supertrend_values = []
-        self.direction = 1
+        self._state = new_supertrend_state(self.period, self.multiplier)
+        self.value = None
+        self.direction = 1  # 1 = GREEN (bullish), -1 = RED (bearish)
+
+    __deepcopy__ = _copy_with_state
+    
+    def _apply(self, value, direction):
+        if direction == 0:
+            return None, None
+        self.value = float(value)
+        self.direction = int(direction)
+        signal = "GREEN" if self.direction == 1 else "RED"
+        return self.value, signal
     
     def add_candle(self, high, low, close):
         """Add a new candle and calculate SuperTrend"""
-        self.candles.append({'high': high, 'low': low, 'close': close})
-        
-        if len(self.candles) < self.period:
-            return None, None
-        
-        # Calculate True Range
-        tr = max(
-            high - low,
-            abs(high - self.candles[-2]['close']) if len(self.candles) > 1 else 0,
-            abs(low - self.candles[-2]['close']) if len(self.candles) > 1 else 0
-        )
-        
-        # Calculate ATR
-        if len(self.atr_values) == 0:
-            # Initial ATR is simple average of TR
-            trs = []
-            for i in range(max(0, len(self.candles) - self.period), len(self.candles)):
-                if i > 0:
-                    prev = self.candles[i-1]
-                    curr = self.candles[i]
-                    tr_val = max(
-                        curr['high'] - curr['low'],
-                        abs(curr['high'] - prev['close']),
-                        abs(curr['low'] - prev['close'])
-                    )
-                else:
-                    tr_val = self.candles[i]['high'] - self.candles[i]['low']
-                trs.append(tr_val)
-            atr = sum(trs) / len(trs) if trs else 0
-        else:
-            atr = (self.atr_values[-1] * (self.period - 1) + tr) / self.period
-        
-        self.atr_values.append(atr)
-        
-        # Calculate basic upper and lower bands
-        hl2 = (high + low) / 2
-        basic_upper = hl2 + (self.multiplier * atr)
-        basic_lower = hl2 - (self.multiplier * atr)
-        
-        # Final bands calculation
-        if len(self.supertrend_values) == 0:
-            final_upper = basic_upper
-            final_lower = basic_lower
-        else:
-            prev = self.supertrend_values[-1]
-            prev_close = self.candles[-2]['close']
-            
-            final_lower = basic_lower if basic_lower > prev['lower'] or prev_close < prev['lower'] else prev['lower']
-            final_upper = basic_upper if basic_upper < prev['upper'] or prev_close > prev['upper'] else prev['upper']
-        
-        # Direction
-        if len(self.supertrend_values) == 0:
-            # Initialize direction using the common convention:
-            # if price is above the (lower) band, trend is bullish (GREEN).
-            # Using close > final_upper here would almost always mark the first value as bearish.
-            direction = 1 if close >= final_lower else -1
-        else:
-            prev = self.supertrend_values[-1]
-            if prev['direction'] == 1:
-                direction = -1 if close < final_lower else 1
-            else:
-                direction = 1 if close > final_upper else -1
-        
-        self.direction = direction
-        supertrend_value = final_lower if direction == 1 else final_upper
-        
-        self.supertrend_values.append({
-            'upper': final_upper,
-            'lower': final_lower,
-            'value': supertrend_value,
-            'direction': direction
-        })
-        
-        # Keep only last 100 values
-        if len(self.candles) > 100:
-            self.candles = self.candles[-100:]
-            self.atr_values = self.atr_values[-100:]
-            self.supertrend_values = self.supertrend_values[-100:]
-        
-        signal = "GREEN" if direction == 1 else "RED"
-        return supertrend_value, signal
+        return self._apply(*supertrend_step(self._state, float(high), float(low), float(close)))
 
 class RSI:
     """Relative Strength Index Indicator"""
     def __init__(self, period=14):
         self.period = period
-        self.closes = []
-        self.rsi_values = []
+        self.reset()
     
     def reset(self):
-        self.closes = []
+        # Only the last `period` changes are averaged
+        self.closes = deque(maxlen=self.period + 1)
         self.rsi_values = []
     
     def add_candle(self, high, low, close):
@@ -124,14 +82,17 @@ class RSI:
         # Calculate gains and losses
         gains = []
         losses = []
-        for i in range(1, len(self.closes)):
-            change = self.closes[i] - self.closes[i-1]
-            gains.append(max(0, change))
-            losses.append(max(0, -change))
+        prev = None
+        for c in self.closes:
+            if prev is not None:
+                change = c - prev
+                gains.append(max(0, change))
+                losses.append(max(0, -change))
+            prev = c
         
         # Average gain and loss
-        avg_gain = sum(gains[-self.period:]) / self.period if self.period > 0 else 0
-        avg_loss = sum(losses[-self.period:]) / self.period if self.period > 0 else 0
+        avg_gain = sum(gains) / self.period if self.period > 0 else 0
+        avg_loss = sum(losses) / self.period if self.period > 0 else 0
         
         # RS and RSI
         rs = avg_gain / avg_loss if avg_loss > 0 else 0
@@ -152,65 +113,40 @@ class RSI:
 
 class MACD:
     """Moving Average Convergence Divergence"""
+    last_macd: Optional[float] = None
+    last_signal_line: Optional[float] = None
+    last_histogram: Optional[float] = None
+
     def __init__(self, fast=12, slow=26, signal=9):
         self.fast = fast
         self.slow = slow
         self.signal_period = signal
-        self.closes = []
-        self.macd_values = []
-        self.last_signal_line = None
-        self.last_histogram = None
+        self.reset()
     
     def reset(self):
-        self.closes = []
-        self.macd_values = []
+        self._state = new_macd_state(self.fast, self.slow, self.signal_period)
+        self.last_macd = None
         self.last_signal_line = None
         self.last_histogram = None
+
+    __deepcopy__ = _copy_with_state
     
-    def _ema(self, values, period):
-        """Calculate Exponential Moving Average"""
-        if len(values) < period:
-            return None
-        
-        if len(values) == period:
-            return sum(values[-period:]) / period
-        
-        alpha = 2 / (period + 1)
-        ema = sum(values[-period:]) / period
-        for val in values[-len(values)+period:]:
-            ema = val * alpha + ema * (1 - alpha)
-        return ema
-    
-    def add_candle(self, high, low, close):
-        """Add candle and calculate MACD"""
-        self.closes.append(close)
-        
-        if len(self.closes) < self.slow + self.signal_period:
-            return None, None
-        
-        # Calculate EMAs
-        fast_ema = self._ema(self.closes, self.fast)
-        slow_ema = self._ema(self.closes, self.slow)
-        
-        if fast_ema is None or slow_ema is None:
+    def _apply(self, macd, signal_line):
+        if math.isnan(macd):
             return None, None
+        macd = float(macd)
+        signal_line = float(signal_line)
+        prev_macd = self.last_macd
         
-        macd = fast_ema - slow_ema
-        signal_line = self._ema([self._ema(self.closes[:i], self.fast) - self._ema(self.closes[:i], self.slow) 
-                                 for i in range(self.slow, len(self.closes) + 1)], self.signal_period)
-        
-        self.macd_values.append(macd)
+        self.last_macd = macd
         self.last_signal_line = signal_line
-        try:
-            self.last_histogram = macd - signal_line
-        except Exception:
-            self.last_histogram = None
+        self.last_histogram = macd - signal_line
         
         # Signal: GREEN if MACD crosses above signal line, RED if below
-        if len(self.macd_values) > 1:
-            if self.macd_values[-2] < signal_line and macd > signal_line:
+        if prev_macd is not None:
+            if prev_macd < signal_line and macd > signal_line:
                 signal = "GREEN"
-            elif self.macd_values[-2] > signal_line and macd < signal_line:
+            elif prev_macd > signal_line and macd < signal_line:
                 signal = "RED"
             else:
                 signal = None
@@ -218,6 +154,10 @@ class MACD:
             signal = None
         
         return macd, signal
+    
+    def add_candle(self, high, low, close):
+        """Add candle and calculate MACD"""
+        return self._apply(*macd_step(self._state, float(close)))
 
 
 class MovingAverage:
@@ -277,11 +217,10 @@ class BollingerBands:
     def __init__(self, period=20, num_std=2):
         self.period = period
         self.num_std = num_std
-        self.closes = []
-        self.bands = []
+        self.reset()
     
     def reset(self):
-        self.closes = []
+        self.closes = deque(maxlen=self.period)
         self.bands = []
     
     def add_candle(self, high, low, close):
@@ -291,9 +230,9 @@ class BollingerBands:
         if len(self.closes) < self.period:
             return None, None
         
-        # Calculate SMA and std dev
-        sma = sum(self.closes[-self.period:]) / self.period
-        variance = sum((c - sma) ** 2 for c in self.closes[-self.period:]) / self.period
+        # Calculate SMA and std dev (the window holds exactly `period` closes)
+        sma = sum(self.closes) / self.period
+        variance = sum((c - sma) ** 2 for c in self.closes) / self.period
         std_dev = variance ** 0.5
         
         upper = sma + (std_dev * self.num_std)
@@ -317,16 +256,14 @@ class Stochastic:
     def __init__(self, k_period=14, d_period=3):
         self.k_period = k_period
         self.d_period = d_period
-        self.highs = []
-        self.lows = []
-        self.closes = []
-        self.k_values = []
+        self.reset()
     
     def reset(self):
-        self.highs = []
-        self.lows = []
-        self.closes = []
-        self.k_values = []
+        # Rolling windows: %K looks back k_period candles, %D averages d_period %K values
+        self.highs = deque(maxlen=self.k_period)
+        self.lows = deque(maxlen=self.k_period)
+        self.closes = deque(maxlen=self.k_period)
+        self.k_values = deque(maxlen=self.d_period)
     
     def add_candle(self, high, low, close):
         """Add candle and calculate Stochastic"""
@@ -338,8 +275,8 @@ class Stochastic:
             return None, None
         
         # Calculate K%
-        highest = max(self.highs[-self.k_period:])
-        lowest = min(self.lows[-self.k_period:])
+        highest = max(self.highs)
+        lowest = min(self.lows)
         
         k = ((close - lowest) / (highest - lowest) * 100) if (highest - lowest) > 0 else 50
         self.k_values.append(k)
@@ -348,7 +285,7 @@ class Stochastic:
         if len(self.k_values) < self.d_period:
             return k, None
         
-        d = sum(self.k_values[-self.d_period:]) / self.d_period
+        d = sum(self.k_values) / self.d_period
         
         # Signal: GREEN if K < 20 (oversold), RED if K > 80 (overbought)
         if k < 20:
@@ -362,62 +299,117 @@ class Stochastic:
 
 
 class ADX:
-    """Average Directional Index - Trend Strength"""
+    """Average Directional Index - Trend Strength (Wilder)"""
     def __init__(self, period=14):
         self.period = period
-        self.highs = []
-        self.lows = []
-        self.closes = []
-        self.adx_values = []
+        self.reset()
     
     def reset(self):
-        self.highs = []
-        self.lows = []
-        self.closes = []
-        self.adx_values = []
+        self._state = new_adx_state(self.period)
+        self.value = None
+
+    __deepcopy__ = _copy_with_state
     
-    def add_candle(self, high, low, close):
-        """Add candle and calculate ADX"""
-        self.highs.append(high)
-        self.lows.append(low)
-        self.closes.append(close)
-        
-        if len(self.closes) < self.period + 1:
+    def _apply(self, adx):
+        if math.isnan(adx):
             return None, None
-        
-        # Calculate directional movements
-        plus_dm = max(0, high - self.highs[-2]) if len(self.highs) > 1 else 0
-        minus_dm = max(0, self.lows[-2] - low) if len(self.lows) > 1 else 0
-        
-        if plus_dm > minus_dm:
-            minus_dm = 0
-        elif minus_dm > plus_dm:
-            plus_dm = 0
-        
-        # Calculate ATR
-        tr = max(
-            high - low,
-            abs(high - self.closes[-2]) if len(self.closes) > 1 else 0,
-            abs(low - self.closes[-2]) if len(self.closes) > 1 else 0
-        )
-        
-        # Simple ADX calculation (simplified)
-        if len(self.closes) >= self.period * 2:
-            recent_high = max(self.highs[-self.period:])
-            recent_low = min(self.lows[-self.period:])
-            adx = abs(recent_high - recent_low) / (sum([max(self.highs[i] - self.lows[i], 
-                                                              abs(self.highs[i] - self.closes[i-1]) if i > 0 else 0,
-                                                              abs(self.lows[i] - self.closes[i-1]) if i > 0 else 0) 
-                                                        for i in range(-self.period, 0)]) / self.period + 0.001) * 100
-        else:
-            adx = 50  # Default middle value
-        
-        self.adx_values.append(adx)
+        self.value = float(adx)
         
         # Signal: GREEN if ADX > 25 (strong uptrend), RED if ADX < 25 but trending down
-        if adx > 25:
+        if self.value > 25:
             signal = "GREEN"  # Strong trend
         else:
             signal = "RED"  # Weak trend
         
-        return adx, signal
\ No newline at end of file
+        return self.value, signal
+    
+    def add_candle(self, high, low, close):
+        """Add candle and calculate ADX"""
+        return self._apply(adx_step(self._state, float(high), float(low), float(close)))
+
+
+def update_st_macd_adx(st, macd, adx, high, low, close):
+    """Feed one candle to SuperTrend, MACD and ADX in a single fused kernel call.
+
+    Returns the same tuples the individual add_candle() calls would:
+    ((st_value, st_signal), (macd, macd_signal), (adx, adx_signal)).
+    """
+    st_value, st_dir, macd_value, signal_line, adx_value = update_indicators(
+        st._state, macd._state, adx._state, float(high), float(low), float(close)
+    )
+    return st._apply(st_value, st_dir), macd._apply(macd_value, signal_line), adx._apply(adx_value)
+
+
+def update_st_macd(st, macd, high, low, close):
+    """Feed one candle to SuperTrend and MACD in a single fused kernel call.
+
+    Returns ((st_value, st_signal), (macd, macd_signal)), as the two add_candle() calls would.
+    """
+    st_value, st_dir, macd_value, signal_line = _update_st_macd(
+        st._state, macd._state, float(high), float(low), float(close)
+    )
+    return st._apply(st_value, st_dir), macd._apply(macd_value, signal_line)
+
+
+def stack_st_macd_states(pairs):
+    """Move the state of each (SuperTrend, MACD) pair into one row of two 2-D arrays.
+
+    Each indicator's state becomes a view of its row, so add_candle() / update_st_macd() keep
+    working on the object while update_st_macd_rows() advances every row in one kernel call.
+    Returns (st_states, macd_states); call again after an indicator is reset.
+    """
+    st_states = np.empty((len(pairs), ST_STATE_SIZE), dtype=np.float64)
+    macd_states = np.empty((len(pairs), MACD_STATE_SIZE), dtype=np.float64)
+    for row, (st, macd) in enumerate(pairs):
+        st_states[row] = st._state
+        macd_states[row] = macd._state
+        st._state = st_states[row]
+        macd._state = macd_states[row]
+    return st_states, macd_states
+
+
+def update_st_macd_rows(pairs, st_states, macd_states, ohlc, rows):
+    """Batched update_st_macd over the given rows of stack_st_macd_states() arrays.
+
+    `ohlc` holds one (open, high, low, close) candle per row. Returns one
+    ((st_value, st_signal), (macd, macd_signal)) result per entry of `rows`.
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    out = np.empty((len(rows), 4), dtype=np.float64)
+    _update_st_macd_rows(st_states, macd_states, ohlc, rows, out)
+    results = []
+    for row, (st_value, st_dir, macd_value, signal_line) in zip(rows.tolist(), out.tolist()):
+        st, macd = pairs[row]
+        results.append((st._apply(st_value, st_dir), macd._apply(macd_value, signal_line)))
+    return results
+
+
+# Scratch state for preview_st_macd (the bot loop is single-threaded)
+_PREVIEW_ST_STATE = np.empty(ST_STATE_SIZE, dtype=np.float64)
+_PREVIEW_MACD_STATE = np.empty(MACD_STATE_SIZE, dtype=np.float64)
+
+
+def preview_st_macd(st, macd, high, low, close):
+    """Non-mutating update_st_macd: the values if this (forming) candle closed now.
+
+    Runs the fused kernel on a scratch copy of the state arrays (no per-call allocation) instead
+    of deep-copying the indicator objects. Returns (st_value, st_direction, macd, macd_hist) with
+    the same carry-over rules as add_candle(): direction / histogram keep their last values while
+    warming up.
+    """
+    st_scratch, macd_scratch = _PREVIEW_ST_STATE, _PREVIEW_MACD_STATE
+    np.copyto(st_scratch, st._state)
+    np.copyto(macd_scratch, macd._state)
+    st_value, st_dir, macd_value, signal_line = _update_st_macd(
+        st_scratch, macd_scratch, float(high), float(low), float(close)
+    )
+    if st_dir == 0:
+        st_value, st_dir = None, st.direction
+    else:
+        st_value, st_dir = float(st_value), int(st_dir)
+    if math.isnan(macd_value):
+        macd_value, hist = None, macd.last_histogram
+    else:
+        macd_value = float(macd_value)
+        hist = macd_value - float(signal_line)
+    return st_value, st_dir, macd_value, hist
@@ -0,0 +1,353 @@
+# Incremental indicator kernels (SuperTrend / MACD / ADX)
+#
+# Each indicator keeps its running state in a small contiguous float64 array so
+# a candle update is O(1) and JIT-compiled by numba (a backend requirement).
+# The no-op fallback below only keeps the module importable for tooling and
+# tests in environments without numba; it is not a supported runtime path.
+import math
+
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:  # tooling/tests without numba
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+
+        def _decorate(fn):
+            return fn
+        return _decorate
+
+
+# SuperTrend state layout
+ST_PERIOD = 0
+ST_MULTIPLIER = 1
+ST_COUNT = 2
+ST_TR_SUM = 3
+ST_ATR = 4
+ST_UPPER = 5
+ST_LOWER = 6
+ST_DIR = 7
+ST_PREV_CLOSE = 8
+ST_STATE_SIZE = 9
+
+# MACD state layout
+MACD_FAST = 0
+MACD_SLOW = 1
+MACD_SIGNAL = 2
+MACD_COUNT = 3
+MACD_FAST_SUM = 4
+MACD_FAST_EMA = 5
+MACD_SLOW_SUM = 6
+MACD_SLOW_EMA = 7
+MACD_SIG_SUM = 8
+MACD_SIG_EMA = 9
+MACD_STATE_SIZE = 10
+
+# ADX state layout (Wilder smoothing)
+ADX_PERIOD = 0
+ADX_COUNT = 1
+ADX_PREV_HIGH = 2
+ADX_PREV_LOW = 3
+ADX_PREV_CLOSE = 4
+ADX_TR_S = 5
+ADX_PDM_S = 6
+ADX_MDM_S = 7
+ADX_DX_SUM = 8
+ADX_VALUE = 9
+ADX_STATE_SIZE = 10
+
+# Value reported while ADX itself is still warming up
+ADX_DEFAULT = 50.0
+
+
+def new_supertrend_state(period, multiplier):
+    state = np.zeros(ST_STATE_SIZE, dtype=np.float64)
+    state[ST_PERIOD] = period
+    state[ST_MULTIPLIER] = multiplier
+    return state
+
+
+def new_macd_state(fast, slow, signal):
+    state = np.zeros(MACD_STATE_SIZE, dtype=np.float64)
+    state[MACD_FAST] = fast
+    state[MACD_SLOW] = slow
+    state[MACD_SIGNAL] = signal
+    return state
+
+
+def new_adx_state(period):
+    state = np.zeros(ADX_STATE_SIZE, dtype=np.float64)
+    state[ADX_PERIOD] = period
+    return state
+
+
+@njit(cache=True)
+def supertrend_step(state, high, low, close):
+    """Advance SuperTrend by one candle.
+
+    Returns (value, direction); direction is 0 (and value NaN) until `period`
+    candles have been seen.
+    """
+    period = state[ST_PERIOD]
+    n = state[ST_COUNT] + 1.0
+    state[ST_COUNT] = n
+
+    prev_close = state[ST_PREV_CLOSE]
+    if n == 1.0:
+        tr = high - low
+    else:
+        tr = max(high - low, abs(high - prev_close), abs(low - prev_close))
+
+    if n < period:
+        state[ST_TR_SUM] += tr
+        state[ST_PREV_CLOSE] = close
+        return math.nan, 0.0
+
+    # Initial ATR is simple average of TR, then Wilder smoothing
+    if n == period:
+        state[ST_TR_SUM] += tr
+        atr = state[ST_TR_SUM] / period
+    else:
+        atr = (state[ST_ATR] * (period - 1.0) + tr) / period
+    state[ST_ATR] = atr
+
+    hl2 = (high + low) / 2.0
+    basic_upper = hl2 + state[ST_MULTIPLIER] * atr
+    basic_lower = hl2 - state[ST_MULTIPLIER] * atr
+
+    if n == period:
+        final_upper = basic_upper
+        final_lower = basic_lower
+        direction = 1.0 if close >= final_lower else -1.0
+    else:
+        prev_upper = state[ST_UPPER]
+        prev_lower = state[ST_LOWER]
+        final_lower = basic_lower if (basic_lower > prev_lower or prev_close < prev_lower) else prev_lower
+        final_upper = basic_upper if (basic_upper < prev_upper or prev_close > prev_upper) else prev_upper
+        if state[ST_DIR] == 1.0:
+            direction = -1.0 if close < final_lower else 1.0
+        else:
+            direction = 1.0 if close > final_upper else -1.0
+
+    state[ST_UPPER] = final_upper
+    state[ST_LOWER] = final_lower
+    state[ST_DIR] = direction
+    state[ST_PREV_CLOSE] = close
+    return (final_lower if direction == 1.0 else final_upper), direction
+
+
+@njit(cache=True)
+def macd_step(state, close):
+    """Advance MACD by one close.
+
+    Both EMAs and the signal line are seeded with the SMA of their first
+    `period` inputs. Returns (macd, signal_line); both NaN until
+    slow + signal closes have been seen.
+    """
+    fast = state[MACD_FAST]
+    slow = state[MACD_SLOW]
+    signal = state[MACD_SIGNAL]
+    n = state[MACD_COUNT] + 1.0
+    state[MACD_COUNT] = n
+
+    if n <= fast:
+        state[MACD_FAST_SUM] += close
+        if n == fast:
+            state[MACD_FAST_EMA] = state[MACD_FAST_SUM] / fast
+    else:
+        alpha = 2.0 / (fast + 1.0)
+        state[MACD_FAST_EMA] = close * alpha + state[MACD_FAST_EMA] * (1.0 - alpha)
+
+    if n <= slow:
+        state[MACD_SLOW_SUM] += close
+        if n == slow:
+            state[MACD_SLOW_EMA] = state[MACD_SLOW_SUM] / slow
+    else:
+        alpha = 2.0 / (slow + 1.0)
+        state[MACD_SLOW_EMA] = close * alpha + state[MACD_SLOW_EMA] * (1.0 - alpha)
+
+    if n < slow or n < fast:
+        return math.nan, math.nan
+
+    macd = state[MACD_FAST_EMA] - state[MACD_SLOW_EMA]
+
+    m = n - max(slow, fast) + 1.0
+    if m <= signal:
+        state[MACD_SIG_SUM] += macd
+        if m == signal:
+            state[MACD_SIG_EMA] = state[MACD_SIG_SUM] / signal
+    else:
+        alpha = 2.0 / (signal + 1.0)
+        state[MACD_SIG_EMA] = macd * alpha + state[MACD_SIG_EMA] * (1.0 - alpha)
+
+    if n < slow + signal:
+        return math.nan, math.nan
+    return macd, state[MACD_SIG_EMA]
+
+
+@njit(cache=True)
+def adx_step(state, high, low, close):
+    """Advance ADX (Wilder) by one candle.
+
+    Returns NaN until period + 1 candles, then ADX_DEFAULT until enough DX
+    values exist to seed the ADX average.
+    """
+    period = state[ADX_PERIOD]
+    n = state[ADX_COUNT] + 1.0
+    state[ADX_COUNT] = n
+
+    prev_high = state[ADX_PREV_HIGH]
+    prev_low = state[ADX_PREV_LOW]
+    prev_close = state[ADX_PREV_CLOSE]
+    state[ADX_PREV_HIGH] = high
+    state[ADX_PREV_LOW] = low
+    state[ADX_PREV_CLOSE] = close
+    if n == 1.0:
+        return math.nan
+
+    plus_dm = max(0.0, high - prev_high)
+    minus_dm = max(0.0, prev_low - low)
+    if plus_dm > minus_dm:
+        minus_dm = 0.0
+    elif minus_dm > plus_dm:
+        plus_dm = 0.0
+    tr = max(high - low, abs(high - prev_close), abs(low - prev_close))
+
+    k = n - 1.0
+    if k <= period:
+        state[ADX_TR_S] += tr
+        state[ADX_PDM_S] += plus_dm
+        state[ADX_MDM_S] += minus_dm
+    else:
+        state[ADX_TR_S] = state[ADX_TR_S] - state[ADX_TR_S] / period + tr
+        state[ADX_PDM_S] = state[ADX_PDM_S] - state[ADX_PDM_S] / period + plus_dm
+        state[ADX_MDM_S] = state[ADX_MDM_S] - state[ADX_MDM_S] / period + minus_dm
+
+    if k < period:
+        return math.nan
+
+    tr_s = state[ADX_TR_S]
+    plus_di = 100.0 * state[ADX_PDM_S] / tr_s if tr_s > 0.0 else 0.0
+    minus_di = 100.0 * state[ADX_MDM_S] / tr_s if tr_s > 0.0 else 0.0
+    di_sum = plus_di + minus_di
+    dx = 100.0 * abs(plus_di - minus_di) / di_sum if di_sum > 0.0 else 0.0
+
+    j = k - period + 1.0
+    if j < period:
+        state[ADX_DX_SUM] += dx
+        return ADX_DEFAULT
+    if j == period:
+        state[ADX_DX_SUM] += dx
+        state[ADX_VALUE] = state[ADX_DX_SUM] / period
+    else:
+        state[ADX_VALUE] = (state[ADX_VALUE] * (period - 1.0) + dx) / period
+    return state[ADX_VALUE]
+
+
+@njit(cache=True)
+def update_indicators(st_state, macd_state, adx_state, high, low, close):
+    """Fused SuperTrend + MACD + ADX update for one candle.
+
+    Returns (st_value, st_direction, macd, signal_line, adx).
+    """
+    st_value, st_direction = supertrend_step(st_state, high, low, close)
+    macd, signal_line = macd_step(macd_state, close)
+    adx = adx_step(adx_state, high, low, close)
+    return st_value, st_direction, macd, signal_line, adx
+
+
+@njit(cache=True)
+def update_st_macd(st_state, macd_state, high, low, close):
+    """Fused SuperTrend + MACD update for one option candle (no ADX).
+
+    Returns (st_value, st_direction, macd, signal_line).
+    """
+    st_value, st_direction = supertrend_step(st_state, high, low, close)
+    macd, signal_line = macd_step(macd_state, close)
+    return st_value, st_direction, macd, signal_line
+
+
+@njit(cache=True)
+def update_st_macd_rows(st_states, macd_states, ohlc, rows, out):
+    """update_st_macd for many contracts in one call.
+
+    st_states / macd_states hold one indicator state per row and ohlc one
+    (open, high, low, close) candle per row. Only the listed rows advance;
+    out[i] receives (st_value, st_direction, macd, signal_line) for rows[i].
+    """
+    for i in range(rows.shape[0]):
+        r = rows[i]
+        high = ohlc[r, 1]
+        low = ohlc[r, 2]
+        close = ohlc[r, 3]
+        st_value, st_direction = supertrend_step(st_states[r], high, low, close)
+        macd, signal_line = macd_step(macd_states[r], close)
+        out[i, 0] = st_value
+        out[i, 1] = st_direction
+        out[i, 2] = macd
+        out[i, 3] = signal_line
+
+
+@njit(cache=True)
+def ohlc_update_at(ohlc, base, ltp):
+    """Fold one tick into the O,H,L,C block starting at ohlc[base]; open 0.0 means empty.
+
+    Written as selects rather than if-blocks so the JIT emits branchless
+    min/max on noisy quote feeds.
+    """
+    o = ohlc[base]
+    h = ohlc[base + 1]
+    l = ohlc[base + 2]
+    ohlc[base] = ltp if o == 0.0 else o
+    ohlc[base + 1] = ltp if ltp > h else h
+    ohlc[base + 2] = ltp if ltp < l else l
+    ohlc[base + 3] = ltp
+
+
+@njit(cache=True)
+def trail_stop_level(side, entry, best_points, stoploss_points, trail_start, trail_step):
+    """Effective stop of a points-based position; side is +1.0 (CE) or -1.0 (PE).
+
+    Combines the fixed initial SL and the step-trailing level (entry moved by
+    whole trail steps past trail_start). Returns (stop, is_trailing); stop is
+    NaN when neither is active.
+    """
+    initial = math.nan
+    if stoploss_points > 0.0:
+        initial = entry - side * stoploss_points
+
+    trailing = math.nan
+    if trail_start > 0.0 and trail_step > 0.0 and best_points >= trail_start:
+        steps = math.floor((best_points - trail_start) / trail_step)
+        trailing = entry + side * steps * trail_step
+
+    if math.isnan(initial):
+        return trailing, not math.isnan(trailing)
+    if math.isnan(trailing):
+        return initial, False
+    stop = max(initial, trailing) if side > 0.0 else min(initial, trailing)
+    return stop, stop == trailing
+
+
+def warmup_kernels():
+    """Compile (or load from cache) the kernels before the first live candle."""
+    update_indicators(
+        new_supertrend_state(7, 4.0),
+        new_macd_state(12, 26, 9),
+        new_adx_state(14),
+        1.0,
+        1.0,
+        1.0,
+    )
+    update_st_macd(new_supertrend_state(7, 4.0), new_macd_state(12, 26, 9), 1.0, 1.0, 1.0)
+    update_st_macd_rows(
+        new_supertrend_state(7, 4.0)[None, :],
+        new_macd_state(12, 26, 9)[None, :],
+        np.ones((1, 4)),
+        np.zeros(1, dtype=np.int64),
+        np.empty((1, 4)),
+    )
+    ohlc_update_at(np.array([0.0, 0.0, math.inf, 0.0]), 0, 1.0)
+    trail_stop_level(1.0, 1.0, 1.0, 1.0, 1.0, 1.0)
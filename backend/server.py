@@ -7,19 +7,26 @@ from fastapi.responses import JSONResponse
 from starlette.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 import asyncio
+import json
 import logging
 from pathlib import Path
 from datetime import datetime, timezone
 from typing import List
 
+try:
+    import orjson
+except ImportError:  # tooling/tests without orjson; requirements.txt installs it
+    orjson = None
+
 # Local imports
 from config import ROOT_DIR, bot_state, config
 from models import ConfigUpdate, BacktestRequest, DhanCandleImportRequest
-from database import init_db, load_config, get_trades, get_trade_analytics, get_candle_data_for_backtest, get_candle_data_stats, bulk_insert_candle_data
+from database import init_db, load_config, flush_trade_writes, get_trades, get_trade_analytics, get_candle_data_for_backtest, get_candle_data_stats, bulk_insert_candle_data
 import bot_service
 from backtest import run_backtest
 from dhan_history import DhanHistoryClient
 from indices import get_index_config
+from indicators_njit import warmup_kernels
 from time_utils import iso_to_ist_iso
 
 # Configure logging
@@ -52,11 +59,21 @@ class ConnectionManager:
             self.active_connections.remove(websocket)
 
     async def broadcast(self, message: dict):
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(message)
-            except Exception as e:
-                logger.error(f"[WS] Broadcast error: {e}")
+        if not self.active_connections:
+            return
+        # Serialize once for all clients
+        if orjson is not None:
+            text = orjson.dumps(message).decode()
+        else:
+            text = json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+        # Send to all clients concurrently so one slow socket doesn't delay the rest
+        results = await asyncio.gather(
+            *(connection.send_text(text) for connection in list(self.active_connections)),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error(f"[WS] Broadcast error: {result}")
 
 
 manager = ConnectionManager()
@@ -67,12 +84,15 @@ manager = ConnectionManager()
 async def lifespan(app: FastAPI):
     await init_db()
     await load_config()
+    # Compile indicator kernels up front so the first candle close doesn't stall
+    warmup_kernels()
     logger.info(
         f"[STARTUP] Database initialized, config loaded. "
         f"Index={config.get('selected_index', 'NIFTY')}, "
         f"Strategy={config.get('strategy_mode', 'agent')}"
     )
     yield
+    await flush_trade_writes()
     logger.info("[SHUTDOWN] Server shutting down")
 
 
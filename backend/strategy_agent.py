@@ -15,8 +15,10 @@ class AgentAction(str, Enum):
 PositionSide = Literal["CE", "PE"]
 
 
-@dataclass(frozen=True)
+@dataclass(slots=True)
 class AgentInputs:
+    """Per-candle agent inputs. Mutable so callers can reuse one instance per stream."""
+
     timestamp: str
     open: float
     high: float
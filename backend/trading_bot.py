@@ -3,28 +3,182 @@ Handles all trading logic, signal processing, and order execution.
 Uses structured logging with tags for easy troubleshooting.
 """
 import asyncio
-import copy
-from collections import deque
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from typing import NamedTuple
 from datetime import datetime, timezone, timedelta
 import logging
-import random
-import json
 import time
 from pathlib import Path
 
+import numpy as np
+
 from config import bot_state, config, DB_PATH
 from indices import get_index_config, round_to_strike
-from utils import get_ist_time, is_market_open, can_take_new_trade, should_force_squareoff, format_timeframe
-from indicators import SuperTrend, MACD
+from utils import ENTRY_CUTOFF, ENTRY_START, get_ist_time, session_gates, seconds_until_ist, format_timeframe, round_to_tick
+from indicators import SuperTrend, MACD, preview_st_macd, stack_st_macd_states, update_st_macd, update_st_macd_rows
+from indicators_njit import njit, ohlc_update_at
 from dhan_api import DhanAPI
-from database import save_trade, update_trade_exit
+from database import flush_trade_writes, queue_trade, queue_trade_exit, start_trade_writer
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass(slots=True)
+class Position:
+    """Open option position held by the bot (published to bot_state as a dict)."""
+
+    trade_id: str
+    option_type: str
+    strike: int
+    expiry: str
+    security_id: str
+    index_name: str
+    entry_time: str
+
+
+class ExitDecision(NamedTuple):
+    """Exit found on a tick: close_position(price, pnl, reason) arguments."""
+
+    price: float
+    pnl: float
+    reason: str
+
+
+_INF = float('inf')
+_NAN = float('nan')
+
+# Single-contract option candle layout in TradingBot._opt_ohlc
+CE_O, CE_H, CE_L, CE_C, PE_O, PE_H, PE_L, PE_C = range(8)
+_OPT_OHLC_RESET = np.array([0.0, 0.0, _INF, 0.0, 0.0, 0.0, _INF, 0.0])
+# Empty (open, high, low, close) for per-contract tracker candles
+_RESET_OHLC = (0.0, 0.0, _INF, 0.0)
+# Last three MACD histograms (oldest first); NaN slots fail every comparison
+_EMPTY_HIST3 = (_NAN, _NAN, _NAN)
+# While the ATM strike is unchanged, re-validate the universe (expiry roll) this often
+_UNIVERSE_RECHECK_SEC = 60.0
+# Longest the loop waits for a pushed tick before polling quotes itself
+_POLL_INTERVAL_SEC = 1.0
+# Minimum gap between option-chain LTP fallbacks for the same contract: the default,
+# after a fallback that returned a price, and once it has come back empty
+# _FALLBACK_ILLIQUID_AFTER times in a row (illiquid strike)
+_FALLBACK_THROTTLE_SEC = 2.0
+_FALLBACK_LIVE_SEC = 0.5
+_FALLBACK_ILLIQUID_SEC = 5.0
+_FALLBACK_ILLIQUID_AFTER = 3
+# Circuit breaker: after this many fallback rounds in a row without a single price
+# (broker degraded), skip all fallbacks for the cool-down
+_FALLBACK_BREAKER_ROUNDS = 5
+_FALLBACK_BREAKER_COOLDOWN_SEC = 30.0
+# A contract's last known LTP stands in for a missing batch quote for this long
+_LTP_CACHE_TTL_SEC = 0.5
+# An unchanged state is still re-broadcast this often, as a heartbeat for the UI
+_STATE_HEARTBEAT_SEC = 5.0
+# Resolution of the WS payload timestamp (ISO string reused between refreshes)
+_STATE_TS_REFRESH_SEC = 0.25
+# WS payload keys of the per-tick tuple built in broadcast_state (same order)
+_STATE_TICK_FIELDS = (
+    "index_ltp", "current_option_ltp", "trailing_sl",
+    "is_running", "mode", "selected_index",
+    "candle_interval", "strategy_mode",
+    "signal_ce_ltp", "signal_pe_ltp",
+    "signal_ce_supertrend_signal", "signal_pe_supertrend_signal",
+    "signal_ce_supertrend_value", "signal_pe_supertrend_value",
+    "signal_ce_macd_value", "signal_pe_macd_value",
+    "signal_ce_macd_hist", "signal_pe_macd_hist",
+)
+
+
+@dataclass(slots=True)
+class OptionTracker:
+    """Per-contract ST+MACD indicators and last candle-close readings for the option universe."""
+
+    strike: int
+    option_type: str
+    expiry: str
+    st: SuperTrend
+    macd: MACD
+    security_id: str | None = None
+    last_macd_value: float | None = None
+    # Last three MACD histograms (oldest first)
+    hist3: tuple[float, float, float] = _EMPTY_HIST3
+    last_st_value: float | None = None
+    last_st_dir: int | None = None
+    last_hist: float | None = None
+
+
+# server imports bot_service -> trading_bot, so the WebSocket manager is resolved lazily once
+_ws_manager = None
+
+
+def _get_ws_manager():
+    """Get the server's WebSocket ConnectionManager (cached after first use)"""
+    global _ws_manager
+    if _ws_manager is None:
+        from server import manager
+        _ws_manager = manager
+    return _ws_manager
+
+
+# Per-side UI fields: (supertrend value, supertrend signal, macd value, macd hist)
+_SIGNAL_KEYS = {
+    'CE': ('signal_ce_supertrend_value', 'signal_ce_supertrend_signal', 'signal_ce_macd_value', 'signal_ce_macd_hist'),
+    'PE': ('signal_pe_supertrend_value', 'signal_pe_supertrend_signal', 'signal_pe_macd_value', 'signal_pe_macd_hist'),
+}
+
+def _as_sid(value) -> int | None:
+    """Broker security ID as an int, or None for empty / non-numeric (e.g. SIM_) IDs."""
+    s = str(value or '')
+    return int(s) if s.isdigit() else None
+
+
+@lru_cache(maxsize=256)
+def _sim_security_id(index_name: str, strike: int, option_type: str) -> str:
+    """Placeholder security ID for paper contracts the broker could not resolve."""
+    return f"SIM_{index_name}_{strike}_{option_type}"
+
+
+# Paper-mode simulated option pricing
+_PAPER_TICK_MOVES = np.array([-0.10, -0.05, 0.0, 0.05, 0.10])
+_PAPER_TICK_BATCH = 1024
+
+
+@njit(cache=True)
+def _simulated_option_ltp(index_ltp, strike, is_ce, tick_move):
+    """Intrinsic value + linearly decaying ATM time value, plus tick noise, snapped to 0.05."""
+    intrinsic = max(0.0, index_ltp - strike) if is_ce else max(0.0, strike - index_ltp)
+    time_decay_factor = max(0.0, 1.0 - abs(index_ltp - strike) / 500.0)
+    ltp = intrinsic + 150.0 * time_decay_factor + tick_move
+    return ((ltp * 20.0 + 0.5) // 1.0) / 20.0
+
+
 class TradingBot:
     """Main trading bot engine"""
-    
+
+    # One long-lived instance read on every tick: slots keep attribute access off a dict
+    __slots__ = (
+        'running', 'task', 'dhan', 'current_position', 'entry_price', 'trailing_sl',
+        'highest_profit', '_qty', 'fixed_option_strike', 'fixed_option_expiry',
+        'fixed_ce_security_id', 'fixed_pe_security_id', '_fixed_ids_key', '_fixed_ids',
+        'option_universe_center_strike', 'option_universe_expiry', 'option_universe_contracts',
+        '_opt_trackers', '_tracker_pool', '_opt_fallback_due', '_opt_fallback_misses',
+        '_fallback_failed_rounds', '_fallback_open_until', '_ltp_cache', 'opt_ce_st',
+        'opt_ce_macd', 'opt_pe_st', 'opt_pe_macd', '_opt_ce_last_macd_value',
+        '_opt_pe_last_macd_value', '_opt_ce_hist3', '_opt_pe_hist3',
+        '_opt_ce_last_st_direction', '_opt_pe_last_st_direction', '_opt_ohlc', '_last_ce_tick',
+        '_last_pe_tick', '_preview_key', 'last_exit_candle_time', '_last_trade_mono',
+        '_next_daily_reset_mono', '_rng', '_paper_tick_moves', '_paper_tick_idx', '_tick_event',
+        '_state_template', '_state_template_dirty', '_last_state_tick', '_state_heartbeat_mono',
+        '_state_ts_iso', '_state_ts_mono', '_cfg_daily_max_loss', '_cfg_max_loss_per_trade',
+        '_cfg_target_points', '_cfg_initial_sl', '_cfg_trail_start', '_cfg_trail_step',
+        '_cfg_min_trade_gap', '_cfg_max_trades_per_day', '_cfg_risk_per_trade',
+        '_ltp_exit_floor', '_ltp_target', '_trail_levels', '_next_trail_profit',
+        '_trail_peak_ltp', '_last_tick_exit_key', '_st_macd_mode', '_universe_key',
+        '_universe_recheck_mono', '_uni_index', '_uni_trackers', '_uni_sids', '_uni_ohlc',
+        '_uni_pairs', '_uni_st_states', '_uni_macd_states', '_poll_option_quotes',
+        '_close_option_candle',
+    )
+
     def __init__(self):
         self.running = False
         self.task = None
@@ -33,22 +187,37 @@ class TradingBot:
         self.entry_price = 0.0
         self.trailing_sl = None
         self.highest_profit = 0.0
+        # Lots x lot size used for P&L checks, fixed at entry
+        self._qty = 0
+        self.refresh_risk_config()
 
         self.fixed_option_strike = None
         self.fixed_option_expiry = None
         self.fixed_ce_security_id = None
         self.fixed_pe_security_id = None
+        # Parsed (ce_sid, pe_sid, quote ids) for the fixed contract, keyed by the raw ID strings
+        self._fixed_ids_key: tuple | None = None
+        self._fixed_ids: tuple[int | None, int | None, list[int]] = (None, None, [])
 
         # Optional multi-strike option universe (strike band around ATM)
         self.option_universe_center_strike = None
         self.option_universe_expiry = None
         # {strike: {'CE': sid, 'PE': sid}}
-        self.option_universe_contracts: dict[int, dict[str, str]] = {}
-
-        # Per-contract indicator + candle state (keyed by "{strike}:{CE|PE}")
-        self._opt_trackers: dict[str, dict] = {}
-        # Throttle option-chain fallback calls per contract
-        self._opt_fallback_last_ts: dict[str, float] = {}
+        self.option_universe_contracts: dict[int, dict[str, int | None]] = {}
+
+        # Per-contract indicator state, keyed by (strike, 'CE'|'PE')
+        self._opt_trackers: dict[tuple[int, str], OptionTracker] = {}
+        # Evicted trackers kept for reuse when the ATM band rolls
+        self._tracker_pool: list[OptionTracker] = []
+        self._clear_universe_rows()
+        # Throttle option-chain fallback calls per contract: time.monotonic() the next call is
+        # allowed, and how many fallbacks in a row came back without a price
+        self._opt_fallback_due: dict[tuple[int, str], float] = {}
+        self._opt_fallback_misses: dict[tuple[int, str], int] = {}
+        self._fallback_failed_rounds = 0
+        self._fallback_open_until = 0.0
+        # Last good LTP per security ID: (tick-rounded LTP, time.monotonic())
+        self._ltp_cache: dict[int, tuple[float, float]] = {}
 
         # Separate option-candle indicators
         self.opt_ce_st = None
@@ -58,32 +227,58 @@ class TradingBot:
 
         self._opt_ce_last_macd_value = None
         self._opt_pe_last_macd_value = None
-        self._opt_ce_hist_window = deque(maxlen=3)
-        self._opt_pe_hist_window = deque(maxlen=3)
+        self._opt_ce_hist3 = _EMPTY_HIST3
+        self._opt_pe_hist3 = _EMPTY_HIST3
         self._opt_ce_last_st_direction = None
         self._opt_pe_last_st_direction = None
 
-        # Option candle builder state
-        self._ce_open = 0.0
-        self._ce_high = 0.0
-        self._ce_low = float('inf')
-        self._ce_close = 0.0
-
-        self._pe_open = 0.0
-        self._pe_high = 0.0
-        self._pe_low = float('inf')
-        self._pe_close = 0.0
+        # Option candle builder state: CE OHLC + PE OHLC in one contiguous array
+        self._opt_ohlc = _OPT_OHLC_RESET.copy()
+        # Last LTP folded into each side; repeated quotes don't change the candle
+        self._last_ce_tick = 0.0
+        self._last_pe_tick = 0.0
+        # (CE candle, PE candle) the live preview was last computed for; None after every
+        # candle reset, since the indicator state only moves when the candles are reset
+        self._preview_key = None
         self.last_exit_candle_time = None
-        self.last_trade_time = None  # For min_trade_gap protection
-        self._last_daily_reset_date = None  # IST date when daily reset last ran
+        self._last_trade_mono = 0.0  # time.monotonic() of the last entry, for min_trade_gap protection
+        # time.monotonic() deadline of the next 9:15 IST daily reset
+        self._next_daily_reset_mono = time.monotonic() + seconds_until_ist(9, 15)
+
+        # Paper-mode tick noise, drawn in numpy batches and kept as Python floats
+        self._rng = np.random.default_rng()
+        self._paper_tick_moves = self._rng.choice(_PAPER_TICK_MOVES, size=_PAPER_TICK_BATCH).tolist()
+        self._paper_tick_idx = 0
+
+        # Set when fresh quotes land outside the loop so it wakes before the 1s poll interval
+        self._tick_event = asyncio.Event()
+        # Per-mode loop steps (re-bound by reset_indicator when the universe config changes)
+        self._bind_loop_mode()
+
+        # Reused WS payload; slow-changing fields are only refreshed when marked dirty
+        self._state_template = {"type": "state_update", "data": {}}
+        self._state_template_dirty = True
+        # Per-tick fields of the last broadcast; an identical snapshot is not re-sent
+        self._last_state_tick = None
+        self._state_heartbeat_mono = 0.0
+        # Payload timestamp, re-rendered at most every _STATE_TS_REFRESH_SEC
+        self._state_ts_iso = ''
+        self._state_ts_mono = -_INF
         self.apply_strategy_config()
-
-        # Keep bot_state strategy_mode in sync for API/WS
-        bot_state['strategy_mode'] = 'st_macd_hist'
     
     def initialize_dhan(self):
         """Initialize Dhan API connection"""
         if config['dhan_access_token'] and config['dhan_client_id']:
+            # Reuse the existing client (warm keep-alive connection + expiry/secid/chain caches)
+            # unless the credentials changed.
+            if (
+                self.dhan
+                and self.dhan.access_token == config['dhan_access_token']
+                and self.dhan.client_id == config['dhan_client_id']
+            ):
+                return True
+            if self.dhan:
+                self.dhan.close()
             self.dhan = DhanAPI(config['dhan_access_token'], config['dhan_client_id'])
             logger.info("[MARKET] Dhan API initialized")
             return True
@@ -103,11 +298,12 @@ class TradingBot:
             self.opt_pe_macd.reset()
 
         self.apply_strategy_config()
+        self._bind_loop_mode()
 
         self._opt_ce_last_macd_value = None
         self._opt_pe_last_macd_value = None
-        self._opt_ce_hist_window.clear()
-        self._opt_pe_hist_window.clear()
+        self._opt_ce_hist3 = _EMPTY_HIST3
+        self._opt_pe_hist3 = _EMPTY_HIST3
         self._opt_ce_last_st_direction = None
         self._opt_pe_last_st_direction = None
 
@@ -116,41 +312,116 @@ class TradingBot:
         self.fixed_option_expiry = None
         self.fixed_ce_security_id = None
         self.fixed_pe_security_id = None
-        bot_state['fixed_option_strike'] = None
-        bot_state['fixed_option_expiry'] = None
-        bot_state['fixed_ce_security_id'] = None
-        bot_state['fixed_pe_security_id'] = None
+        bot_state.fixed_option_strike = None
+        bot_state.fixed_option_expiry = None
+        bot_state.fixed_ce_security_id = None
+        bot_state.fixed_pe_security_id = None
 
         # Clear option universe
         self.option_universe_center_strike = None
         self.option_universe_expiry = None
         self.option_universe_contracts = {}
         self._opt_trackers = {}
-        self._opt_fallback_last_ts = {}
-        bot_state['option_universe_enabled'] = False
-        bot_state['option_universe_center_strike'] = None
-        bot_state['option_universe_expiry'] = None
-        bot_state['option_universe_strikes'] = []
-        bot_state['option_universe_contracts'] = {}
+        self._tracker_pool = []
+        self._clear_universe_rows()
+        self._opt_fallback_due = {}
+        self._opt_fallback_misses = {}
+        self._fallback_failed_rounds = 0
+        self._fallback_open_until = 0.0
+        self._ltp_cache = {}
+        bot_state.option_universe_enabled = False
+        bot_state.option_universe_center_strike = None
+        bot_state.option_universe_expiry = None
+        bot_state.option_universe_strikes = []
+        bot_state.option_universe_contracts = {}
+        self._state_template_dirty = True
 
         # Reset option candle builder
-        self._ce_open = 0.0
-        self._ce_high = 0.0
-        self._ce_low = float('inf')
-        self._ce_close = 0.0
-        self._pe_open = 0.0
-        self._pe_high = 0.0
-        self._pe_low = float('inf')
-        self._pe_close = 0.0
+        np.copyto(self._opt_ohlc, _OPT_OHLC_RESET)
+        self._last_ce_tick = 0.0
+        self._last_pe_tick = 0.0
+        self._preview_key = None
 
         logger.info(
             "[SIGNAL] Indicators reset (Strategy: ST+MACD Histogram)"
         )
 
+    def refresh_risk_config(self) -> None:
+        """Snapshot the exit/risk/entry settings read per tick and per candle (call after config changes)."""
+        self._cfg_daily_max_loss = config.get('daily_max_loss', 0)
+        self._cfg_max_loss_per_trade = config.get('max_loss_per_trade', 0)
+        self._cfg_target_points = config.get('target_points', 0)
+        self._cfg_initial_sl = config.get('initial_stoploss', 0)
+        self._cfg_trail_start = float(config.get('trail_start_profit', 0) or 0)
+        self._cfg_trail_step = float(config.get('trail_step', 0) or 0)
+        self._cfg_min_trade_gap = config.get('min_trade_gap', 0) or 0
+        self._cfg_max_trades_per_day = config.get('max_trades_per_day', 0)
+        self._cfg_risk_per_trade = config.get('risk_per_trade', 0)
+        self._sync_trail_levels()
+        self._refresh_exit_thresholds()
+
+    def _trade_gap_ok(self) -> bool:
+        """min_trade_gap protection: enough seconds have passed since the last entry (0 = disabled)."""
+        min_gap = self._cfg_min_trade_gap
+        if min_gap and self._last_trade_mono and (time.monotonic() - self._last_trade_mono) < min_gap:
+            return False
+        return True
+
+    def _refresh_exit_thresholds(self) -> None:
+        """Translate loss limits / target into absolute option-LTP levels for the open position.
+
+        Recomputed at entry, on risk-config refresh and when daily P&L is reset, so evaluate_tick_exit
+        can rule out those exits with two compares instead of P&L arithmetic.
+        """
+        qty = self._qty
+        if not self.current_position or qty <= 0:
+            self._ltp_exit_floor = -_INF
+            self._ltp_target = _INF
+            return
+        floor = -_INF
+        daily_max_loss = self._cfg_daily_max_loss
+        if daily_max_loss > 0:
+            floor = max(floor, self.entry_price - (daily_max_loss + bot_state.daily_pnl) / qty)
+        max_loss_per_trade = self._cfg_max_loss_per_trade
+        if max_loss_per_trade > 0:
+            floor = max(floor, self.entry_price - max_loss_per_trade / qty)
+        target_points = self._cfg_target_points
+        self._ltp_exit_floor = floor
+        self._ltp_target = self.entry_price + target_points if target_points > 0 else _INF
+
+    def _sync_trail_levels(self) -> None:
+        """Re-derive the trail-step counter from highest_profit (entry/exit/config change only)."""
+        trail_start = self._cfg_trail_start
+        trail_step = self._cfg_trail_step
+        levels = 0
+        if trail_step and trail_step > 0 and self.highest_profit > trail_start:
+            levels = int((self.highest_profit - trail_start) / trail_step)
+        self._trail_levels = levels
+        self._next_trail_profit = trail_start + (levels + 1) * (trail_step or 0)
+        # Highest LTP the trailing update has seen; reset so the next tick recomputes
+        self._trail_peak_ltp = -_INF
+        # Inputs of the last tick exit check; reset so the next tick is always evaluated
+        self._last_tick_exit_key = None
+
+    def _advance_trail_levels(self) -> int:
+        """Number of whole trail steps highest_profit is above trail_start_profit.
+
+        Only moves when a new high crosses the next boundary, so the common tick is one compare
+        instead of a float division.
+        """
+        trail_step = self._cfg_trail_step
+        if trail_step > 0:
+            while self.highest_profit >= self._next_trail_profit:
+                self._trail_levels += 1
+                self._next_trail_profit += trail_step
+        return self._trail_levels
+
     def apply_strategy_config(self) -> None:
         """Apply config-driven indicator settings."""
         # Keep bot_state updated for API/WS
-        bot_state['strategy_mode'] = 'st_macd_hist'
+        bot_state.strategy_mode = 'st_macd_hist'
+        # Per-tick paths branch on this flag instead of comparing the mode string
+        self._st_macd_mode = True
 
         # Ensure option signal indicators exist
         if self.opt_ce_st is None or self.opt_pe_st is None:
@@ -167,27 +438,14 @@ class TradingBot:
                 signal=int(config.get('macd_signal', 9)),
             )
 
-    def _entry_conditions_met(self, *, st_direction: int | None, hist_window: deque) -> bool:
+    @staticmethod
+    def _entry_conditions_met(*, st_direction: int | None, h1: float, h2: float, h3: float) -> bool:
         # Requirements (entry):
         # 1) SuperTrend BUY on option candle (direction == 1)
         # 2) MACD histogram is > +0.5 and < +1.25
         # 3) MACD histogram is increasing for the last 3 candles
-        if st_direction != 1:
-            return False
-        if len(hist_window) < 3:
-            return False
-
-        h1, h2, h3 = list(hist_window)[-3:]
-        if not (isinstance(h1, (int, float)) and isinstance(h2, (int, float)) and isinstance(h3, (int, float))):
-            return False
-
-        if not (h1 < h2 < h3):
-            return False
-
-        # Current histogram bounds
-        if h3 <= 0.5 or h3 >= 1.25:
-            return False
-        return True
+        # Unfilled slots are NaN, so a window with < 3 values fails the comparisons.
+        return st_direction == 1 and h1 < h2 < h3 and 0.5 < h3 < 1.25
 
     async def _ensure_fixed_option_contract(self, index_name: str, index_ltp: float) -> bool:
         """Pick and cache a fixed CE+PE contract for signal generation."""
@@ -213,83 +471,134 @@ class TradingBot:
             self.fixed_ce_security_id = str(ce_sid)
             self.fixed_pe_security_id = str(pe_sid)
 
-            bot_state['fixed_option_strike'] = self.fixed_option_strike
-            bot_state['fixed_option_expiry'] = self.fixed_option_expiry
-            bot_state['fixed_ce_security_id'] = self.fixed_ce_security_id
-            bot_state['fixed_pe_security_id'] = self.fixed_pe_security_id
+            bot_state.fixed_option_strike = self.fixed_option_strike
+            bot_state.fixed_option_expiry = self.fixed_option_expiry
+            bot_state.fixed_ce_security_id = self.fixed_ce_security_id
+            bot_state.fixed_pe_security_id = self.fixed_pe_security_id
+            self._state_template_dirty = True
 
             logger.info(
-                f"[SIGNAL] Fixed option contract set | {index_name} {strike} | Expiry={expiry} | CE={ce_sid} PE={pe_sid}"
+                "[SIGNAL] Fixed option contract set | %s %s | Expiry=%s | CE=%s PE=%s",
+                index_name, strike, expiry, ce_sid, pe_sid,
             )
             return True
         except Exception as e:
-            logger.error(f"[SIGNAL] Failed to set fixed option contract: {e}")
+            logger.error("[SIGNAL] Failed to set fixed option contract: %s", e)
             return False
 
-    def _universe_tracker_key(self, strike: int, option_type: str) -> str:
-        return f"{int(strike)}:{str(option_type).upper()}"
-
     def _build_strike_universe(self, *, center_strike: int, index_name: str, steps: int) -> list[int]:
         """Return a symmetric strike list around center_strike."""
         cfg = get_index_config(index_name)
         interval = int(cfg.get('strike_interval', 50) or 50)
         steps = max(0, int(steps))
-        strikes = [int(center_strike + (i * interval)) for i in range(-steps, steps + 1)]
-        strikes = sorted(set(strikes))
-        return strikes
+        center_strike = int(center_strike)
+        return list(range(center_strike - steps * interval, center_strike + (steps + 1) * interval, interval))
 
-    def _get_or_create_option_tracker(self, *, strike: int, option_type: str, expiry: str) -> dict:
+    def _get_or_create_option_tracker(self, *, strike: int, option_type: str, expiry: str) -> OptionTracker:
         """Create per-contract ST+MACD indicator + candle builder state."""
-        key = self._universe_tracker_key(strike, option_type)
+        key = (int(strike), str(option_type).upper())
         tracker = self._opt_trackers.get(key)
-        if tracker is None:
-            tracker = {
-                'strike': int(strike),
-                'option_type': str(option_type).upper(),
-                'expiry': str(expiry),
-                'security_id': None,
-                'st': SuperTrend(period=config['supertrend_period'], multiplier=config['supertrend_multiplier']),
-                'macd': MACD(
+        if tracker is None and self._tracker_pool:
+            # Recycled trackers were reset on eviction; just rebind the contract
+            tracker = self._tracker_pool.pop()
+            tracker.strike = int(strike)
+            tracker.option_type = str(option_type).upper()
+            tracker.expiry = str(expiry)
+            self._opt_trackers[key] = tracker
+        elif tracker is None:
+            tracker = OptionTracker(
+                strike=int(strike),
+                option_type=str(option_type).upper(),
+                expiry=str(expiry),
+                st=SuperTrend(period=config['supertrend_period'], multiplier=config['supertrend_multiplier']),
+                macd=MACD(
                     fast=int(config.get('macd_fast', 12)),
                     slow=int(config.get('macd_slow', 26)),
                     signal=int(config.get('macd_signal', 9)),
                 ),
-                'last_macd_value': None,
-                'hist_window': deque(maxlen=3),
-                'last_st_value': None,
-                'last_st_dir': None,
-                'last_hist': None,
-                'open': 0.0,
-                'high': 0.0,
-                'low': float('inf'),
-                'close': 0.0,
-            }
+            )
             self._opt_trackers[key] = tracker
         return tracker
 
-    def _reset_tracker_state(self, tracker: dict, *, expiry: str) -> None:
-        try:
-            tracker['expiry'] = str(expiry)
-            if tracker.get('st'):
-                tracker['st'].reset()
-            if tracker.get('macd'):
-                tracker['macd'].reset()
-        except Exception:
-            pass
-        try:
-            hw = tracker.get('hist_window')
-            if hw is not None:
-                hw.clear()
-        except Exception:
-            pass
-        tracker['last_macd_value'] = None
-        tracker['last_st_value'] = None
-        tracker['last_st_dir'] = None
-        tracker['last_hist'] = None
-        tracker['open'] = 0.0
-        tracker['high'] = 0.0
-        tracker['low'] = float('inf')
-        tracker['close'] = 0.0
+    def _reset_tracker_state(self, tracker: OptionTracker, *, expiry: str) -> None:
+        tracker.expiry = str(expiry)
+        tracker.st.reset()
+        tracker.macd.reset()
+        tracker.hist3 = _EMPTY_HIST3
+        tracker.last_macd_value = None
+        tracker.last_st_value = None
+        tracker.last_st_dir = None
+        tracker.last_hist = None
+        row = self._uni_index.get((tracker.strike, tracker.option_type))
+        if row is not None:
+            self._uni_ohlc[row] = _RESET_OHLC
+
+    def _clear_universe_rows(self) -> None:
+        self._universe_key = None
+        self._universe_recheck_mono = 0.0
+        self._uni_index: dict[tuple[int, str], int] = {}
+        self._uni_trackers: list[OptionTracker] = []
+        self._uni_sids: list[int] = []
+        self._uni_ohlc = np.empty((0, 4), dtype=np.float64)
+        self._uni_pairs: list[tuple[SuperTrend, MACD]] = []
+        self._uni_st_states, self._uni_macd_states = stack_st_macd_states(self._uni_pairs)
+
+    def _index_universe_rows(self) -> None:
+        """Lay the universe trackers out as rows of one (N, 4) OHLC array.
+
+        Rebuilt only when the universe changes; forming candles of contracts that stay in the
+        universe are carried over.
+        """
+        old_index, old_ohlc = self._uni_index, self._uni_ohlc
+        index: dict[tuple[int, str], int] = {}
+        trackers: list[OptionTracker] = []
+        sids: list[int] = []
+        for key, tracker in self._opt_trackers.items():
+            sid = _as_sid(tracker.security_id)
+            if not sid:
+                continue
+            index[key] = len(trackers)
+            trackers.append(tracker)
+            sids.append(sid)
+
+        ohlc = np.empty((len(trackers), 4), dtype=np.float64)
+        ohlc[:] = _RESET_OHLC
+        for key, row in index.items():
+            old_row = old_index.get(key)
+            if old_row is not None:
+                ohlc[row] = old_ohlc[old_row]
+
+        self._uni_index = index
+        self._uni_trackers = trackers
+        self._uni_sids = sids
+        self._uni_ohlc = ohlc
+        # Indicator states move into matching rows so a candle close is one kernel call
+        self._uni_pairs = [(t.st, t.macd) for t in trackers]
+        self._uni_st_states, self._uni_macd_states = stack_st_macd_states(self._uni_pairs)
+
+    def _feed_universe_ticks(self, option_ltps: dict[int, float]) -> None:
+        """Fold one quote snapshot into every universe contract's forming candle at once."""
+        sids = self._uni_sids
+        # Empty batch (stalled feed, pre-open / post-close): nothing to fold in
+        if not sids or not option_ltps:
+            return
+        ltp = np.fromiter((option_ltps.get(sid, 0.0) or 0.0 for sid in sids), dtype=np.float64, count=len(sids))
+        # Vector form of round_to_tick, in place (no temporaries per tick)
+        ltp *= 20.0
+        ltp += 0.5
+        np.floor(ltp, out=ltp)
+        ltp /= 20.0
+        live = ltp > 0.0
+        if not live.any():
+            return
+        ohlc = self._uni_ohlc
+        o, h, l, c = ohlc[:, 0], ohlc[:, 1], ohlc[:, 2], ohlc[:, 3]
+        # Missing quotes are 0.0: copying one into an empty open, or max-ing it into a
+        # high, is a no-op, so only the low and close need the live mask
+        np.copyto(o, ltp, where=(o == 0.0))
+        np.maximum(h, ltp, out=h)
+        np.minimum(l, ltp, out=l, where=live)
+        np.copyto(c, ltp, where=live)
 
     async def _ensure_option_universe(self, index_name: str, index_ltp: float) -> bool:
         """Ensure CE/PE contracts for strikes around the current ATM strike.
@@ -298,7 +607,7 @@ class TradingBot:
         """
         steps = int(config.get('option_universe_strike_steps', 0) or 0)
         if steps <= 0:
-            bot_state['option_universe_enabled'] = False
+            bot_state.option_universe_enabled = False
             return await self._ensure_fixed_option_contract(index_name, index_ltp)
 
         if not self.dhan:
@@ -308,6 +617,11 @@ class TradingBot:
 
         try:
             center_strike = int(round_to_strike(index_ltp, index_name))
+            # Per-tick fast path: same band as last validated, no expiry/strike-list work
+            universe_key = (index_name, center_strike, steps)
+            if universe_key == self._universe_key and time.monotonic() < self._universe_recheck_mono:
+                return True
+
             expiry = await self.dhan.get_nearest_expiry(index_name)
             strikes = self._build_strike_universe(center_strike=center_strike, index_name=index_name, steps=steps)
 
@@ -317,47 +631,52 @@ class TradingBot:
                 and str(self.option_universe_expiry or '') == str(expiry)
                 and sorted(self.option_universe_contracts.keys()) == strikes
             ):
-                bot_state['option_universe_enabled'] = True
+                bot_state.option_universe_enabled = True
+                self._universe_key = universe_key
+                self._universe_recheck_mono = time.monotonic() + _UNIVERSE_RECHECK_SEC
                 return True
 
-            new_contracts: dict[int, dict[str, str]] = {}
+            sids = await self.dhan.get_option_security_ids_bulk(index_name, strikes, str(expiry))
+            # One pass: contract map, tracker keys and (strike, type, sid) bindings
+            # Security IDs are normalized to int | None here, once per roll
+            new_contracts: dict[int, dict[str, int | None]] = {}
+            expected_keys: set[tuple[int, str]] = set()
+            bindings: list[tuple[int, str, int]] = []
             for s in strikes:
-                ce_sid = await self.dhan.get_atm_option_security_id(index_name, int(s), 'CE', str(expiry))
-                pe_sid = await self.dhan.get_atm_option_security_id(index_name, int(s), 'PE', str(expiry))
-                if ce_sid or pe_sid:
-                    new_contracts[int(s)] = {
-                        'CE': str(ce_sid) if ce_sid else '',
-                        'PE': str(pe_sid) if pe_sid else '',
-                    }
+                ce_sid = _as_sid(sids.get((s, 'CE')))
+                pe_sid = _as_sid(sids.get((s, 'PE')))
+                if not (ce_sid or pe_sid):
+                    continue
+                new_contracts[s] = {'CE': ce_sid, 'PE': pe_sid}
+                for ot, sid in (('CE', ce_sid), ('PE', pe_sid)):
+                    if sid:
+                        expected_keys.add((s, ot))
+                        bindings.append((s, ot, sid))
 
             if not new_contracts:
                 return False
 
             # Remove trackers that are no longer in the universe
-            expected_keys: set[str] = set()
-            for s, d in new_contracts.items():
-                for ot in ('CE', 'PE'):
-                    if d.get(ot):
-                        expected_keys.add(self._universe_tracker_key(s, ot))
-            for k in list(self._opt_trackers.keys()):
-                if k not in expected_keys:
-                    try:
-                        del self._opt_trackers[k]
-                    except Exception:
-                        pass
+            pool_max = 2 * len(strikes)
+            for k in self._opt_trackers.keys() - expected_keys:
+                tracker = self._opt_trackers.pop(k)
+                if len(self._tracker_pool) < pool_max:
+                    self._reset_tracker_state(tracker, expiry='')
+                    tracker.security_id = None
+                    self._tracker_pool.append(tracker)
 
             # Ensure trackers exist and are bound to the correct security IDs
-            for s, d in new_contracts.items():
-                for ot in ('CE', 'PE'):
-                    sid = d.get(ot) or ''
-                    if not sid:
-                        continue
-                    tracker = self._get_or_create_option_tracker(strike=int(s), option_type=ot, expiry=str(expiry))
-                    sid_changed = (str(tracker.get('security_id') or '') != str(sid))
-                    expiry_changed = (str(tracker.get('expiry') or '') != str(expiry))
-                    tracker['security_id'] = str(sid)
-                    if sid_changed or expiry_changed:
-                        self._reset_tracker_state(tracker, expiry=str(expiry))
+            for s, ot, sid in bindings:
+                tracker = self._get_or_create_option_tracker(strike=s, option_type=ot, expiry=str(expiry))
+                sid_changed = (tracker.security_id != str(sid))
+                expiry_changed = (tracker.expiry != str(expiry))
+                tracker.security_id = str(sid)
+                if sid_changed or expiry_changed:
+                    self._reset_tracker_state(tracker, expiry=str(expiry))
+
+            self._index_universe_rows()
+            self._universe_key = universe_key
+            self._universe_recheck_mono = time.monotonic() + _UNIVERSE_RECHECK_SEC
 
             self.option_universe_center_strike = int(center_strike)
             self.option_universe_expiry = str(expiry)
@@ -367,27 +686,31 @@ class TradingBot:
             atm = new_contracts.get(int(center_strike), {})
             self.fixed_option_strike = int(center_strike)
             self.fixed_option_expiry = str(expiry)
-            self.fixed_ce_security_id = str(atm.get('CE') or '') or None
-            self.fixed_pe_security_id = str(atm.get('PE') or '') or None
-
-            bot_state['fixed_option_strike'] = self.fixed_option_strike
-            bot_state['fixed_option_expiry'] = self.fixed_option_expiry
-            bot_state['fixed_ce_security_id'] = self.fixed_ce_security_id
-            bot_state['fixed_pe_security_id'] = self.fixed_pe_security_id
-
-            bot_state['option_universe_enabled'] = True
-            bot_state['option_universe_center_strike'] = int(center_strike)
-            bot_state['option_universe_expiry'] = str(expiry)
-            bot_state['option_universe_strikes'] = strikes
+            self.fixed_ce_security_id = str(atm['CE']) if atm.get('CE') else None
+            self.fixed_pe_security_id = str(atm['PE']) if atm.get('PE') else None
+
+            bot_state.fixed_option_strike = self.fixed_option_strike
+            bot_state.fixed_option_expiry = self.fixed_option_expiry
+            bot_state.fixed_ce_security_id = self.fixed_ce_security_id
+            bot_state.fixed_pe_security_id = self.fixed_pe_security_id
+            self._state_template_dirty = True
+
+            bot_state.option_universe_enabled = True
+            bot_state.option_universe_center_strike = int(center_strike)
+            bot_state.option_universe_expiry = str(expiry)
+            bot_state.option_universe_strikes = strikes
             # JSON-friendly map
-            bot_state['option_universe_contracts'] = {str(k): v for k, v in new_contracts.items()}
+            bot_state.option_universe_contracts = {
+                str(k): {ot: str(sid) if sid else '' for ot, sid in v.items()} for k, v in new_contracts.items()
+            }
 
             logger.info(
-                f"[SIGNAL] Option universe set | {index_name} Center={center_strike} Steps={steps} | Expiry={expiry} | Contracts={len(expected_keys)}"
+                "[SIGNAL] Option universe set | %s Center=%s Steps=%s | Expiry=%s | Contracts=%s",
+                index_name, center_strike, steps, expiry, len(expected_keys),
             )
             return True
         except Exception as e:
-            logger.error(f"[SIGNAL] Failed to set option universe: {e}")
+            logger.error("[SIGNAL] Failed to set option universe: %s", e)
             return False
 
     def _try_load_agent_state(self) -> None:
@@ -404,6 +727,10 @@ class TradingBot:
         Returns:
             bool: True if within allowed trading hours, False otherwise
         """
+        if session_gates().entry_allowed:
+            return True
+
+        # Blocked: work out why for the log
         ist = get_ist_time()
 
         # Weekday-only entries
@@ -412,20 +739,16 @@ class TradingBot:
 
         current_time = ist.time()
         
-        # Define trading hours
-        NO_ENTRY_BEFORE = datetime.strptime("09:25", "%H:%M").time()  # No entry before 9:25 AM
-        NO_ENTRY_AFTER = datetime.strptime("15:10", "%H:%M").time()   # No entry after 3:10 PM
-        
         # Check if within allowed hours
-        if current_time < NO_ENTRY_BEFORE:
-            logger.info(f"[HOURS] Entry blocked - market not open yet (Current: {current_time.strftime('%H:%M')}, Opens: 09:25)")
+        if current_time < ENTRY_START:
+            logger.info("[HOURS] Entry blocked - market not open yet (Current: %s, Opens: %s)", current_time.strftime('%H:%M'), ENTRY_START.strftime('%H:%M'))
             return False
         
-        if current_time > NO_ENTRY_AFTER:
-            logger.info(f"[HOURS] Entry blocked - market closing soon (Current: {current_time.strftime('%H:%M')}, Cutoff: 15:10)")
+        if current_time > ENTRY_CUTOFF:
+            logger.info("[HOURS] Entry blocked - market closing soon (Current: %s, Cutoff: %s)", current_time.strftime('%H:%M'), ENTRY_CUTOFF.strftime('%H:%M'))
             return False
         
-        logger.debug(f"[HOURS] Trading hours OK (Current: {current_time.strftime('%H:%M')})")
+        logger.debug("[HOURS] Trading hours OK (Current: %s)", current_time.strftime('%H:%M'))
         return True
     
     async def start(self):
@@ -437,8 +760,10 @@ class TradingBot:
             return {"status": "error", "message": "Dhan API credentials not configured"}
         
         self.running = True
-        bot_state['is_running'] = True
+        bot_state.is_running = True
         self.reset_indicator()
+        self.refresh_risk_config()
+        start_trade_writer()
         self.task = asyncio.create_task(self.run_loop())
         
         index_name = config['selected_index']
@@ -446,7 +771,8 @@ class TradingBot:
         indicator_name = config.get('indicator_type', 'supertrend')
         strategy_mode = config.get('strategy_mode', 'agent')
         logger.info(
-            f"[BOT] Started - Index: {index_name}, Timeframe: {interval}, Strategy: {strategy_mode}, Indicator: {indicator_name}, Mode: {bot_state['mode']}"
+            "[BOT] Started - Index: %s, Timeframe: %s, Strategy: %s, Indicator: %s, Mode: %s",
+            index_name, interval, strategy_mode, indicator_name, bot_state.mode,
         )
         
         return {"status": "success", "message": f"Bot started for {index_name} ({interval})"}
@@ -454,9 +780,11 @@ class TradingBot:
     async def stop(self):
         """Stop the trading bot"""
         self.running = False
-        bot_state['is_running'] = False
+        bot_state.is_running = False
+        self._tick_event.set()
         if self.task:
             self.task.cancel()
+        await flush_trade_writes()
         logger.info("[BOT] Stopped")
         return {"status": "success", "message": "Bot stopped"}
     
@@ -466,23 +794,22 @@ class TradingBot:
             return {"status": "error", "message": "No open position"}
         
         index_name = config['selected_index']
-        index_config = get_index_config(index_name)
-        qty = config['order_qty'] * index_config['lot_size']
+        qty = self._qty
         
-        logger.info(f"[ORDER] Force squareoff initiated for {index_name}")
+        logger.info("[ORDER] Force squareoff initiated for %s", index_name)
         
-        if bot_state['mode'] == 'paper':
-            exit_price = bot_state['current_option_ltp']
+        if bot_state.mode == 'paper':
+            exit_price = bot_state.current_option_ltp
             pnl = (exit_price - self.entry_price) * qty
             await self.close_position(exit_price, pnl, "Force Square-off")
             return {"status": "success", "message": f"Position squared off (Paper). PnL: {pnl:.2f}"}
         else:
             if self.dhan:
-                security_id = self.current_position.get('security_id', '')
+                security_id = self.current_position.security_id
                 result = await self.dhan.place_order(security_id, "SELL", qty)
-                logger.info(f"[ORDER] Squareoff result: {result}")
+                logger.info("[ORDER] Squareoff result: %s", result)
                 if result.get('orderId') or result.get('status') == 'success':
-                    exit_price = bot_state['current_option_ltp']
+                    exit_price = bot_state.current_option_ltp
                     pnl = (exit_price - self.entry_price) * qty
                     await self.close_position(exit_price, pnl, "Force Square-off")
                     return {"status": "success", "message": f"Position squared off. PnL: {pnl:.2f}"}
@@ -494,125 +821,124 @@ class TradingBot:
         if not self.current_position:
             return
         
-        trade_id = self.current_position.get('trade_id', '')
-        index_name = self.current_position.get('index_name', config['selected_index'])
-        option_type = self.current_position.get('option_type', '')
-        strike = self.current_position.get('strike', 0)
-        security_id = self.current_position.get('security_id', '')
+        trade_id = self.current_position.trade_id
+        index_name = self.current_position.index_name
+        option_type = self.current_position.option_type
+        strike = self.current_position.strike
+        security_id = self.current_position.security_id
+        exit_time = datetime.now(timezone.utc).isoformat()
         
         # Send exit order to Dhan - MUST place order before updating DB
         exit_order_placed = False
-        if bot_state['mode'] != 'paper' and self.dhan and security_id:
-            index_config = get_index_config(index_name)
-            qty = config['order_qty'] * index_config['lot_size']
+        if bot_state.mode != 'paper' and self.dhan and security_id:
+            qty = self._qty
             
             try:
-                logger.info(f"[ORDER] Placing EXIT SELL order | Trade ID: {trade_id} | Security: {security_id} | Qty: {qty}")
+                logger.info("[ORDER] Placing EXIT SELL order | Trade ID: %s | Security: %s | Qty: %s", trade_id, security_id, qty)
                 result = await self.dhan.place_order(security_id, "SELL", qty)
                 
                 if result.get('status') == 'success' and result.get('orderId'):
                     order_id = result.get('orderId')
                     exit_order_placed = True
-                    logger.info(f"[ORDER] ✓ EXIT order PLACED | OrderID: {order_id} | Security: {security_id} | Qty: {qty}")
+                    logger.info("[ORDER] ✓ EXIT order PLACED | OrderID: %s | Security: %s | Qty: %s", order_id, security_id, qty)
                     
-                    logger.info(f"[EXIT] ✓ Position closed | {index_name} {option_type} {strike} | Reason: {reason} | PnL: {pnl} | Order Placed: True")
+                    logger.info("[EXIT] ✓ Position closed | %s %s %s | Reason: %s | PnL: %s | Order Placed: True", index_name, option_type, strike, reason, pnl)
                     
-                    # Update database in background - don't wait
-                    asyncio.create_task(update_trade_exit(
+                    # Queue the DB update for the background writer (waits only if the queue is full)
+                    await queue_trade_exit(
                         trade_id=trade_id,
-                        exit_time=datetime.now(timezone.utc).isoformat(),
+                        exit_time=exit_time,
                         exit_price=exit_price,
                         pnl=pnl,
                         exit_reason=reason
-                    ))
+                    )
                 else:
-                    logger.error(f"[ORDER] ✗ EXIT order FAILED | Trade: {trade_id} | Result: {result}")
+                    logger.error("[ORDER] ✗ EXIT order FAILED | Trade: %s | Result: %s", trade_id, result)
                     return
             except Exception as e:
-                logger.error(f"[ORDER] ✗ Error placing EXIT order: {e} | Trade: {trade_id}", exc_info=True)
+                logger.error("[ORDER] ✗ Error placing EXIT order: %s | Trade: %s", e, trade_id, exc_info=True)
                 return
         elif not security_id:
-            logger.warning(f"[WARNING] Cannot send exit order - security_id missing for {index_name} {option_type} | Trade: {trade_id}")
-            logger.info(f"[EXIT] ✓ Position closed | {index_name} {option_type} {strike} | Reason: {reason} | PnL: {pnl} | Order Placed: False")
-            # Update DB in background - don't wait
-            asyncio.create_task(update_trade_exit(
+            logger.warning("[WARNING] Cannot send exit order - security_id missing for %s %s | Trade: %s", index_name, option_type, trade_id)
+            logger.info("[EXIT] ✓ Position closed | %s %s %s | Reason: %s | PnL: %s | Order Placed: False", index_name, option_type, strike, reason, pnl)
+            # Queue the DB update for the background writer (waits only if the queue is full)
+            await queue_trade_exit(
                 trade_id=trade_id,
-                exit_time=datetime.now(timezone.utc).isoformat(),
+                exit_time=exit_time,
                 exit_price=exit_price,
                 pnl=pnl,
                 exit_reason=reason
-            ))
-        elif bot_state['mode'] == 'paper':
-            logger.info(f"[ORDER] Paper mode - EXIT order not placed to Dhan (simulated) | Trade: {trade_id}")
-            logger.info(f"[EXIT] ✓ Position closed | {index_name} {option_type} {strike} | Reason: {reason} | PnL: {pnl} | Order Placed: False")
-            # Update DB in background - don't wait
-            asyncio.create_task(update_trade_exit(
+            )
+        elif bot_state.mode == 'paper':
+            logger.info("[ORDER] Paper mode - EXIT order not placed to Dhan (simulated) | Trade: %s", trade_id)
+            logger.info("[EXIT] ✓ Position closed | %s %s %s | Reason: %s | PnL: %s | Order Placed: False", index_name, option_type, strike, reason, pnl)
+            # Queue the DB update for the background writer (waits only if the queue is full)
+            await queue_trade_exit(
                 trade_id=trade_id,
-                exit_time=datetime.now(timezone.utc).isoformat(),
+                exit_time=exit_time,
                 exit_price=exit_price,
                 pnl=pnl,
                 exit_reason=reason
-            ))
+            )
         
         # Update state
-        bot_state['daily_pnl'] += pnl
-        bot_state['current_position'] = None
-        bot_state['trailing_sl'] = None
-        bot_state['entry_price'] = 0
+        bot_state.daily_pnl += pnl
+        bot_state.current_position = None
+        bot_state.trailing_sl = None
+        bot_state.entry_price = 0
         
-        if bot_state['daily_pnl'] < -config['daily_max_loss']:
-            bot_state['daily_max_loss_triggered'] = True
-            logger.warning(f"[EXIT] Daily max loss triggered! PnL: {bot_state['daily_pnl']:.2f}")
+        if bot_state.daily_pnl < -self._cfg_daily_max_loss:
+            bot_state.daily_max_loss_triggered = True
+            logger.warning("[EXIT] Daily max loss triggered! PnL: %.2f", bot_state.daily_pnl)
         
-        if pnl < 0 and abs(pnl) > bot_state['max_drawdown']:
-            bot_state['max_drawdown'] = abs(pnl)
+        if pnl < 0 and abs(pnl) > bot_state.max_drawdown:
+            bot_state.max_drawdown = abs(pnl)
         
         self.current_position = None
         self.entry_price = 0
         self.trailing_sl = None
         self.highest_profit = 0
+        self._sync_trail_levels()
+        self._state_template_dirty = True
         
-        logger.info(f"[EXIT] ✓ Position closed | {index_name} {option_type} {strike} | Reason: {reason} | PnL: {pnl:.2f} | Order Placed: {exit_order_placed}")
+        logger.info("[EXIT] ✓ Position closed | %s %s %s | Reason: %s | PnL: %.2f | Order Placed: %s", index_name, option_type, strike, reason, pnl, exit_order_placed)
     
     async def run_loop(self):
         """Main trading loop"""
         logger.info("[BOT] Trading loop started")
-        candle_start_time = datetime.now()
-        close = 0.0
-        candle_number = 0
+        # Monotonic clock for candle timing (immune to wall-clock/NTP jumps)
+        candle_start_mono = time.monotonic()
         
         while self.running:
             try:
                 index_name = config['selected_index']
                 # Build option candles using the user-selected timeframe.
                 candle_interval = int(config.get('candle_interval', 5) or 5)
-                bot_state['candle_interval'] = candle_interval
+                bot_state.candle_interval = candle_interval
                 
                 # Check daily reset (9:15 AM IST)
-                ist = get_ist_time()
-                if ist.hour == 9 and ist.minute == 15 and self._last_daily_reset_date != ist.date():
-                    bot_state['daily_trades'] = 0
-                    bot_state['daily_pnl'] = 0.0
-                    bot_state['daily_max_loss_triggered'] = False
-                    bot_state['max_drawdown'] = 0.0
+                if time.monotonic() >= self._next_daily_reset_mono:
+                    bot_state.daily_trades = 0
+                    bot_state.daily_pnl = 0.0
+                    self._refresh_exit_thresholds()
+                    bot_state.daily_max_loss_triggered = False
+                    bot_state.max_drawdown = 0.0
+                    self._state_template_dirty = True
                     self.last_exit_candle_time = None
-                    self.last_trade_time = None
-                    candle_number = 0
+                    self._last_trade_mono = 0.0
                     self.reset_indicator()
-                    self._last_daily_reset_date = ist.date()
+                    self._next_daily_reset_mono = time.monotonic() + seconds_until_ist(9, 15, grace=0)
                     logger.info("[BOT] Daily reset at 9:15 AM")
                 
                 # Force square-off at 3:25 PM
-                if should_force_squareoff() and self.current_position:
+                if self.current_position and session_gates().force_squareoff:
                     logger.info("[EXIT] Auto squareoff at 3:25 PM")
                     await self.squareoff()
                 
-                # Check if trading is allowed
-                market_open = is_market_open()
-                # Always keep the bot loop running once started; market_open is still used for UI/status only.
+                # Always keep the bot loop running once started; market hours only gate entries.
                 
-                if bot_state['daily_max_loss_triggered']:
-                    await asyncio.sleep(5)
+                if bot_state.daily_max_loss_triggered:
+                    await self._wait_for_tick(5.0)
                     continue
                 
                 # Fetch market data
@@ -620,667 +946,57 @@ class TradingBot:
                     # Always keep index_ltp updated (used for UI + contract selection)
                     idx = self.dhan.get_index_ltp(index_name)
                     if idx > 0:
-                        bot_state['index_ltp'] = float(idx)
-
-                    steps = int(config.get('option_universe_strike_steps', 0) or 0)
-                    fixed_strike = None
-                    fixed_expiry = None
-                    option_ltps = {}
-
-                    if steps > 0:
-                        universe_ready = await self._ensure_option_universe(index_name, float(bot_state.get('index_ltp', 0.0)))
-                        if universe_ready:
-                            ids: list[int] = []
-                            for s, d in (self.option_universe_contracts or {}).items():
-                                for ot in ('CE', 'PE'):
-                                    sid = d.get(ot) or ''
-                                    if not sid:
-                                        continue
-                                    try:
-                                        ids.append(int(sid))
-                                    except Exception:
-                                        pass
-
-                            # Also include current position sid (improves LTP accuracy for exits)
-                            if self.current_position:
-                                pos_sid = str(self.current_position.get('security_id', ''))
-                                if pos_sid and not pos_sid.startswith('SIM_'):
-                                    try:
-                                        ids.append(int(pos_sid))
-                                    except Exception:
-                                        pass
-
-                            if ids:
-                                idx2, option_ltps = self.dhan.get_index_and_options_ltp(index_name, ids)
-                                if idx2 and idx2 > 0:
-                                    bot_state['index_ltp'] = float(idx2)
-
-                            fixed_strike = bot_state.get('fixed_option_strike')
-                            fixed_expiry = bot_state.get('fixed_option_expiry')
-
-                            # Keep center (ATM) CE/PE LTPs in the legacy fields for UI
-                            if fixed_strike and fixed_expiry:
-                                atm_contracts = (self.option_universe_contracts or {}).get(int(fixed_strike), {})
-                                for ot, field in (('CE', 'signal_ce_ltp'), ('PE', 'signal_pe_ltp')):
-                                    sid = atm_contracts.get(ot) or ''
-                                    ltp = 0.0
-                                    if sid:
-                                        try:
-                                            ltp = float(option_ltps.get(int(sid), 0.0) or 0.0)
-                                        except Exception:
-                                            ltp = 0.0
-
-                                    # Chain fallback for the ATM contracts (throttled)
-                                    if (not ltp or ltp <= 0) and sid:
-                                        k = self._universe_tracker_key(int(fixed_strike), ot)
-                                        now_ts = time.time()
-                                        last_ts = float(self._opt_fallback_last_ts.get(k, 0.0) or 0.0)
-                                        if now_ts - last_ts >= 2.0:
-                                            self._opt_fallback_last_ts[k] = now_ts
-                                            try:
-                                                ltp = float(
-                                                    await self.dhan.get_option_ltp(
-                                                        str(sid),
-                                                        strike=int(fixed_strike),
-                                                        option_type=ot,
-                                                        expiry=str(fixed_expiry),
-                                                        index_name=index_name,
-                                                    )
-                                                    or 0.0
-                                                )
-                                            except Exception:
-                                                ltp = 0.0
-
-                                    if ltp and ltp > 0:
-                                        ltp = round(float(ltp) / 0.05) * 0.05
-                                        bot_state[field] = round(float(ltp), 2)
-
-                            # Keep current position LTP in sync (for SL/target checks)
-                            if self.current_position:
-                                pos_sid = str(self.current_position.get('security_id', ''))
-                                if pos_sid and not pos_sid.startswith('SIM_'):
-                                    try:
-                                        pos_ltp = float(option_ltps.get(int(pos_sid), 0.0) or 0.0)
-                                    except Exception:
-                                        pos_ltp = 0.0
-                                    if (not pos_ltp or pos_ltp <= 0) and fixed_strike and fixed_expiry:
-                                        pos_type = str(self.current_position.get('option_type') or '').upper()
-                                        pos_strike = self.current_position.get('strike')
-                                        if pos_type in ('CE', 'PE') and pos_strike:
-                                            k = self._universe_tracker_key(int(pos_strike), pos_type)
-                                            now_ts = time.time()
-                                            last_ts = float(self._opt_fallback_last_ts.get(k, 0.0) or 0.0)
-                                            if now_ts - last_ts >= 2.0:
-                                                self._opt_fallback_last_ts[k] = now_ts
-                                                try:
-                                                    pos_ltp = float(
-                                                        await self.dhan.get_option_ltp(
-                                                            str(pos_sid),
-                                                            strike=int(pos_strike),
-                                                            option_type=pos_type,
-                                                            expiry=str(fixed_expiry),
-                                                            index_name=index_name,
-                                                        )
-                                                        or 0.0
-                                                    )
-                                                except Exception:
-                                                    pos_ltp = 0.0
-                                    if pos_ltp and pos_ltp > 0:
-                                        pos_ltp = round(float(pos_ltp) / 0.05) * 0.05
-                                        bot_state['current_option_ltp'] = round(float(pos_ltp), 2)
-
-                            # Feed universe trackers with tick LTPs for candle building
-                            if fixed_expiry:
-                                for s, d in (self.option_universe_contracts or {}).items():
-                                    for ot in ('CE', 'PE'):
-                                        sid = d.get(ot) or ''
-                                        if not sid:
-                                            continue
-                                        try:
-                                            ltp = float(option_ltps.get(int(sid), 0.0) or 0.0)
-                                        except Exception:
-                                            ltp = 0.0
-                                        if ltp and ltp > 0:
-                                            ltp = round(float(ltp) / 0.05) * 0.05
-                                            tracker = self._get_or_create_option_tracker(strike=int(s), option_type=ot, expiry=str(fixed_expiry))
-                                            if tracker.get('open') == 0.0:
-                                                tracker['open'] = float(ltp)
-                                            if tracker.get('high') == 0.0 or float(ltp) > float(tracker.get('high') or 0.0):
-                                                tracker['high'] = float(ltp)
-                                            if float(ltp) < float(tracker.get('low') or float('inf')):
-                                                tracker['low'] = float(ltp)
-                                            tracker['close'] = float(ltp)
-
-                    else:
-                        # Ensure the fixed contract exists (strike/expiry/security IDs)
-                        fixed_ready = await self._ensure_fixed_option_contract(index_name, float(bot_state.get('index_ltp', 0.0)))
-                        if fixed_ready:
-                            ce_sid = bot_state.get('fixed_ce_security_id')
-                            pe_sid = bot_state.get('fixed_pe_security_id')
-
-                            ids: list[int] = []
-                            if ce_sid:
-                                try:
-                                    ids.append(int(ce_sid))
-                                except Exception:
-                                    pass
-                            if pe_sid:
-                                try:
-                                    ids.append(int(pe_sid))
-                                except Exception:
-                                    pass
-
-                            if ids:
-                                idx2, option_ltps = self.dhan.get_index_and_options_ltp(index_name, ids)
-                                if idx2 and idx2 > 0:
-                                    bot_state['index_ltp'] = float(idx2)
-
-                                fixed_strike = bot_state.get('fixed_option_strike')
-                                fixed_expiry = bot_state.get('fixed_option_expiry')
-
-                                if ce_sid:
-                                    ce_val = option_ltps.get(int(ce_sid), 0.0)
-                                    if (not ce_val or ce_val <= 0) and fixed_strike and fixed_expiry:
-                                        try:
-                                            ce_val = await self.dhan.get_option_ltp(
-                                                ce_sid,
-                                                strike=int(fixed_strike),
-                                                option_type='CE',
-                                                expiry=str(fixed_expiry),
-                                                index_name=index_name,
-                                            )
-                                        except Exception:
-                                            pass
-                                    if ce_val and ce_val > 0:
-                                        ce_val = round(float(ce_val) / 0.05) * 0.05
-                                        bot_state['signal_ce_ltp'] = round(float(ce_val), 2)
-                                if pe_sid:
-                                    pe_val = option_ltps.get(int(pe_sid), 0.0)
-                                    if (not pe_val or pe_val <= 0) and fixed_strike and fixed_expiry:
-                                        try:
-                                            pe_val = await self.dhan.get_option_ltp(
-                                                pe_sid,
-                                                strike=int(fixed_strike),
-                                                option_type='PE',
-                                                expiry=str(fixed_expiry),
-                                                index_name=index_name,
-                                            )
-                                        except Exception:
-                                            pass
-                                    if pe_val and pe_val > 0:
-                                        pe_val = round(float(pe_val) / 0.05) * 0.05
-                                        bot_state['signal_pe_ltp'] = round(float(pe_val), 2)
-
-                                # Keep current position LTP in sync (for SL/target checks)
-                                if self.current_position:
-                                    pos_sid = str(self.current_position.get('security_id', ''))
-                                    if pos_sid and not pos_sid.startswith('SIM_'):
-                                        try:
-                                            pos_sid_int = int(pos_sid)
-                                            pos_ltp = option_ltps.get(pos_sid_int, 0.0)
-                                            if (not pos_ltp or pos_ltp <= 0) and fixed_strike and fixed_expiry:
-                                                pos_type = str(self.current_position.get('option_type') or '').upper()
-                                                if pos_type in ('CE', 'PE'):
-                                                    try:
-                                                        pos_ltp = await self.dhan.get_option_ltp(
-                                                            pos_sid,
-                                                            strike=int(fixed_strike),
-                                                            option_type=pos_type,
-                                                            expiry=str(fixed_expiry),
-                                                            index_name=index_name,
-                                                        )
-                                                    except Exception:
-                                                        pass
-                                            if pos_ltp and pos_ltp > 0:
-                                                pos_ltp = round(float(pos_ltp) / 0.05) * 0.05
-                                                bot_state['current_option_ltp'] = round(float(pos_ltp), 2)
-                                        except Exception:
-                                            pass
+                        bot_state.index_ltp = float(idx)
+
+                # Option quotes + candle building (single-ATM or multi-universe)
+                await self._poll_option_quotes(index_name)
 
                 # If market is closed, broker may return 0 LTPs; loop continues and will resume when data is available.
                 
-                # Keep a local copy of index LTP (used for contract selection + exit helper)
-                close = float(bot_state.get('index_ltp', 0.0) or 0.0)
-
-                # Build option candles (single-ATM or multi-universe)
-                steps = int(config.get('option_universe_strike_steps', 0) or 0)
-                if steps <= 0:
-                    ce_ltp = float(bot_state.get('signal_ce_ltp', 0.0) or 0.0)
-                    pe_ltp = float(bot_state.get('signal_pe_ltp', 0.0) or 0.0)
-
-                    if ce_ltp > 0:
-                        if self._ce_open == 0.0:
-                            self._ce_open = float(ce_ltp)
-                        if self._ce_high == 0.0 or ce_ltp > self._ce_high:
-                            self._ce_high = float(ce_ltp)
-                        if ce_ltp < self._ce_low:
-                            self._ce_low = float(ce_ltp)
-                        self._ce_close = float(ce_ltp)
-
-                    if pe_ltp > 0:
-                        if self._pe_open == 0.0:
-                            self._pe_open = float(pe_ltp)
-                        if self._pe_high == 0.0 or pe_ltp > self._pe_high:
-                            self._pe_high = float(pe_ltp)
-                        if pe_ltp < self._pe_low:
-                            self._pe_low = float(pe_ltp)
-                        self._pe_close = float(pe_ltp)
-                
                 # Check SL/Target on EVERY TICK (responsive protection)
-                if self.current_position and bot_state['current_option_ltp'] > 0:
-                    option_ltp = bot_state['current_option_ltp']
-                    tick_exit = await self.check_tick_sl(option_ltp)
-                    if tick_exit:
+                # (skipped while LTP, SL and the exit band are all unchanged since the last check)
+                option_ltp = bot_state.current_option_ltp
+                exit_key = (option_ltp, self.trailing_sl, self._ltp_exit_floor, self._ltp_target)
+                if self.current_position and option_ltp > 0 and exit_key != self._last_tick_exit_key:
+                    self._last_tick_exit_key = exit_key
+                    tick_exit = self.evaluate_tick_exit(option_ltp)
+                    if tick_exit is not None:
+                        await self._execute_exit(tick_exit)
                         # Position exited on tick, reset candle for next entry
-                        candle_start_time = datetime.now()
-                        close = 0.0
-                        candle_number = 0
-                        await asyncio.sleep(1)
+                        candle_start_mono = time.monotonic()
+                        await self._wait_for_tick(_POLL_INTERVAL_SEC)
                         continue
                 
                 # Check if candle is complete
-                elapsed = (datetime.now() - candle_start_time).total_seconds()
+                elapsed = time.monotonic() - candle_start_mono
                 if elapsed >= candle_interval:
                     current_candle_time = datetime.now()
-                    candle_number += 1
-                    steps = int(config.get('option_universe_strike_steps', 0) or 0)
-                    if steps > 0:
-                        # -------- Multi-contract candle close --------
-                        if self.current_position:
-                            option_ltp = bot_state['current_option_ltp']
-                            sl_hit = await self.check_trailing_sl_on_close(option_ltp)
-                            if sl_hit:
-                                self.last_exit_candle_time = current_candle_time
-
-                        # Compute indicators for all trackers with a ready candle
-                        eligible_ce: list[tuple[int, dict]] = []
-                        eligible_pe: list[tuple[int, dict]] = []
-
-                        for k, tracker in list(self._opt_trackers.items()):
-                            ready = float(tracker.get('high') or 0.0) > 0 and float(tracker.get('low') or float('inf')) < float('inf') and float(tracker.get('close') or 0.0) > 0
-                            if not ready:
-                                continue
-
-                            try:
-                                st_value, _ = tracker['st'].add_candle(float(tracker['high']), float(tracker['low']), float(tracker['close']))
-                            except Exception:
-                                st_value = None
-                            try:
-                                st_dir = getattr(tracker['st'], 'direction', None)
-                            except Exception:
-                                st_dir = None
-
-                            try:
-                                macd_val, _ = tracker['macd'].add_candle(float(tracker['high']), float(tracker['low']), float(tracker['close']))
-                            except Exception:
-                                macd_val = None
-                            if isinstance(macd_val, (int, float)):
-                                tracker['last_macd_value'] = float(macd_val)
-                            hist = getattr(tracker['macd'], 'last_histogram', None)
-                            if isinstance(hist, (int, float)):
-                                tracker['hist_window'].append(float(hist))
-
-                            tracker['last_st_value'] = float(st_value) if isinstance(st_value, (int, float)) else None
-                            tracker['last_st_dir'] = st_dir if st_dir in (1, -1) else None
-                            tracker['last_hist'] = float(hist) if isinstance(hist, (int, float)) else None
-
-                            # Backward-compatible UI fields (prefer center strike)
-                            center = bot_state.get('option_universe_center_strike')
-                            if center and int(tracker.get('strike') or 0) == int(center):
-                                if tracker.get('option_type') == 'CE':
-                                    bot_state['signal_ce_supertrend_value'] = float(tracker['last_st_value'] or 0.0)
-                                    bot_state['signal_ce_supertrend_signal'] = 'GREEN' if tracker['last_st_dir'] == 1 else ('RED' if tracker['last_st_dir'] == -1 else bot_state.get('signal_ce_supertrend_signal'))
-                                    bot_state['signal_ce_macd_value'] = float(tracker['last_macd_value'] or 0.0) if isinstance(tracker.get('last_macd_value'), (int, float)) else bot_state.get('signal_ce_macd_value', 0.0)
-                                    bot_state['signal_ce_macd_hist'] = float(tracker['last_hist'] or 0.0) if isinstance(tracker.get('last_hist'), (int, float)) else bot_state.get('signal_ce_macd_hist', 0.0)
-                                else:
-                                    bot_state['signal_pe_supertrend_value'] = float(tracker['last_st_value'] or 0.0)
-                                    bot_state['signal_pe_supertrend_signal'] = 'GREEN' if tracker['last_st_dir'] == 1 else ('RED' if tracker['last_st_dir'] == -1 else bot_state.get('signal_pe_supertrend_signal'))
-                                    bot_state['signal_pe_macd_value'] = float(tracker['last_macd_value'] or 0.0) if isinstance(tracker.get('last_macd_value'), (int, float)) else bot_state.get('signal_pe_macd_value', 0.0)
-                                    bot_state['signal_pe_macd_hist'] = float(tracker['last_hist'] or 0.0) if isinstance(tracker.get('last_hist'), (int, float)) else bot_state.get('signal_pe_macd_hist', 0.0)
-
-                            # Entry eligibility
-                            ok = self._entry_conditions_met(
-                                st_direction=tracker['last_st_dir'],
-                                hist_window=tracker['hist_window'],
-                            )
-                            if ok:
-                                st = int(tracker.get('strike') or 0)
-                                if tracker.get('option_type') == 'CE':
-                                    eligible_ce.append((st, tracker))
-                                else:
-                                    eligible_pe.append((st, tracker))
-
-                        # Update global "latest" fields (prefer held contract side)
-                        active_side = (self.current_position or {}).get('option_type')
-                        active_strike = (self.current_position or {}).get('strike')
-                        active_tracker = None
-                        if active_side and active_strike:
-                            active_tracker = self._opt_trackers.get(self._universe_tracker_key(int(active_strike), str(active_side)))
-                        if active_tracker:
-                            bot_state['supertrend_value'] = float(active_tracker.get('last_st_value') or 0.0)
-                            bot_state['last_supertrend_signal'] = 'GREEN' if active_tracker.get('last_st_dir') == 1 else ('RED' if active_tracker.get('last_st_dir') == -1 else bot_state.get('last_supertrend_signal'))
-                            bot_state['macd_value'] = float(active_tracker.get('last_macd_value') or 0.0) if isinstance(active_tracker.get('last_macd_value'), (int, float)) else bot_state.get('macd_value', 0.0)
-                            bot_state['macd_hist'] = float(active_tracker.get('last_hist') or 0.0) if isinstance(active_tracker.get('last_hist'), (int, float)) else bot_state.get('macd_hist', 0.0)
-
-                        # EXIT: evaluate on held contract only
-                        exit_reason = None
-                        if self.current_position and active_tracker:
-                            st_dir = active_tracker.get('last_st_dir')
-                            st_value = active_tracker.get('last_st_value')
-                            if st_dir == -1:
-                                exit_reason = 'SuperTrend Reversal'
-                            if exit_reason is None and isinstance(st_value, (int, float)):
-                                if self.trailing_sl is None:
-                                    self.trailing_sl = float(st_value)
-                                else:
-                                    self.trailing_sl = max(float(self.trailing_sl), float(st_value))
-                                current_ltp = float(bot_state.get('current_option_ltp') or 0.0)
-                                self._apply_profit_lock_and_step_trailing(current_ltp)
-                                bot_state['trailing_sl'] = self.trailing_sl
-
-                        if exit_reason is not None and self.current_position:
-                            index_cfg = get_index_config(config['selected_index'])
-                            qty = config['order_qty'] * index_cfg['lot_size']
-                            exit_price = float(bot_state.get('current_option_ltp') or 0.0)
-                            pnl = (exit_price - self.entry_price) * qty
-                            logger.info(f"[EXIT] {exit_reason} | LTP={exit_price:.2f} | P&L=₹{pnl:.2f}")
-                            await self.close_position(exit_price, pnl, exit_reason)
-                            self.last_exit_candle_time = current_candle_time
-
-                        # ENTRY: choose eligible contract nearest to current ATM
-                        if can_take_new_trade() and bot_state['daily_trades'] < config['max_trades_per_day']:
-                            index_ltp = float(bot_state.get('index_ltp') or 0.0)
-                            center = int(round_to_strike(index_ltp, index_name)) if index_ltp > 0 else int(bot_state.get('option_universe_center_strike') or 0)
-
-                            def _pick_nearest(cands: list[tuple[int, dict]]) -> tuple[int | None, dict | None]:
-                                if not cands:
-                                    return None, None
-                                cands = sorted(cands, key=lambda x: (abs(int(x[0]) - int(center)), int(x[0])))
-                                return int(cands[0][0]), cands[0][1]
-
-                            chosen_type = None
-                            chosen_strike = None
-                            chosen_tracker = None
-                            cs, ct = _pick_nearest(eligible_ce)
-                            if cs is not None and ct is not None:
-                                chosen_type = 'CE'
-                                chosen_strike = int(cs)
-                                chosen_tracker = ct
-                            else:
-                                ps, pt = _pick_nearest(eligible_pe)
-                                if ps is not None and pt is not None:
-                                    chosen_type = 'PE'
-                                    chosen_strike = int(ps)
-                                    chosen_tracker = pt
-
-                            if chosen_type and chosen_strike and chosen_tracker and chosen_tracker.get('security_id'):
-                                # If a trade is active on the opposite side, close it first.
-                                if self.current_position and (self.current_position.get('option_type') != chosen_type):
-                                    index_cfg = get_index_config(config['selected_index'])
-                                    qty = config['order_qty'] * index_cfg['lot_size']
-                                    exit_price = float(bot_state.get('current_option_ltp') or 0.0)
-                                    if exit_price > 0:
-                                        pnl = (exit_price - self.entry_price) * qty
-                                        logger.info(
-                                            f"[EXIT] Reverse Entry | Closing {self.current_position.get('option_type')} before entering {chosen_type} | "
-                                            f"LTP={exit_price:.2f} | P&L=₹{pnl:.2f}"
-                                        )
-                                        await self.close_position(exit_price, pnl, "Reverse Entry")
-
-                                if not self.current_position:
-                                    expiry = str(bot_state.get('option_universe_expiry') or bot_state.get('fixed_option_expiry') or '')
-                                    logger.info(
-                                        f"[ENTRY] {chosen_type} | {index_name} Strike {chosen_strike} (Center={center}) | Expiry={expiry} | "
-                                        f"Hist={chosen_tracker.get('last_hist')} STDir={chosen_tracker.get('last_st_dir')}"
-                                    )
-                                    await self.enter_position(
-                                        str(chosen_type),
-                                        int(chosen_strike),
-                                        float(index_ltp),
-                                        expiry_override=expiry if expiry else None,
-                                        security_id_override=str(chosen_tracker.get('security_id')),
-                                    )
-
-                                    if isinstance(chosen_tracker.get('last_st_value'), (int, float)):
-                                        self.trailing_sl = float(chosen_tracker.get('last_st_value'))
-                                        bot_state['trailing_sl'] = self.trailing_sl
-                                    self.last_trade_time = datetime.now()
-
-                        # Reset all tracker candle builders for next period
-                        for tracker in self._opt_trackers.values():
-                            tracker['open'] = 0.0
-                            tracker['high'] = 0.0
-                            tracker['low'] = float('inf')
-                            tracker['close'] = 0.0
-
-                    else:
-                        # -------- Single-contract candle close (existing behavior) --------
-                        ce_ready = self._ce_high > 0 and self._ce_low < float('inf') and self._ce_close > 0
-                        pe_ready = self._pe_high > 0 and self._pe_low < float('inf') and self._pe_close > 0
-                        if ce_ready or pe_ready:
-                            # Check trailing SL/Target on candle close (additional safety)
-                            if self.current_position:
-                                option_ltp = bot_state['current_option_ltp']
-                                sl_hit = await self.check_trailing_sl_on_close(option_ltp)
-                                if sl_hit:
-                                    self.last_exit_candle_time = current_candle_time
-
-                            # Fixed-contract option-candle signals: ST + MACD Histogram
-                            self.apply_strategy_config()
-
-                            strike = bot_state.get('fixed_option_strike')
-                            expiry = bot_state.get('fixed_option_expiry')
-                            ce_sid = bot_state.get('fixed_ce_security_id')
-                            pe_sid = bot_state.get('fixed_pe_security_id')
-
-                            # Compute CE indicators (if candle ready)
-                            ce_st_value = None
-                            ce_st_dir = None
-                            ce_hist = None
-                            if ce_ready:
-                                ce_st_value, _ = self.opt_ce_st.add_candle(self._ce_high, self._ce_low, self._ce_close)
-                                ce_st_dir = getattr(self.opt_ce_st, 'direction', None)
-                                ce_macd, _ = self.opt_ce_macd.add_candle(self._ce_high, self._ce_low, self._ce_close)
-                                if ce_macd is not None:
-                                    self._opt_ce_last_macd_value = ce_macd
-                                ce_hist = getattr(self.opt_ce_macd, 'last_histogram', None)
-
-                                if isinstance(ce_hist, (int, float)):
-                                    self._opt_ce_hist_window.append(float(ce_hist))
-
-                                # Publish per-option indicator values for UI/debug
-                                bot_state['signal_ce_supertrend_value'] = float(ce_st_value) if isinstance(ce_st_value, (int, float)) else bot_state.get('signal_ce_supertrend_value', 0.0)
-                                bot_state['signal_ce_supertrend_signal'] = 'GREEN' if ce_st_dir == 1 else ('RED' if ce_st_dir == -1 else bot_state.get('signal_ce_supertrend_signal'))
-                                bot_state['signal_ce_macd_value'] = float(ce_macd) if isinstance(ce_macd, (int, float)) else bot_state.get('signal_ce_macd_value', 0.0)
-                                bot_state['signal_ce_macd_hist'] = float(ce_hist) if isinstance(ce_hist, (int, float)) else bot_state.get('signal_ce_macd_hist', 0.0)
-
-                            # Compute PE indicators (if candle ready)
-                            pe_st_value = None
-                            pe_st_dir = None
-                            pe_hist = None
-                            if pe_ready:
-                                pe_st_value, _ = self.opt_pe_st.add_candle(self._pe_high, self._pe_low, self._pe_close)
-                                pe_st_dir = getattr(self.opt_pe_st, 'direction', None)
-                                pe_macd, _ = self.opt_pe_macd.add_candle(self._pe_high, self._pe_low, self._pe_close)
-                                if pe_macd is not None:
-                                    self._opt_pe_last_macd_value = pe_macd
-                                pe_hist = getattr(self.opt_pe_macd, 'last_histogram', None)
-
-                                if isinstance(pe_hist, (int, float)):
-                                    self._opt_pe_hist_window.append(float(pe_hist))
-
-                                bot_state['signal_pe_supertrend_value'] = float(pe_st_value) if isinstance(pe_st_value, (int, float)) else bot_state.get('signal_pe_supertrend_value', 0.0)
-                                bot_state['signal_pe_supertrend_signal'] = 'GREEN' if pe_st_dir == 1 else ('RED' if pe_st_dir == -1 else bot_state.get('signal_pe_supertrend_signal'))
-                                bot_state['signal_pe_macd_value'] = float(pe_macd) if isinstance(pe_macd, (int, float)) else bot_state.get('signal_pe_macd_value', 0.0)
-                                bot_state['signal_pe_macd_hist'] = float(pe_hist) if isinstance(pe_hist, (int, float)) else bot_state.get('signal_pe_macd_hist', 0.0)
-
-                            # Update global "latest" indicator values for UI/debug (prefer active position side)
-                            active_side = (self.current_position or {}).get('option_type')
-                            if active_side == 'PE':
-                                bot_state['supertrend_value'] = float(pe_st_value) if isinstance(pe_st_value, (int, float)) else bot_state.get('supertrend_value', 0.0)
-                                bot_state['last_supertrend_signal'] = 'GREEN' if pe_st_dir == 1 else ('RED' if pe_st_dir == -1 else bot_state.get('last_supertrend_signal'))
-                                bot_state['macd_value'] = float(self._opt_pe_last_macd_value) if isinstance(self._opt_pe_last_macd_value, (int, float)) else bot_state.get('macd_value', 0.0)
-                                bot_state['macd_hist'] = float(pe_hist) if isinstance(pe_hist, (int, float)) else bot_state.get('macd_hist', 0.0)
-                            else:
-                                bot_state['supertrend_value'] = float(ce_st_value) if isinstance(ce_st_value, (int, float)) else bot_state.get('supertrend_value', 0.0)
-                                bot_state['last_supertrend_signal'] = 'GREEN' if ce_st_dir == 1 else ('RED' if ce_st_dir == -1 else bot_state.get('last_supertrend_signal'))
-                                bot_state['macd_value'] = float(self._opt_ce_last_macd_value) if isinstance(self._opt_ce_last_macd_value, (int, float)) else bot_state.get('macd_value', 0.0)
-                                bot_state['macd_hist'] = float(ce_hist) if isinstance(ce_hist, (int, float)) else bot_state.get('macd_hist', 0.0)
-
-                            # EXIT conditions (only for the held contract)
-                            exit_reason = None
-                            if self.current_position and self.current_position.get('option_type') == 'CE':
-                                # 1) SuperTrend reverses (BUY->SELL)
-                                if ce_st_dir == -1:
-                                    exit_reason = 'SuperTrend Reversal'
-                                # Trail stop to SuperTrend value (initial + trailing)
-                                if exit_reason is None and isinstance(ce_st_value, (int, float)):
-                                    if self.trailing_sl is None:
-                                        self.trailing_sl = float(ce_st_value)
-                                    else:
-                                        self.trailing_sl = max(float(self.trailing_sl), float(ce_st_value))
-
-                                    # Apply profit lock + optional step trailing (never reduces SL)
-                                    current_ltp = float(bot_state.get('current_option_ltp') or 0.0)
-                                    self._apply_profit_lock_and_step_trailing(current_ltp)
-                                    bot_state['trailing_sl'] = self.trailing_sl
-
-                            elif self.current_position and self.current_position.get('option_type') == 'PE':
-                                if pe_st_dir == -1:
-                                    exit_reason = 'SuperTrend Reversal'
-                                if exit_reason is None and isinstance(pe_st_value, (int, float)):
-                                    if self.trailing_sl is None:
-                                        self.trailing_sl = float(pe_st_value)
-                                    else:
-                                        self.trailing_sl = max(float(self.trailing_sl), float(pe_st_value))
-
-                                    current_ltp = float(bot_state.get('current_option_ltp') or 0.0)
-                                    self._apply_profit_lock_and_step_trailing(current_ltp)
-                                    bot_state['trailing_sl'] = self.trailing_sl
-
-                            if exit_reason is not None and self.current_position:
-                                index_cfg = get_index_config(config['selected_index'])
-                                qty = config['order_qty'] * index_cfg['lot_size']
-                                exit_price = float(bot_state.get('current_option_ltp') or 0.0)
-                                pnl = (exit_price - self.entry_price) * qty
-                                logger.info(f"[EXIT] {exit_reason} | LTP={exit_price:.2f} | P&L=₹{pnl:.2f}")
-                                await self.close_position(exit_price, pnl, exit_reason)
-                                self.last_exit_candle_time = current_candle_time
-
-                            # ENTRY conditions (reverse allowed; still single-position bot)
-                            if strike and expiry:
-                                ce_ok = False
-                                pe_ok = False
-
-                                if ce_ready and ce_sid:
-                                    ce_ok = self._entry_conditions_met(
-                                        st_direction=ce_st_dir if ce_st_dir in (1, -1) else None,
-                                        hist_window=self._opt_ce_hist_window,
-                                    )
-                                if pe_ready and pe_sid:
-                                    pe_ok = self._entry_conditions_met(
-                                        st_direction=pe_st_dir if pe_st_dir in (1, -1) else None,
-                                        hist_window=self._opt_pe_hist_window,
-                                    )
-
-                                chosen = None
-                                chosen_sid = None
-                                chosen_st_value = None
-                                if ce_ok:
-                                    chosen = 'CE'
-                                    chosen_sid = str(ce_sid)
-                                    chosen_st_value = ce_st_value
-                                elif pe_ok:
-                                    chosen = 'PE'
-                                    chosen_sid = str(pe_sid)
-                                    chosen_st_value = pe_st_value
-
-                                if chosen and chosen_sid:
-                                    if can_take_new_trade() and bot_state['daily_trades'] < config['max_trades_per_day']:
-                                        index_ltp = float(bot_state.get('index_ltp') or 0.0)
-                                        # If a trade is active on the opposite side, close it first.
-                                        if self.current_position and (self.current_position.get('option_type') != chosen):
-                                            index_cfg = get_index_config(config['selected_index'])
-                                            qty = config['order_qty'] * index_cfg['lot_size']
-                                            exit_price = float(bot_state.get('current_option_ltp') or 0.0)
-                                            if exit_price > 0:
-                                                pnl = (exit_price - self.entry_price) * qty
-                                                logger.info(
-                                                    f"[EXIT] Reverse Entry | Closing {self.current_position.get('option_type')} before entering {chosen} | "
-                                                    f"LTP={exit_price:.2f} | P&L=₹{pnl:.2f}"
-                                                )
-                                                await self.close_position(exit_price, pnl, "Reverse Entry")
-
-                                        # Enter only if flat (close succeeded or we were flat already)
-                                        if not self.current_position:
-                                            logger.info(
-                                                f"[ENTRY] {chosen} | {index_name} ATM {strike} | Expiry={expiry} | "
-                                                f"CE Hist={ce_hist} STDir={ce_st_dir} | PE Hist={pe_hist} STDir={pe_st_dir}"
-                                            )
-                                            await self.enter_position(
-                                                chosen,
-                                                int(strike),
-                                                index_ltp,
-                                                expiry_override=str(expiry),
-                                                security_id_override=str(chosen_sid),
-                                            )
-
-                                            # Initial SL = SuperTrend value
-                                            if isinstance(chosen_st_value, (int, float)):
-                                                self.trailing_sl = float(chosen_st_value)
-                                                bot_state['trailing_sl'] = self.trailing_sl
-                                            self.last_trade_time = datetime.now()
-
-                        # Prevent immediate re-trade within same candle after exit
-                        can_trade = True
-                        if self.last_exit_candle_time:
-                            time_since_exit = (current_candle_time - self.last_exit_candle_time).total_seconds()
-                            if time_since_exit < candle_interval:
-                                can_trade = False
+                    await self._close_option_candle(index_name, current_candle_time)
                     
                     # Reset candle for next period
-                    candle_start_time = datetime.now()
-                    close = 0.0
+                    candle_start_mono = time.monotonic()
+                    self._state_template_dirty = True
 
                     # Reset single-contract option candle builders
-                    self._ce_open = 0.0
-                    self._ce_high = 0.0
-                    self._ce_low = float('inf')
-                    self._ce_close = 0.0
-                    self._pe_open = 0.0
-                    self._pe_high = 0.0
-                    self._pe_low = float('inf')
-                    self._pe_close = 0.0
+                    np.copyto(self._opt_ohlc, _OPT_OHLC_RESET)
+                    self._last_ce_tick = 0.0
+                    self._last_pe_tick = 0.0
+                    self._preview_key = None
                 
                 # Handle paper mode simulation
                 if self.current_position:
-                    security_id = self.current_position.get('security_id', '')
+                    security_id = self.current_position.security_id
                     
                     if security_id.startswith('SIM_'):
-                        strike = self.current_position.get('strike', 0)
-                        option_type = self.current_position.get('option_type', '')
-                        index_ltp = bot_state['index_ltp']
+                        strike = self.current_position.strike
+                        option_type = self.current_position.option_type
+                        index_ltp = bot_state.index_ltp
                         
                         if strike and index_ltp:
-                            distance_from_atm = abs(index_ltp - strike)
-                            
-                            if option_type == 'CE':
-                                intrinsic = max(0, index_ltp - strike)
-                            else:
-                                intrinsic = max(0, strike - index_ltp)
-                            
-                            atm_time_value = 150
-                            time_decay_factor = max(0, 1 - (distance_from_atm / 500))
-                            time_value = atm_time_value * time_decay_factor
-                            
-                            simulated_ltp = intrinsic + time_value
-                            tick_movement = random.choice([-0.10, -0.05, 0, 0.05, 0.10])
-                            simulated_ltp += tick_movement
-                            
-                            simulated_ltp = round(simulated_ltp / 0.05) * 0.05
-                            simulated_ltp = max(0.05, round(simulated_ltp, 2))
-                            
-                            bot_state['current_option_ltp'] = simulated_ltp
+                            simulated_ltp = _simulated_option_ltp(
+                                float(index_ltp), float(strike), option_type == 'CE', self._next_paper_tick_move()
+                            )
+                            bot_state.current_option_ltp = max(0.05, simulated_ltp)
 
                 # Live indicator preview (updates every loop using the forming candle)
                 self._update_live_indicator_preview()
@@ -1288,88 +1004,621 @@ class TradingBot:
                 # Broadcast state update
                 await self.broadcast_state()
                 
-                await asyncio.sleep(1)
+                # Poll every second, sooner if a tick is pushed in, and wake right at the candle close
+                until_close = candle_interval - (time.monotonic() - candle_start_mono)
+                await self._wait_for_tick(min(_POLL_INTERVAL_SEC, max(0.0, until_close)))
                 
             except asyncio.CancelledError:
                 break
             except Exception as e:
-                logger.error(f"[ERROR] Trading loop exception: {e}")
+                logger.error("[ERROR] Trading loop exception: %s", e)
                 await asyncio.sleep(5)
     
-    async def broadcast_state(self):
-        """Broadcast current state to WebSocket clients"""
-        from server import manager
-        
-        await manager.broadcast({
-            "type": "state_update",
-            "data": {
-                "index_ltp": bot_state['index_ltp'],
-                "supertrend_signal": bot_state['last_supertrend_signal'],
-                "supertrend_value": bot_state['supertrend_value'],
-                "macd_value": bot_state.get('macd_value', 0.0),
-                "macd_hist": bot_state.get('macd_hist', 0.0),
-                "position": bot_state['current_position'],
-                "entry_price": bot_state['entry_price'],
-                "current_option_ltp": bot_state['current_option_ltp'],
-                "trailing_sl": bot_state['trailing_sl'],
-                "daily_pnl": bot_state['daily_pnl'],
-                "daily_trades": bot_state['daily_trades'],
-                "is_running": bot_state['is_running'],
-                "mode": bot_state['mode'],
-                "selected_index": config['selected_index'],
-                "candle_interval": bot_state.get('candle_interval', 5),
-                "strategy_mode": bot_state.get('strategy_mode', config.get('strategy_mode', 'agent')),
-                "fixed_option_strike": bot_state.get('fixed_option_strike'),
-                "fixed_option_expiry": bot_state.get('fixed_option_expiry'),
-                "fixed_ce_security_id": bot_state.get('fixed_ce_security_id'),
-                "fixed_pe_security_id": bot_state.get('fixed_pe_security_id'),
-                "signal_ce_ltp": bot_state.get('signal_ce_ltp', 0.0),
-                "signal_pe_ltp": bot_state.get('signal_pe_ltp', 0.0),
-                "signal_ce_supertrend_signal": bot_state.get('signal_ce_supertrend_signal'),
-                "signal_pe_supertrend_signal": bot_state.get('signal_pe_supertrend_signal'),
-                "signal_ce_supertrend_value": bot_state.get('signal_ce_supertrend_value', 0.0),
-                "signal_pe_supertrend_value": bot_state.get('signal_pe_supertrend_value', 0.0),
-                "signal_ce_macd_value": bot_state.get('signal_ce_macd_value', 0.0),
-                "signal_pe_macd_value": bot_state.get('signal_pe_macd_value', 0.0),
-                "signal_ce_macd_hist": bot_state.get('signal_ce_macd_hist', 0.0),
-                "signal_pe_macd_hist": bot_state.get('signal_pe_macd_hist', 0.0),
-                "timestamp": datetime.now(timezone.utc).isoformat()
+    def _bind_loop_mode(self) -> None:
+        """Pick the per-mode loop steps once (on start / universe config change) instead of per tick."""
+        if int(config.get('option_universe_strike_steps', 0) or 0) > 0:
+            self._poll_option_quotes = self._poll_universe_quotes
+            self._close_option_candle = self._close_universe_candle
+        else:
+            self._poll_option_quotes = self._poll_fixed_quotes
+            self._close_option_candle = self._close_fixed_candle
+
+    async def _fetch_missing_ltps(
+        self, index_name: str, expiry: str, missing: dict[tuple[int, str], int]
+    ) -> dict[tuple[int, str], float]:
+        """Chain / quote fallback LTPs for contracts the batch quote returned no price for.
+
+        `missing` maps (strike, option_type) to the contract's security ID. Each key is throttled
+        by how its last fallback went (priced contracts refresh sooner, illiquid ones back off),
+        and all due fetches of one poll are dispatched together. Returns tick-rounded LTPs for
+        the keys that resolved to a price. While the circuit breaker is open nothing is fetched.
+        """
+        now = time.monotonic()
+        if now < self._fallback_open_until:
+            return {}
+        next_due = self._opt_fallback_due
+        due = []
+        for key, sid in missing.items():
+            if now >= next_due.get(key, -_INF):
+                # Hold the key back while the fetch is in flight
+                next_due[key] = now + _FALLBACK_THROTTLE_SEC
+                due.append((key, sid))
+        if not due:
+            return {}
+
+        results = await asyncio.gather(
+            *(
+                self.dhan.get_option_ltp(
+                    str(sid), strike=strike, option_type=ot, expiry=str(expiry), index_name=index_name
+                )
+                for (strike, ot), sid in due
+            ),
+            return_exceptions=True,
+        )
+        fetched: dict[tuple[int, str], float] = {}
+        misses = self._opt_fallback_misses
+        for (key, sid), ltp in zip(due, results):
+            if isinstance(ltp, (int, float)) and ltp > 0:
+                fetched[key] = px = round_to_tick(float(ltp))
+                self._ltp_cache[sid] = (px, now)
+                misses[key] = 0
+                next_due[key] = now + _FALLBACK_LIVE_SEC
+            else:
+                n = misses.get(key, 0) + 1
+                misses[key] = n
+                if n >= _FALLBACK_ILLIQUID_AFTER:
+                    next_due[key] = now + _FALLBACK_ILLIQUID_SEC
+
+        if fetched:
+            self._fallback_failed_rounds = 0
+        else:
+            self._fallback_failed_rounds += 1
+            if self._fallback_failed_rounds >= _FALLBACK_BREAKER_ROUNDS:
+                self._fallback_failed_rounds = 0
+                self._fallback_open_until = time.monotonic() + _FALLBACK_BREAKER_COOLDOWN_SEC
+                logger.warning(
+                    "[LTP] Option-chain fallback returned nothing %s rounds in a row; pausing fallbacks for %.0fs",
+                    _FALLBACK_BREAKER_ROUNDS, _FALLBACK_BREAKER_COOLDOWN_SEC,
+                )
+        return fetched
+
+    def _position_fallback_key(self, fallback_strike) -> tuple[int, str] | None:
+        """(strike, option_type) to fall back on for the open position, or None when not possible."""
+        if not fallback_strike:
+            return None
+        pos_type = str(self.current_position.option_type or '').upper()
+        if pos_type not in ('CE', 'PE'):
+            return None
+        return int(self.current_position.strike or fallback_strike), pos_type
+
+    def _publish_ltp(
+        self,
+        option_ltps: dict[int, float],
+        sid: int,
+        key: tuple[int, str] | None,
+        field: str,
+        missing: dict[tuple[int, str], int],
+        pending: list[tuple[tuple[int, str], str]],
+    ) -> None:
+        """Write one contract's batch LTP to bot_state.`field`, or queue it for the fallback.
+
+        A missing quote is covered by the contract's cached LTP while that is fresh, so a
+        one-poll gap in the batch does not cost a REST call. `key` is the contract's
+        (strike, option_type); None when no fallback is possible.
+        """
+        ltp = float(option_ltps.get(sid, 0.0) or 0.0)
+        now = time.monotonic()
+        if ltp > 0:
+            px = round_to_tick(ltp)
+            setattr(bot_state, field, px)
+            self._ltp_cache[sid] = (px, now)
+            return
+        cached = self._ltp_cache.get(sid)
+        if cached is not None and now - cached[1] < _LTP_CACHE_TTL_SEC:
+            setattr(bot_state, field, cached[0])
+        elif key is not None:
+            missing.setdefault(key, sid)
+            pending.append((key, field))
+
+    async def _publish_missing_ltps(
+        self,
+        index_name: str,
+        expiry: str,
+        missing: dict[tuple[int, str], int],
+        pending: list[tuple[tuple[int, str], str]],
+    ) -> None:
+        """Resolve the contracts queued by _publish_ltp in one fallback round and publish them."""
+        if not missing:
+            return
+        fetched = await self._fetch_missing_ltps(index_name, expiry, missing)
+        for key, field in pending:
+            if key in fetched:
+                setattr(bot_state, field, fetched[key])
+
+    async def _poll_universe_quotes(self, index_name: str) -> None:
+        """Multi-contract mode: refresh universe LTPs and feed each tracker's forming candle."""
+        if not self.dhan:
+            return
+        option_ltps = {}
+
+        universe_ready = await self._ensure_option_universe(index_name, float(bot_state.index_ltp))
+        if universe_ready:
+            # Universe sids are collected once per roll in _index_universe_rows
+            ids = list(self._uni_sids)
+
+            # Also include current position sid (improves LTP accuracy for exits)
+            pos_sid = _as_sid(self.current_position.security_id) if self.current_position else None
+            if pos_sid is not None:
+                ids.append(pos_sid)
+
+            if ids:
+                idx2, option_ltps = self.dhan.get_index_and_options_ltp(index_name, ids)
+                if idx2 and idx2 > 0:
+                    bot_state.index_ltp = float(idx2)
+
+            fixed_strike = bot_state.fixed_option_strike
+            fixed_expiry = bot_state.fixed_option_expiry
+            # Contracts without a batch quote, resolved together after the pass below
+            missing: dict[tuple[int, str], int] = {}
+            pending: list[tuple[tuple[int, str], str]] = []
+
+            # Keep center (ATM) CE/PE LTPs in the legacy fields for UI
+            if fixed_strike and fixed_expiry:
+                atm_contracts = (self.option_universe_contracts or {}).get(int(fixed_strike), {})
+                for ot, field in (('CE', 'signal_ce_ltp'), ('PE', 'signal_pe_ltp')):
+                    sid = atm_contracts.get(ot)
+                    if sid:
+                        self._publish_ltp(option_ltps, sid, (int(fixed_strike), ot), field, missing, pending)
+
+            # Keep current position LTP in sync (for SL/target checks)
+            if pos_sid is not None:
+                pos_key = self._position_fallback_key(fixed_strike if fixed_expiry else None)
+                self._publish_ltp(option_ltps, pos_sid, pos_key, 'current_option_ltp', missing, pending)
+
+            await self._publish_missing_ltps(index_name, fixed_expiry, missing, pending)
+
+            # Feed universe trackers with tick LTPs for candle building
+            if fixed_expiry:
+                self._feed_universe_ticks(option_ltps)
+
+    async def _poll_fixed_quotes(self, index_name: str) -> None:
+        """Single-contract mode: refresh the fixed ATM CE/PE LTPs and fold them into the option candles."""
+        if self.dhan:
+            # Ensure the fixed contract exists (strike/expiry/security IDs)
+            fixed_ready = await self._ensure_fixed_option_contract(index_name, float(bot_state.index_ltp))
+            if fixed_ready:
+                # IDs only change when the fixed contract is re-picked; parse them once per change
+                key = (bot_state.fixed_ce_security_id, bot_state.fixed_pe_security_id)
+                if key != self._fixed_ids_key:
+                    ce, pe = _as_sid(key[0]), _as_sid(key[1])
+                    self._fixed_ids = (ce, pe, [sid for sid in (ce, pe) if sid is not None])
+                    self._fixed_ids_key = key
+                ce_sid, pe_sid, ids = self._fixed_ids
+
+                if ids:
+                    idx2, option_ltps = self.dhan.get_index_and_options_ltp(index_name, ids)
+                    if idx2 and idx2 > 0:
+                        bot_state.index_ltp = float(idx2)
+
+                    fixed_strike = bot_state.fixed_option_strike
+                    fixed_expiry = bot_state.fixed_option_expiry
+                    fallback_strike = fixed_strike if (fixed_strike and fixed_expiry) else None
+                    # Contracts without a batch quote, resolved together after the pass below
+                    missing: dict[tuple[int, str], int] = {}
+                    pending: list[tuple[tuple[int, str], str]] = []
+
+                    for ot, sid, field in (('CE', ce_sid, 'signal_ce_ltp'), ('PE', pe_sid, 'signal_pe_ltp')):
+                        if sid is not None:
+                            key = (int(fallback_strike), ot) if fallback_strike else None
+                            self._publish_ltp(option_ltps, sid, key, field, missing, pending)
+
+                    # Keep current position LTP in sync (for SL/target checks)
+                    pos_sid = _as_sid(self.current_position.security_id) if self.current_position else None
+                    if pos_sid is not None:
+                        pos_key = self._position_fallback_key(fallback_strike)
+                        self._publish_ltp(option_ltps, pos_sid, pos_key, 'current_option_ltp', missing, pending)
+
+                    await self._publish_missing_ltps(index_name, fixed_expiry, missing, pending)
+
+        # Build option candles
+        ce_ltp = float(bot_state.signal_ce_ltp or 0.0)
+        pe_ltp = float(bot_state.signal_pe_ltp or 0.0)
+
+        if ce_ltp > 0 and ce_ltp != self._last_ce_tick:
+            ohlc_update_at(self._opt_ohlc, CE_O, ce_ltp)
+            self._last_ce_tick = ce_ltp
+
+        if pe_ltp > 0 and pe_ltp != self._last_pe_tick:
+            ohlc_update_at(self._opt_ohlc, PE_O, pe_ltp)
+            self._last_pe_tick = pe_ltp
+
+    async def _close_universe_candle(self, index_name: str, current_candle_time: datetime) -> None:
+        """Multi-contract candle close: indicators for every tracker, exit on the held contract, nearest-ATM entry."""
+        # -------- Multi-contract candle close --------
+        if self.current_position:
+            option_ltp = bot_state.current_option_ltp
+            sl_hit = await self.check_trailing_sl_on_close(option_ltp)
+            if sl_hit:
+                self.last_exit_candle_time = current_candle_time
+
+        # Compute indicators for all trackers with a ready candle
+        eligible_ce: list[tuple[int, OptionTracker]] = []
+        eligible_pe: list[tuple[int, OptionTracker]] = []
+
+        ohlc = self._uni_ohlc
+        # The close column is the readiness flag: it is only written from a live (> 0) tick,
+        # together with the high and low, and is zeroed by the candle reset
+        ready = np.flatnonzero(ohlc[:, 3] > 0.0)
+        results = update_st_macd_rows(self._uni_pairs, self._uni_st_states, self._uni_macd_states, ohlc, ready)
+        center = bot_state.option_universe_center_strike
+        center = int(center) if center else None
+        trackers = self._uni_trackers
+        entry_conditions_met = self._entry_conditions_met
+        for row, ((st_value, _), (macd_val, _)) in zip(ready.tolist(), results):
+            tracker = trackers[row]
+            st_dir = tracker.st.direction
+            if macd_val is not None:
+                tracker.last_macd_value = macd_val
+            hist = tracker.macd.last_histogram
+            if hist is not None:
+                _, h2, h3 = tracker.hist3
+                tracker.hist3 = (h2, h3, hist)
+
+            tracker.last_st_value = st_value
+            tracker.last_st_dir = st_dir if st_dir in (1, -1) else None
+            tracker.last_hist = hist
+
+            # Backward-compatible UI fields (prefer center strike)
+            if tracker.strike == center:
+                st_value_key, st_signal_key, macd_value_key, macd_hist_key = _SIGNAL_KEYS[tracker.option_type]
+                setattr(bot_state, st_value_key, st_value or 0.0)
+                if tracker.last_st_dir is not None:
+                    setattr(bot_state, st_signal_key, 'GREEN' if tracker.last_st_dir == 1 else 'RED')
+                if tracker.last_macd_value is not None:
+                    setattr(bot_state, macd_value_key, tracker.last_macd_value)
+                if hist is not None:
+                    setattr(bot_state, macd_hist_key, hist)
+
+            # Entry eligibility
+            h1, h2, h3 = tracker.hist3
+            ok = entry_conditions_met(st_direction=tracker.last_st_dir, h1=h1, h2=h2, h3=h3)
+            if ok:
+                st = tracker.strike
+                if tracker.option_type == 'CE':
+                    eligible_ce.append((st, tracker))
+                else:
+                    eligible_pe.append((st, tracker))
+
+        # Update global "latest" fields (prefer held contract side)
+        active_side = self.current_position.option_type if self.current_position else None
+        active_strike = self.current_position.strike if self.current_position else None
+        active_tracker = None
+        if active_side and active_strike:
+            active_tracker = self._opt_trackers.get((int(active_strike), str(active_side).upper()))
+        if active_tracker:
+            bot_state.supertrend_value = active_tracker.last_st_value or 0.0
+            bot_state.last_supertrend_signal = 'GREEN' if active_tracker.last_st_dir == 1 else ('RED' if active_tracker.last_st_dir == -1 else bot_state.last_supertrend_signal)
+            bot_state.macd_value = active_tracker.last_macd_value if active_tracker.last_macd_value is not None else bot_state.macd_value
+            bot_state.macd_hist = active_tracker.last_hist if active_tracker.last_hist is not None else bot_state.macd_hist
+
+        # EXIT: evaluate on held contract only
+        exit_reason = None
+        if self.current_position and active_tracker:
+            st_dir = active_tracker.last_st_dir
+            st_value = active_tracker.last_st_value
+            if st_dir == -1:
+                exit_reason = 'SuperTrend Reversal'
+            if exit_reason is None and st_value is not None:
+                self._raise_trailing_sl(st_value)
+                current_ltp = float(bot_state.current_option_ltp or 0.0)
+                self._apply_profit_lock_and_step_trailing(current_ltp)
+
+        if exit_reason is not None and self.current_position:
+            qty = self._qty
+            exit_price = float(bot_state.current_option_ltp or 0.0)
+            pnl = (exit_price - self.entry_price) * qty
+            logger.info("[EXIT] %s | LTP=%.2f | P&L=₹%.2f", exit_reason, exit_price, pnl)
+            await self.close_position(exit_price, pnl, exit_reason)
+            self.last_exit_candle_time = current_candle_time
+
+        # ENTRY: choose eligible contract nearest to current ATM
+        if session_gates().entry_allowed and bot_state.daily_trades < self._cfg_max_trades_per_day and self._trade_gap_ok():
+            index_ltp = float(bot_state.index_ltp or 0.0)
+            center = int(round_to_strike(index_ltp, index_name)) if index_ltp > 0 else int(bot_state.option_universe_center_strike or 0)
+
+            def _pick_nearest(cands: list[tuple[int, OptionTracker]]) -> tuple[int | None, OptionTracker | None]:
+                if not cands:
+                    return None, None
+                # Strikes are ints from the (strike, side) tracker keys; ties go to the lower strike
+                return min(cands, key=lambda x: (abs(x[0] - center), x[0]))
+
+            chosen_type = None
+            chosen_strike = None
+            chosen_tracker = None
+            cs, ct = _pick_nearest(eligible_ce)
+            if cs is not None and ct is not None:
+                chosen_type = 'CE'
+                chosen_strike = cs
+                chosen_tracker = ct
+            else:
+                ps, pt = _pick_nearest(eligible_pe)
+                if ps is not None and pt is not None:
+                    chosen_type = 'PE'
+                    chosen_strike = ps
+                    chosen_tracker = pt
+
+            if chosen_type and chosen_strike and chosen_tracker and chosen_tracker.security_id:
+                # If a trade is active on the opposite side, close it first.
+                if self.current_position and (self.current_position.option_type != chosen_type):
+                    qty = self._qty
+                    exit_price = float(bot_state.current_option_ltp or 0.0)
+                    if exit_price > 0:
+                        pnl = (exit_price - self.entry_price) * qty
+                        logger.info(
+                            "[EXIT] Reverse Entry | Closing %s before entering %s | LTP=%.2f | P&L=₹%.2f",
+                            self.current_position.option_type, chosen_type, exit_price, pnl,
+                        )
+                        await self.close_position(exit_price, pnl, "Reverse Entry")
+
+                if not self.current_position:
+                    expiry = str(bot_state.option_universe_expiry or bot_state.fixed_option_expiry or '')
+                    if logger.isEnabledFor(logging.INFO):
+                        logger.info(
+                            "[ENTRY] %s | %s Strike %s (Center=%s) | Expiry=%s | Hist=%s STDir=%s",
+                            chosen_type, index_name, chosen_strike, center, expiry,
+                            chosen_tracker.last_hist, chosen_tracker.last_st_dir,
+                        )
+                    await self.enter_position(
+                        str(chosen_type),
+                        int(chosen_strike),
+                        float(index_ltp),
+                        expiry_override=expiry if expiry else None,
+                        security_id_override=str(chosen_tracker.security_id),
+                    )
+
+                    if chosen_tracker.last_st_value is not None:
+                        self.trailing_sl = float(chosen_tracker.last_st_value)
+                        bot_state.trailing_sl = self.trailing_sl
+
+        # Reset all tracker candle builders for next period
+        self._uni_ohlc[:] = _RESET_OHLC
+
+    async def _close_fixed_candle(self, index_name: str, current_candle_time: datetime) -> None:
+        """Single-contract candle close (existing behavior): ST + MACD histogram on the fixed CE/PE."""
+        # -------- Single-contract candle close (existing behavior) --------
+        ce_candle = self._option_candle(CE_O)
+        ce_ready = ce_candle is not None
+        pe_candle = self._option_candle(PE_O)
+        pe_ready = pe_candle is not None
+        if ce_ready or pe_ready:
+            # Check trailing SL/Target on candle close (additional safety)
+            if self.current_position:
+                option_ltp = bot_state.current_option_ltp
+                sl_hit = await self.check_trailing_sl_on_close(option_ltp)
+                if sl_hit:
+                    self.last_exit_candle_time = current_candle_time
+
+            # Fixed-contract option-candle signals: ST + MACD Histogram
+            self.apply_strategy_config()
+
+            strike = bot_state.fixed_option_strike
+            expiry = bot_state.fixed_option_expiry
+            ce_sid = bot_state.fixed_ce_security_id
+            pe_sid = bot_state.fixed_pe_security_id
+
+            # Compute CE/PE indicators (if candle ready): side -> (st_value, st_dir, hist)
+            results = {
+                'CE': self._update_opt_indicators('CE', ce_candle) if ce_ready else (None, None, None),
+                'PE': self._update_opt_indicators('PE', pe_candle) if pe_ready else (None, None, None),
             }
+
+            # Update global "latest" indicator values for UI/debug (prefer active position side)
+            held_side = self.current_position.option_type if self.current_position else None
+            ui_side = 'PE' if held_side == 'PE' else 'CE'
+            st_value, st_dir, hist = results[ui_side]
+            last_macd = self._opt_pe_last_macd_value if ui_side == 'PE' else self._opt_ce_last_macd_value
+            if st_value is not None:
+                bot_state.supertrend_value = st_value
+            if st_dir in (1, -1):
+                bot_state.last_supertrend_signal = 'GREEN' if st_dir == 1 else 'RED'
+            if last_macd is not None:
+                bot_state.macd_value = last_macd
+            if hist is not None:
+                bot_state.macd_hist = hist
+
+            # EXIT conditions (only for the held contract)
+            exit_reason = None
+            if held_side in results:
+                st_value, st_dir, _ = results[held_side]
+                # 1) SuperTrend reverses (BUY->SELL)
+                if st_dir == -1:
+                    exit_reason = 'SuperTrend Reversal'
+                # Trail stop to SuperTrend value (initial + trailing)
+                elif st_value is not None:
+                    self._raise_trailing_sl(st_value)
+
+                    # Apply profit lock + optional step trailing (never reduces SL)
+                    current_ltp = float(bot_state.current_option_ltp or 0.0)
+                    self._apply_profit_lock_and_step_trailing(current_ltp)
+
+            if exit_reason is not None and self.current_position:
+                qty = self._qty
+                exit_price = float(bot_state.current_option_ltp or 0.0)
+                pnl = (exit_price - self.entry_price) * qty
+                logger.info("[EXIT] %s | LTP=%.2f | P&L=₹%.2f", exit_reason, exit_price, pnl)
+                await self.close_position(exit_price, pnl, exit_reason)
+                self.last_exit_candle_time = current_candle_time
+
+            # ENTRY conditions (reverse allowed; still single-position bot)
+            if strike and expiry:
+                # First side (CE before PE) whose ready candle meets the entry conditions
+                chosen = None
+                chosen_sid = None
+                chosen_st_value = None
+                for side, ready, sid, hist3 in (
+                    ('CE', ce_ready, ce_sid, self._opt_ce_hist3),
+                    ('PE', pe_ready, pe_sid, self._opt_pe_hist3),
+                ):
+                    if not (ready and sid):
+                        continue
+                    st_value, st_dir, _ = results[side]
+                    h1, h2, h3 = hist3
+                    if self._entry_conditions_met(
+                        st_direction=st_dir if st_dir in (1, -1) else None,
+                        h1=h1, h2=h2, h3=h3,
+                    ):
+                        chosen = side
+                        chosen_sid = str(sid)
+                        chosen_st_value = st_value
+                        break
+
+                if chosen and chosen_sid:
+                    if session_gates().entry_allowed and bot_state.daily_trades < self._cfg_max_trades_per_day and self._trade_gap_ok():
+                        index_ltp = float(bot_state.index_ltp or 0.0)
+                        # If a trade is active on the opposite side, close it first.
+                        if self.current_position and (self.current_position.option_type != chosen):
+                            qty = self._qty
+                            exit_price = float(bot_state.current_option_ltp or 0.0)
+                            if exit_price > 0:
+                                pnl = (exit_price - self.entry_price) * qty
+                                logger.info(
+                                    "[EXIT] Reverse Entry | Closing %s before entering %s | LTP=%.2f | P&L=₹%.2f",
+                                    self.current_position.option_type, chosen, exit_price, pnl,
+                                )
+                                await self.close_position(exit_price, pnl, "Reverse Entry")
+
+                        # Enter only if flat (close succeeded or we were flat already)
+                        if not self.current_position:
+                            if logger.isEnabledFor(logging.INFO):
+                                logger.info(
+                                    "[ENTRY] %s | %s ATM %s | Expiry=%s | CE Hist=%s STDir=%s | PE Hist=%s STDir=%s",
+                                    chosen, index_name, strike, expiry,
+                                    results['CE'][2], results['CE'][1], results['PE'][2], results['PE'][1],
+                                )
+                            await self.enter_position(
+                                chosen,
+                                int(strike),
+                                index_ltp,
+                                expiry_override=str(expiry),
+                                security_id_override=str(chosen_sid),
+                            )
+
+                            # Initial SL = SuperTrend value
+                            if chosen_st_value is not None:
+                                self.trailing_sl = chosen_st_value
+                                bot_state.trailing_sl = self.trailing_sl
+
+    def notify_tick(self) -> None:
+        """Wake the trading loop after bot_state LTPs were refreshed elsewhere."""
+        self._tick_event.set()
+
+    async def _wait_for_tick(self, timeout: float) -> None:
+        """Sleep up to `timeout` seconds; notify_tick() and stop() cut the wait short."""
+        try:
+            await asyncio.wait_for(self._tick_event.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self._tick_event.clear()
+
+    def _next_paper_tick_move(self) -> float:
+        if self._paper_tick_idx >= _PAPER_TICK_BATCH:
+            self._paper_tick_moves = self._rng.choice(_PAPER_TICK_MOVES, size=_PAPER_TICK_BATCH).tolist()
+            self._paper_tick_idx = 0
+        move = self._paper_tick_moves[self._paper_tick_idx]
+        self._paper_tick_idx += 1
+        return move
+
+    def _refresh_state_template(self) -> None:
+        """Refresh the slow-changing part of the WS payload (candle close / entry / exit)."""
+        self._state_template['data'].update({
+            "supertrend_signal": bot_state.last_supertrend_signal,
+            "supertrend_value": bot_state.supertrend_value,
+            "macd_value": bot_state.macd_value,
+            "macd_hist": bot_state.macd_hist,
+            "position": bot_state.current_position,
+            "entry_price": bot_state.entry_price,
+            "daily_pnl": bot_state.daily_pnl,
+            "daily_trades": bot_state.daily_trades,
+            "fixed_option_strike": bot_state.fixed_option_strike,
+            "fixed_option_expiry": bot_state.fixed_option_expiry,
+            "fixed_ce_security_id": bot_state.fixed_ce_security_id,
+            "fixed_pe_security_id": bot_state.fixed_pe_security_id,
         })
+        self._state_template_dirty = False
+
+    async def broadcast_state(self):
+        """Broadcast current state to WebSocket clients (skipped while nothing has changed)"""
+        manager = _get_ws_manager()
+        if not manager.active_connections:
+            # Nobody listening: build nothing, and send in full as soon as a client connects
+            self._last_state_tick = None
+            return
+
+        # Per-tick fields (LTPs, live indicator preview, SL, externally toggled settings)
+        tick = (
+            bot_state.index_ltp, bot_state.current_option_ltp, bot_state.trailing_sl,
+            bot_state.is_running, bot_state.mode, config['selected_index'],
+            bot_state.candle_interval, bot_state.strategy_mode,
+            bot_state.signal_ce_ltp, bot_state.signal_pe_ltp,
+            bot_state.signal_ce_supertrend_signal, bot_state.signal_pe_supertrend_signal,
+            bot_state.signal_ce_supertrend_value, bot_state.signal_pe_supertrend_value,
+            bot_state.signal_ce_macd_value, bot_state.signal_pe_macd_value,
+            bot_state.signal_ce_macd_hist, bot_state.signal_pe_macd_hist,
+        )
+        now = time.monotonic()
+        if not self._state_template_dirty and tick == self._last_state_tick and now < self._state_heartbeat_mono:
+            return
+        self._last_state_tick = tick
+        self._state_heartbeat_mono = now + _STATE_HEARTBEAT_SEC
+
+        if self._state_template_dirty:
+            self._refresh_state_template()
+
+        data = self._state_template['data']
+        data.update(zip(_STATE_TICK_FIELDS, tick))
+        if now - self._state_ts_mono >= _STATE_TS_REFRESH_SEC:
+            self._state_ts_iso = datetime.now(timezone.utc).isoformat()
+            self._state_ts_mono = now
+        data["timestamp"] = self._state_ts_iso
+
+        await manager.broadcast(self._state_template)
     
-    async def check_trailing_sl(self, current_ltp: float):
-        """Update SL values - initial fixed SL then trails profit using step-based method"""
+    def _update_trailing_sl(self, profit_points: float) -> None:
+        """Update SL values - initial fixed SL then trails profit using step-based method.
+
+        Synchronous (no IO) and takes the caller's already-computed `profit_points` so the
+        tick path doesn't pay for another coroutine frame or recompute the delta.
+        """
         if not self.current_position:
             return
 
         # In ST+MACD histogram mode, trailing SL is primarily SuperTrend-driven on candle-close.
         # However, we also support profit-lock + step trailing to progressively lock more profit.
-        if bot_state.get('strategy_mode') == 'st_macd_hist':
+        if self._st_macd_mode:
             # Fallback safety: if trailing_sl wasn't initialized for some reason, use configured initial_stoploss.
             if self.trailing_sl is None:
-                initial_sl = config.get('initial_stoploss', 0)
+                initial_sl = self._cfg_initial_sl
                 if initial_sl > 0:
                     self.trailing_sl = self.entry_price - initial_sl
-                    bot_state['trailing_sl'] = self.trailing_sl
+                    bot_state.trailing_sl = self.trailing_sl
             return
 
         # Always set initial fixed stoploss if enabled, even if trailing is disabled.
-        initial_sl = config.get('initial_stoploss', 0)
+        initial_sl = self._cfg_initial_sl
         if initial_sl > 0 and self.trailing_sl is None:
             self.trailing_sl = self.entry_price - initial_sl
-            bot_state['trailing_sl'] = self.trailing_sl
-            logger.info(f"[SL] Initial SL set: {self.trailing_sl:.2f} ({initial_sl} pts below entry)")
+            bot_state.trailing_sl = self.trailing_sl
+            logger.info("[SL] Initial SL set: %.2f (%s pts below entry)", self.trailing_sl, initial_sl)
         
         # Check if trailing is completely disabled
-        trail_start = config.get('trail_start_profit', 0)
-        trail_step = config.get('trail_step', 0)
+        trail_start = self._cfg_trail_start
+        trail_step = self._cfg_trail_step
         
         if trail_start == 0 or trail_step == 0:
             # Trailing disabled - initial SL may still be active
             return
         
-        profit_points = current_ltp - self.entry_price
-        
         # Track highest profit reached
         if profit_points > self.highest_profit:
             self.highest_profit = profit_points
@@ -1382,21 +1631,21 @@ class TradingBot:
         
         # Calculate trailing SL level: Entry + (steps × trail_step)
         # Steps = (highest_profit - trail_start) / trail_step
-        trail_levels = int((self.highest_profit - trail_start) / trail_step)
+        trail_levels = self._advance_trail_levels()
         new_sl = self.entry_price + (trail_levels * trail_step)
         
         # Always move SL up, never down (protect profit)
         if self.trailing_sl is None or new_sl > self.trailing_sl:
             old_sl = self.trailing_sl
             self.trailing_sl = new_sl
-            bot_state['trailing_sl'] = self.trailing_sl
+            bot_state.trailing_sl = self.trailing_sl
             
             if old_sl and old_sl > (self.entry_price - initial_sl):
                 # This is a trailing update (not initial trigger)
-                logger.info(f"[SL] Trailing SL updated: {old_sl:.2f} → {new_sl:.2f} (Profit: {profit_points:.2f} pts)")
+                logger.info("[SL] Trailing SL updated: %.2f → %.2f (Profit: %.2f pts)", old_sl, new_sl, profit_points)
             else:
                 # This is the first trailing activation
-                logger.info(f"[SL] Trailing started: {new_sl:.2f} (Profit: {profit_points:.2f} pts)")
+                logger.info("[SL] Trailing started: %.2f (Profit: %.2f pts)", new_sl, profit_points)
 
     def _apply_profit_lock_and_step_trailing(self, current_ltp: float) -> None:
         """Apply profit lock (trail_start_profit) and optional step trailing (trail_step).
@@ -1409,215 +1658,247 @@ class TradingBot:
                 - SL starts at entry+lock.
                 - Then SL “steps up” to the current stepped profit level (no buffer).
         """
-        if not self.current_position:
-            return
-        if self.entry_price <= 0:
-            return
-
-        try:
-            current_ltp = float(current_ltp or 0.0)
-        except Exception:
-            return
-
-        if current_ltp <= 0:
+        if not self.current_position or current_ltp <= 0:
             return
-
-        lock_points = float(config.get('trail_start_profit', 0) or 0)
-        if lock_points <= 0:
+        entry = self.entry_price
+        lock_points = self._cfg_trail_start  # float, coerced in refresh_risk_config
+        if entry <= 0 or lock_points <= 0:
             return
 
-        profit_points = current_ltp - float(self.entry_price)
+        profit_points = current_ltp - entry
         if profit_points < lock_points:
             return
 
         # Track highest profit reached (used for step-based trailing)
-        if profit_points > float(self.highest_profit or 0.0):
-            self.highest_profit = float(profit_points)
+        if profit_points > self.highest_profit:
+            self.highest_profit = profit_points
 
-        lock_sl = float(self.entry_price) + float(lock_points)
-        new_sl = lock_sl
+        # Step logic: after lock activates, raise SL to match the stepped profit level.
+        # Example: lock=10, step=5
+        # profit 10..14 => SL = entry+10
+        # profit 15..19 => SL = entry+15
+        # profit 20..24 => SL = entry+20
+        # With trail_step off the level count stays 0, leaving SL at entry+lock.
+        self._raise_trailing_sl(entry + lock_points + self._advance_trail_levels() * self._cfg_trail_step)
+
+    def _raise_trailing_sl(self, new_sl: float) -> None:
+        """Raise the SL to `new_sl`; never lowers it and skips the bot_state write when nothing moved."""
+        if self.trailing_sl is not None and new_sl <= self.trailing_sl:
+            return
+        self.trailing_sl = new_sl
+        bot_state.trailing_sl = new_sl
 
-        trail_step = float(config.get('trail_step', 0) or 0)
-        if trail_step > 0:
-            # Step logic: after lock activates, raise SL to match the stepped profit level.
-            # Example: lock=10, step=5
-            # profit 10..14 => SL = entry+10
-            # profit 15..19 => SL = entry+15
-            # profit 20..24 => SL = entry+20
-            levels = int((float(self.highest_profit) - float(lock_points)) / float(trail_step))
-            step_sl = float(self.entry_price) + float(lock_points) + (max(0, levels) * float(trail_step))
-            new_sl = max(new_sl, step_sl)
-
-        if self.trailing_sl is None:
-            self.trailing_sl = float(new_sl)
-        else:
-            self.trailing_sl = max(float(self.trailing_sl), float(new_sl))
+    def _update_opt_indicators(
+        self, side: str, candle: tuple[float, float, float]
+    ) -> tuple[float | None, int | None, float | None]:
+        """Feed a closed fixed-contract CE/PE candle to that side's ST + MACD.
 
-        bot_state['trailing_sl'] = self.trailing_sl
+        Updates the side's histogram window / last MACD, publishes the per-option UI fields and
+        returns (st_value, st_direction, macd_hist).
+        """
+        if side == 'CE':
+            st, macd = self.opt_ce_st, self.opt_ce_macd
+        else:
+            st, macd = self.opt_pe_st, self.opt_pe_macd
+        st_value_key, st_signal_key, macd_value_key, macd_hist_key = _SIGNAL_KEYS[side]
+
+        (st_value, _), (macd_value, _) = update_st_macd(st, macd, *candle)
+        st_dir = st.direction
+        if macd_value is not None:
+            if side == 'CE':
+                self._opt_ce_last_macd_value = macd_value
+            else:
+                self._opt_pe_last_macd_value = macd_value
+        hist = macd.last_histogram
+        if hist is not None:
+            if side == 'CE':
+                _, h2, h3 = self._opt_ce_hist3
+                self._opt_ce_hist3 = (h2, h3, hist)
+            else:
+                _, h2, h3 = self._opt_pe_hist3
+                self._opt_pe_hist3 = (h2, h3, hist)
+
+        # Publish per-option indicator values for UI/debug
+        if st_value is not None:
+            setattr(bot_state, st_value_key, st_value)
+        if st_dir in (1, -1):
+            setattr(bot_state, st_signal_key, 'GREEN' if st_dir == 1 else 'RED')
+        if macd_value is not None:
+            setattr(bot_state, macd_value_key, macd_value)
+        if hist is not None:
+            setattr(bot_state, macd_hist_key, hist)
+        return st_value, st_dir, hist
+
+    def _option_candle(self, base: int) -> tuple[float, float, float] | None:
+        """(high, low, close) of the forming CE/PE candle at `base`, or None if it has no ticks yet."""
+        ohlc = self._opt_ohlc
+        high, low, close = float(ohlc[base + 1]), float(ohlc[base + 2]), float(ohlc[base + 3])
+        if high > 0 and low < _INF and close > 0:
+            return high, low, close
+        return None
 
     def _update_live_indicator_preview(self) -> None:
         """Update UI-facing indicator values every loop using the *current forming* option candle.
 
-        This computes a non-mutating preview (clone + add_candle) so indicators update every second
+        This computes a non-mutating preview (kernel on copied state) so indicators update every second
         without double-counting candles or impacting trading decisions (which remain candle-close).
         """
-        if bot_state.get('strategy_mode') != 'st_macd_hist':
+        if not self._st_macd_mode:
+            return
+
+        # Same forming candles as last time: the preview fields already hold these values
+        ce_candle = self._option_candle(CE_O)
+        pe_candle = self._option_candle(PE_O)
+        key = (ce_candle, pe_candle)
+        if key == self._preview_key:
             return
+        self._preview_key = key
 
         # Ensure indicators exist
         self.apply_strategy_config()
 
-        # CE preview
-        if self._ce_high > 0 and self._ce_low < float('inf') and self._ce_close > 0:
-            try:
-                st = copy.deepcopy(self.opt_ce_st)
-                macd = copy.deepcopy(self.opt_ce_macd)
-                st_value, _ = st.add_candle(float(self._ce_high), float(self._ce_low), float(self._ce_close))
-                st_dir = getattr(st, 'direction', None)
-                macd_value, _ = macd.add_candle(float(self._ce_high), float(self._ce_low), float(self._ce_close))
-                hist = getattr(macd, 'last_histogram', None)
-
-                if isinstance(st_value, (int, float)):
-                    bot_state['signal_ce_supertrend_value'] = float(st_value)
-                if st_dir in (1, -1):
-                    bot_state['signal_ce_supertrend_signal'] = 'GREEN' if st_dir == 1 else 'RED'
-                if isinstance(macd_value, (int, float)):
-                    bot_state['signal_ce_macd_value'] = float(macd_value)
-                if isinstance(hist, (int, float)):
-                    bot_state['signal_ce_macd_hist'] = float(hist)
-            except Exception:
-                pass
-
-        # PE preview
-        if self._pe_high > 0 and self._pe_low < float('inf') and self._pe_close > 0:
-            try:
-                st = copy.deepcopy(self.opt_pe_st)
-                macd = copy.deepcopy(self.opt_pe_macd)
-                st_value, _ = st.add_candle(float(self._pe_high), float(self._pe_low), float(self._pe_close))
-                st_dir = getattr(st, 'direction', None)
-                macd_value, _ = macd.add_candle(float(self._pe_high), float(self._pe_low), float(self._pe_close))
-                hist = getattr(macd, 'last_histogram', None)
-
-                if isinstance(st_value, (int, float)):
-                    bot_state['signal_pe_supertrend_value'] = float(st_value)
-                if st_dir in (1, -1):
-                    bot_state['signal_pe_supertrend_signal'] = 'GREEN' if st_dir == 1 else 'RED'
-                if isinstance(macd_value, (int, float)):
-                    bot_state['signal_pe_macd_value'] = float(macd_value)
-                if isinstance(hist, (int, float)):
-                    bot_state['signal_pe_macd_hist'] = float(hist)
-            except Exception:
-                pass
-
+        for side, candle, st, macd in (
+            ('CE', ce_candle, self.opt_ce_st, self.opt_ce_macd),
+            ('PE', pe_candle, self.opt_pe_st, self.opt_pe_macd),
+        ):
+            if candle is None:
+                continue
+            # Exception-free: the candle is three floats and warm-up comes back as None values
+            st_value, st_dir, macd_value, hist = preview_st_macd(st, macd, *candle)
+            st_value_key, st_signal_key, macd_value_key, macd_hist_key = _SIGNAL_KEYS[side]
+            if st_value is not None:
+                setattr(bot_state, st_value_key, st_value)
+            if st_dir in (1, -1):
+                setattr(bot_state, st_signal_key, 'GREEN' if st_dir == 1 else 'RED')
+            if macd_value is not None:
+                setattr(bot_state, macd_value_key, macd_value)
+            if hist is not None:
+                setattr(bot_state, macd_hist_key, hist)
     
     async def check_trailing_sl_on_close(self, current_ltp: float) -> bool:
         """Check if trailing SL or target is hit on candle close"""
-        if not self.current_position:
+        decision = self._evaluate_exit(current_ltp, tick=False)
+        if decision is None:
             return False
-        
-        index_config = get_index_config(config['selected_index'])
-        qty = config['order_qty'] * index_config['lot_size']
-        profit_points = current_ltp - self.entry_price
-        
-        # Check target first (if enabled)
-        target_points = config.get('target_points', 0)
-        if target_points > 0 and profit_points >= target_points:
-            pnl = profit_points * qty
-            logger.info(
-                f"[EXIT] Target hit | LTP={current_ltp:.2f} | Entry={self.entry_price:.2f} | Profit={profit_points:.2f} pts | Target={target_points:.2f} pts"
-            )
-            await self.close_position(current_ltp, pnl, "Target Hit")
-            return True
-        
-        # Update trailing SL
-        # In ST+MACD histogram mode, trailing is SuperTrend-driven, but we still
-        # want profit-lock + optional step trailing (trail_start_profit + trail_step) to apply.
-        if bot_state.get('strategy_mode') == 'st_macd_hist':
-            self._apply_profit_lock_and_step_trailing(current_ltp)
-        else:
-            await self.check_trailing_sl(current_ltp)
-        
-        # Check trailing SL
-        if self.trailing_sl and current_ltp <= self.trailing_sl:
-            pnl = (current_ltp - self.entry_price) * qty
-            logger.info(f"[EXIT] Trailing SL hit | LTP={current_ltp:.2f} | SL={self.trailing_sl:.2f}")
-            await self.close_position(current_ltp, pnl, "Trailing SL Hit")
-            return True
-        
-        return False
+        await self.close_position(*decision)
+        return True
     
-    async def check_tick_sl(self, current_ltp: float) -> bool:
-        """Check SL/Target on every tick (more responsive than candle close)"""
+    async def _execute_exit(self, decision: ExitDecision) -> None:
+        """Close the position for an exit found by evaluate_tick_exit."""
+        await self.close_position(*decision)
+        if decision.reason == "Daily Max Loss":
+            bot_state.daily_max_loss_triggered = True
+
+    def evaluate_tick_exit(self, current_ltp: float) -> ExitDecision | None:
+        """Tick-level SL/Target evaluation; sync so the common no-exit tick creates no coroutine.
+
+        Updates trailing SL state and returns the exit to take (if any); the caller awaits the close.
+        """
+        return self._evaluate_exit(current_ltp, tick=True)
+
+    def _evaluate_exit(self, current_ltp: float, tick: bool) -> ExitDecision | None:
+        """Shared exit kernel for the tick and candle-close checks.
+
+        Target and trailing SL apply to both; the daily / per-trade loss limits are tick-only
+        (`tick=True`), as is the "(tick)" suffix on the exit logs.
+        """
         if not self.current_position:
-            return False
+            return None
         
-        index_config = get_index_config(config['selected_index'])
-        qty = config['order_qty'] * index_config['lot_size']
+        qty = self._qty
         profit_points = current_ltp - self.entry_price
-        pnl = profit_points * qty
-        
-        # Check DAILY max loss FIRST (highest priority)
-        daily_max_loss = config.get('daily_max_loss', 0)
-        if daily_max_loss > 0 and bot_state['daily_pnl'] + pnl < -daily_max_loss:
-            logger.warning(
-                f"[EXIT] ✗ Daily max loss BREACHED! | Current Daily P&L=₹{bot_state['daily_pnl']:.2f} | This trade P&L=₹{pnl:.2f} | Limit=₹{-daily_max_loss:.2f} | FORCE SQUAREOFF"
-            )
-            await self.close_position(current_ltp, pnl, "Daily Max Loss")
-            bot_state['daily_max_loss_triggered'] = True
-            return True
-        
-        # Check max loss per trade (if enabled)
-        max_loss_per_trade = config.get('max_loss_per_trade', 0)
-        if max_loss_per_trade > 0 and pnl < -max_loss_per_trade:
-            logger.info(
-                f"[EXIT] Max loss per trade hit | LTP={current_ltp:.2f} | Entry={self.entry_price:.2f} | Loss=₹{abs(pnl):.2f} | Limit=₹{max_loss_per_trade:.2f}"
-            )
-            await self.close_position(current_ltp, pnl, "Max Loss Per Trade")
-            return True
-        
-        # Check target (if enabled)
-        target_points = config.get('target_points', 0)
-        if target_points > 0 and profit_points >= target_points:
-            logger.info(
-                f"[EXIT] Target hit (tick) | LTP={current_ltp:.2f} | Entry={self.entry_price:.2f} | Profit={profit_points:.2f} pts | Target={target_points:.2f} pts"
-            )
-            await self.close_position(current_ltp, pnl, "Target Hit")
-            return True
-        
-        # Update trailing SL values
-        if bot_state.get('strategy_mode') == 'st_macd_hist':
-            self._apply_profit_lock_and_step_trailing(current_ltp)
-        else:
-            await self.check_trailing_sl(current_ltp)
+        src = " (tick)" if tick else ""
+
+        # Loss limits / target can only fire outside the precomputed (floor, target) LTP band
+        if not (self._ltp_exit_floor < current_ltp < self._ltp_target):
+            pnl = profit_points * qty
+            if tick:
+                # Check DAILY max loss FIRST (highest priority)
+                daily_max_loss = self._cfg_daily_max_loss
+                if daily_max_loss > 0 and bot_state.daily_pnl + pnl < -daily_max_loss:
+                    logger.warning(
+                        "[EXIT] ✗ Daily max loss BREACHED! | Current Daily P&L=₹%.2f | This trade P&L=₹%.2f | Limit=₹%.2f | FORCE SQUAREOFF",
+                        bot_state.daily_pnl, pnl, -daily_max_loss,
+                    )
+                    return ExitDecision(current_ltp, pnl, "Daily Max Loss")
+
+                # Check max loss per trade (if enabled)
+                max_loss_per_trade = self._cfg_max_loss_per_trade
+                if max_loss_per_trade > 0 and pnl < -max_loss_per_trade:
+                    logger.info(
+                        "[EXIT] Max loss per trade hit | LTP=%.2f | Entry=%.2f | Loss=₹%.2f | Limit=₹%.2f",
+                        current_ltp, self.entry_price, abs(pnl), max_loss_per_trade,
+                    )
+                    return ExitDecision(current_ltp, pnl, "Max Loss Per Trade")
+
+            # Check target (if enabled)
+            target_points = self._cfg_target_points
+            if target_points > 0 and profit_points >= target_points:
+                logger.info(
+                    "[EXIT] Target hit%s | LTP=%.2f | Entry=%.2f | Profit=%.2f pts | Target=%.2f pts",
+                    src, current_ltp, self.entry_price, profit_points, target_points,
+                )
+                return ExitDecision(current_ltp, pnl, "Target Hit")
+
+        # Update trailing SL values. Both trailing schemes only ever ratchet up with a new LTP
+        # high, so flat / down ticks skip straight to the hit check.
+        if current_ltp > self._trail_peak_ltp or self.trailing_sl is None:
+            self._trail_peak_ltp = current_ltp
+            # In ST+MACD histogram mode, trailing is SuperTrend-driven, but we still
+            # want profit-lock + optional step trailing (trail_start_profit + trail_step) to apply.
+            if self._st_macd_mode:
+                self._apply_profit_lock_and_step_trailing(current_ltp)
+            else:
+                self._update_trailing_sl(profit_points)
         
         # Check if trailing SL is breached
         if self.trailing_sl and current_ltp <= self.trailing_sl:
             pnl = (current_ltp - self.entry_price) * qty
-            logger.info(f"[EXIT] Trailing SL hit (tick) | LTP={current_ltp:.2f} | SL={self.trailing_sl:.2f}")
-            await self.close_position(current_ltp, pnl, "Trailing SL Hit")
-            return True
+            logger.info("[EXIT] Trailing SL hit%s | LTP=%.2f | SL=%.2f", src, current_ltp, self.trailing_sl)
+            return ExitDecision(current_ltp, pnl, "Trailing SL Hit")
         
-        return False
+        return None
     
+    async def _fetch_entry_price(self, index_name: str, security_id: str, strike: int, option_type: str, expiry: str) -> float:
+        """Tick-rounded option LTP for the entry record, or 0 if unavailable."""
+        if not (self.dhan and security_id):
+            return 0
+        try:
+            option_ltp = await self.dhan.get_option_ltp(
+                security_id=security_id,
+                strike=strike,
+                option_type=option_type,
+                expiry=expiry,
+                index_name=index_name
+            )
+            if option_ltp > 0:
+                return round_to_tick(option_ltp)
+        except Exception as e:
+            logger.error("[ERROR] Failed to get entry price: %s", e)
+        return 0
+
     async def enter_position(self, option_type: str, strike: int, index_ltp: float, *, expiry_override: str | None = None, security_id_override: str | None = None):
         """Enter a new position with market validation"""
-        # Entry window protection (09:25–15:10 IST, weekday only)
+        # Entry window protection (utils.ENTRY_START–ENTRY_CUTOFF IST, weekday only)
         if not self.is_within_trading_hours():
-            logger.warning(f"[ENTRY] ✗ BLOCKED - Outside entry window (09:25–15:10 IST) | Cannot enter {option_type} position")
+            logger.warning(
+                "[ENTRY] ✗ BLOCKED - Outside entry window (%s–%s IST) | Cannot enter %s position",
+                ENTRY_START.strftime('%H:%M'), ENTRY_CUTOFF.strftime('%H:%M'), option_type,
+            )
             return
         
         index_name = config['selected_index']
         index_config = get_index_config(index_name)
         
         # Calculate position size based on risk (if enabled)
-        risk_per_trade = config.get('risk_per_trade', 0)
-        if risk_per_trade > 0 and config.get('initial_stoploss', 0) > 0:
+        risk_per_trade = self._cfg_risk_per_trade
+        sl_points = self._cfg_initial_sl
+        if risk_per_trade > 0 and sl_points > 0:
             # Position size = Risk Amount / (SL points * lot size * point value)
             # For options: 1 point = 1 rupee per lot
-            sl_points = config['initial_stoploss']
             max_qty = int(risk_per_trade / (sl_points * index_config['lot_size']))
             qty = max(1, min(max_qty, config['order_qty']))  # Between 1 and order_qty
-            logger.info(f"[POSITION] Size adjusted for risk: {qty} lots (Risk: ₹{risk_per_trade}, SL: {sl_points}pts)")
+            logger.info("[POSITION] Size adjusted for risk: %s lots (Risk: ₹%s, SL: %spts)", qty, risk_per_trade, sl_points)
         else:
             qty = config['order_qty'] * index_config['lot_size']
         
@@ -1634,42 +1915,25 @@ class TradingBot:
             expiry_date = ist + timedelta(days=days_until_expiry)
             expiry = expiry_date.strftime("%Y-%m-%d")
         
-        entry_price = 0
         security_id = ""
-        
-        # Get real entry price
         if self.dhan:
             try:
                 security_id = str(security_id_override) if security_id_override else await self.dhan.get_atm_option_security_id(index_name, strike, option_type, expiry)
-                
-                if security_id:
-                    option_ltp = await self.dhan.get_option_ltp(
-                        security_id=security_id,
-                        strike=strike,
-                        option_type=option_type,
-                        expiry=expiry,
-                        index_name=index_name
-                    )
-                    if option_ltp > 0:
-                        entry_price = round(option_ltp / 0.05) * 0.05
-                        entry_price = round(entry_price, 2)
             except Exception as e:
-                logger.error("[ERROR] Failed to get entry price: %s", e)
+                logger.error("[ERROR] Failed to get security ID: %s", e)
         
         # Paper mode
-        if bot_state['mode'] == 'paper':
+        if bot_state.mode == 'paper':
+            entry_price = await self._fetch_entry_price(index_name, security_id, strike, option_type, expiry)
             if not security_id:
-                security_id = f"SIM_{index_name}_{strike}_{option_type}"
+                security_id = _sim_security_id(index_name, int(strike), option_type)
             
             if entry_price <= 0:
-                distance = abs(index_ltp - strike)
-                intrinsic = max(0, index_ltp - strike) if option_type == 'CE' else max(0, strike - index_ltp)
-                time_value = 150 * max(0, 1 - (distance / 500))
-                entry_price = round((intrinsic + time_value) / 0.05) * 0.05
-                entry_price = round(entry_price, 2)
+                entry_price = _simulated_option_ltp(float(index_ltp), float(strike), option_type == 'CE', 0.0)
             
             logger.info(
-                f"[ENTRY] PAPER | {index_name} {option_type} {strike} | Expiry: {expiry} | Price: {entry_price} | Qty: {qty}"
+                "[ENTRY] PAPER | %s %s %s | Expiry: %s | Price: %s | Qty: %s",
+                index_name, option_type, strike, expiry, entry_price, qty,
             )
         
         # Live mode
@@ -1679,56 +1943,60 @@ class TradingBot:
                 return
             
             if not security_id:
-                logger.error(f"[ERROR] Could not find security ID for {index_name} {strike} {option_type}")
+                logger.error("[ERROR] Could not find security ID for %s %s %s", index_name, strike, option_type)
                 return
             
+            # Send the order before the reference quote: the LTP only feeds the
+            # recorded entry price, so it should not delay the fill.
             result = await self.dhan.place_order(security_id, "BUY", qty)
-            logger.info(f"[ORDER] Entry order result: {result}")
+            logger.info("[ORDER] Entry order result: %s", result)
             
             # Check if order was successfully placed
             if result.get('status') != 'success' or not result.get('orderId'):
-                logger.error(f"[ERROR] Failed to place entry order: {result}")
+                logger.error("[ERROR] Failed to place entry order: %s", result)
                 return
             
             # Order placed successfully - save to DB immediately
             order_id = result.get('orderId')
+            entry_price = await self._fetch_entry_price(index_name, security_id, strike, option_type, expiry)
             
             logger.info(
-                f"[ENTRY] LIVE | {index_name} {option_type} {strike} | Expiry: {expiry} | OrderID: {order_id} | Fill Price: {entry_price} | Qty: {qty}"
+                "[ENTRY] LIVE | %s %s %s | Expiry: %s | OrderID: %s | Fill Price: %s | Qty: %s",
+                index_name, option_type, strike, expiry, order_id, entry_price, qty,
             )
         
+        now_iso = datetime.now(timezone.utc).isoformat()
+
         # Save position
-        self.current_position = {
-            'trade_id': trade_id,
-            'option_type': option_type,
-            'strike': strike,
-            'expiry': expiry,
-            'security_id': security_id,
-            'index_name': index_name,
-            'entry_time': datetime.now(timezone.utc).isoformat()
-        }
+        self.current_position = Position(
+            trade_id=trade_id,
+            option_type=option_type,
+            strike=strike,
+            expiry=expiry,
+            security_id=security_id,
+            index_name=index_name,
+            entry_time=now_iso,
+        )
+        # Only a filled entry starts the min_trade_gap window (blocked/failed attempts may retry)
+        self._last_trade_mono = time.monotonic()
         self.entry_price = entry_price
         self.trailing_sl = None
         self.highest_profit = 0
+        self._sync_trail_levels()
+        self._qty = config['order_qty'] * index_config['lot_size']
+        self._refresh_exit_thresholds()
         
-        bot_state['current_position'] = self.current_position
-        bot_state['entry_price'] = self.entry_price
-        bot_state['daily_trades'] += 1
-        bot_state['current_option_ltp'] = entry_price
-
-        # Save to database in background - don't wait for DB commit
-        asyncio.create_task(save_trade({
-            'trade_id': trade_id,
-            'entry_time': datetime.now(timezone.utc).isoformat(),
-            'option_type': option_type,
-            'strike': strike,
-            'expiry': expiry,
-            'entry_price': self.entry_price,
-            'qty': qty,
-            'mode': bot_state['mode'],
-            'index_name': index_name,
-            'created_at': datetime.now(timezone.utc).isoformat()
-        }))
+        bot_state.current_position = asdict(self.current_position)
+        bot_state.entry_price = self.entry_price
+        bot_state.daily_trades += 1
+        bot_state.current_option_ltp = entry_price
+        self._state_template_dirty = True
+
+        # Queue the DB insert for the background writer (waits only if the queue is full)
+        await queue_trade(
+            trade_id, now_iso, option_type, strike, expiry,
+            self.entry_price, qty, bot_state.mode, index_name, now_iso,
+        )
 
 
 # Global bot instance
@@ -1,80 +1,98 @@
 # Utility functions
-from datetime import datetime, timezone, timedelta
+import time
+from datetime import date, datetime, timezone, timedelta, time as dt_time
+from functools import lru_cache
+from typing import NamedTuple
+
+# Session boundaries all fall on whole IST minutes, and IST is a whole number
+# of minutes from UTC, so epoch-aligned 30s buckets never straddle one.
+SESSION_BUCKET_SECONDS = 30
+
+# IST has no DST, so a fixed offset is exact
+IST = timezone(timedelta(hours=5, minutes=30))
+
+# Session boundaries (IST wall clock); the entry window is public so trading_bot shares it
+_MARKET_OPEN = dt_time(9, 15)
+_MARKET_CLOSE = dt_time(15, 30)
+ENTRY_START = dt_time(9, 25)
+ENTRY_CUTOFF = dt_time(15, 10)
+_SQUAREOFF = dt_time(15, 25)
 
 def get_ist_time():
     """Get current IST time"""
-    utc_now = datetime.now(timezone.utc)
-    ist = utc_now + timedelta(hours=5, minutes=30)
-    return ist
-
-def is_market_open():
-    """Check if market is open (9:15 AM - 3:30 PM IST, Monday-Friday)"""
-    ist = get_ist_time()
+    return datetime.now(IST)
 
+def _session_day(ist: datetime) -> bool:
+    """Weekday (Monday=0 to Friday=4), or a weekend with the special-session override on"""
+    if ist.weekday() < 5:
+        return True
     # Optional override for special sessions (e.g., weekend trading days)
     try:
         from config import config
-        allow_weekend = bool(config.get('allow_weekend_trading', False))
+        return bool(config.get('allow_weekend_trading', False))
     except Exception:
-        allow_weekend = False
-    
-    # Check if it's a weekday (Monday=0 to Friday=4, Saturday=5, Sunday=6)
-    if ist.weekday() >= 5 and not allow_weekend:  # Saturday or Sunday
         return False
-    
-    market_open = ist.replace(hour=9, minute=15, second=0, microsecond=0)
-    market_close = ist.replace(hour=15, minute=30, second=0, microsecond=0)
-    return market_open <= ist <= market_close
+
+def is_market_open():
+    """Check if market is open (9:15 AM - 3:30 PM IST, Monday-Friday)"""
+    ist = get_ist_time()
+    return _session_day(ist) and _MARKET_OPEN <= ist.time() <= _MARKET_CLOSE
 
 def can_take_new_trade():
     """Check if new trades are allowed (09:25 AM - 3:10 PM IST, weekday only)"""
     ist = get_ist_time()
-
-    # Optional override for special sessions (e.g., weekend trading days)
-    try:
-        from config import config
-        allow_weekend = bool(config.get('allow_weekend_trading', False))
-    except Exception:
-        allow_weekend = False
-    
-    # Check if it's a weekday
-    if ist.weekday() >= 5 and not allow_weekend:  # Saturday or Sunday
-        return False
-    
-    start_time = ist.replace(hour=9, minute=25, second=0, microsecond=0)
-    cutoff_time = ist.replace(hour=15, minute=10, second=0, microsecond=0)
-    return start_time <= ist <= cutoff_time
+    return _session_day(ist) and ENTRY_START <= ist.time() <= ENTRY_CUTOFF
 
 def should_force_squareoff():
     """Check if it's time to force square off (3:25 PM IST, weekday only)"""
     ist = get_ist_time()
+    return _session_day(ist) and ist.time() >= _SQUAREOFF
 
-    # Optional override for special sessions (e.g., weekend trading days)
-    try:
-        from config import config
-        allow_weekend = bool(config.get('allow_weekend_trading', False))
-    except Exception:
-        allow_weekend = False
-    
-    # Check if it's a weekday
-    if ist.weekday() >= 5 and not allow_weekend:  # Saturday or Sunday
-        return False
-    
-    squareoff_time = ist.replace(hour=15, minute=25, second=0, microsecond=0)
-    return ist >= squareoff_time
+class SessionGates(NamedTuple):
+    market_open: bool
+    entry_allowed: bool
+    force_squareoff: bool
+
+
+@lru_cache(maxsize=2)
+def _session_gates(bucket: int) -> SessionGates:
+    return SessionGates(is_market_open(), can_take_new_trade(), should_force_squareoff())
+
+
+def session_gates() -> SessionGates:
+    """Market / entry-window / square-off flags, evaluated once per time bucket"""
+    return _session_gates(int(time.time() // SESSION_BUCKET_SECONDS))
+
+def seconds_until_ist(hour: int, minute: int, grace: int = 60) -> float:
+    """Seconds until the next IST hour:minute (0 for `grace` seconds after it passes)"""
+    ist = get_ist_time()
+    target = ist.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if ist >= target + timedelta(seconds=grace):
+        target += timedelta(days=1)
+    return max(0.0, (target - ist).total_seconds())
+
+@lru_cache(maxsize=32)
+def _expiry_for(today: date, expiry_day: int, after_close: bool) -> str:
+    days_until_expiry = (expiry_day - today.weekday()) % 7
+    # Expiry day rolls to next week once the market has closed (any time from 15:30 on)
+    if days_until_expiry == 0 and after_close:
+        days_until_expiry = 7
+    return (today + timedelta(days=days_until_expiry)).isoformat()
 
 def get_expiry_date(expiry_day: int) -> str:
-    """Calculate next expiry date based on expiry day of week"""
+    """Calculate next expiry date based on expiry day of week (computed once per day and side of the close)"""
     ist = get_ist_time()
-    days_until_expiry = (expiry_day - ist.weekday()) % 7
-    if days_until_expiry == 0:
-        if ist.hour >= 15 and ist.minute >= 30:
-            days_until_expiry = 7
-    expiry_date = ist + timedelta(days=days_until_expiry)
-    return expiry_date.strftime("%Y-%m-%d")
+    return _expiry_for(ist.date(), expiry_day, ist.time() >= _MARKET_CLOSE)
 
-def format_timeframe(seconds: int) -> str:
-    """Format timeframe seconds to human readable string"""
+def round_to_tick(px: float) -> float:
+    """Snap a (non-negative) price to the 0.05 tick grid with integer tick math.
+
+    Dividing the tick count by 20 gives the correctly rounded 2-decimal float,
+    so no follow-up round(x, 2) is needed.
+    """
+    return int(px * 20.0 + 0.5) / 20.0
+
+def _format_timeframe(seconds: int) -> str:
     if seconds < 60:
         return f"{seconds}s"
     elif seconds < 3600:
@@ -83,3 +101,11 @@ def format_timeframe(seconds: int) -> str:
     else:
         hours = seconds // 3600
         return f"{hours}h"
+
+# Labels for the timeframes the bot actually runs on (config.VALID_TIMEFRAMES plus common extras)
+_TF_LABELS = {s: _format_timeframe(s) for s in (5, 15, 30, 60, 180, 300, 900, 1800, 3600, 14400)}
+
+def format_timeframe(seconds: int) -> str:
+    """Format timeframe seconds to human readable string"""
+    label = _TF_LABELS.get(seconds)
+    return label if label is not None else _format_timeframe(seconds)
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# Repo layout: Docker/runtime executes from backend/ where modules are flat.
+# For local unittest/pytest runs from repo root, add backend/ to sys.path once.
+_BACKEND = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "backend"))
+if _BACKEND not in sys.path:
+    sys.path.insert(0, _BACKEND)
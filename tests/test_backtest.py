@@ -0,0 +1,24 @@
+import unittest
+
+from backtest import _equity_max_drawdown, run_backtest
+
+
+class TestBacktest(unittest.TestCase):
+    def test_max_drawdown(self):
+        self.assertEqual(_equity_max_drawdown([]), 0.0)
+        self.assertEqual(_equity_max_drawdown([0.0, 1.0, 2.0]), 0.0)
+        self.assertAlmostEqual(_equity_max_drawdown([0.0, 5.0, 2.0, 6.0, -1.0, 3.0]), 7.0)
+
+    def test_metrics_without_trades(self):
+        candles = [
+            {"timestamp": f"2026-01-30T04:{i:02d}:00Z", "open": 100.0, "high": 100.5, "low": 99.5, "close": 100.0}
+            for i in range(10)
+        ]
+        result = run_backtest(candles, strategy_mode="supertrend")
+        self.assertEqual(result["metrics"]["total_trades"], 0)
+        self.assertEqual(result["metrics"]["total_pnl_points"], 0.0)
+        self.assertEqual(result["metrics"]["max_drawdown"], 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
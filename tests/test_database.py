@@ -0,0 +1,48 @@
+import unittest
+
+import asyncio
+import os
+import tempfile
+from unittest import mock
+
+import database
+
+
+class TestTradeWriter(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        patches = [
+            mock.patch.object(database, "DB_PATH", os.path.join(self._tmp.name, "trades.db")),
+            # A tiny queue so most writes hit the full-queue path
+            mock.patch.object(database, "_TRADE_QUEUE_MAXSIZE", 2),
+            mock.patch.object(database, "_trade_queue", None),
+            mock.patch.object(database, "_trade_writer_task", None),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+        self.addCleanup(self._tmp.cleanup)
+
+    def test_exits_land_after_their_inserts(self):
+        async def run():
+            await database.init_db()
+            for i in range(20):
+                await database.queue_trade(
+                    f"T{i}", "2026-01-30T04:00:00+00:00", "CE", 22500, "2026-02-05",
+                    100.0, 75, "paper", "NIFTY", "2026-01-30T04:00:00+00:00",
+                )
+                await database.queue_trade_exit(f"T{i}", "2026-01-30T04:05:00+00:00", 110.0, 750.0, "Target")
+            await database.flush_trade_writes()
+            return await database.get_trades()
+
+        trades = asyncio.run(run())
+        self.assertEqual(len(trades), 20)
+        for trade in trades:
+            self.assertEqual(trade["exit_reason"], "Target")
+            self.assertEqual(trade["exit_price"], 110.0)
+            self.assertEqual(trade["pnl"], 750.0)
+            self.assertEqual(trade["exit_time"], "2026-01-30T04:05:00+00:00")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+import unittest
+
+import copy
+import random
+
+import numpy as np
+
+from indicators import (
+    ADX,
+    MACD,
+    SuperTrend,
+    preview_st_macd,
+    stack_st_macd_states,
+    update_st_macd,
+    update_st_macd_adx,
+    update_st_macd_rows,
+)
+
+
+def _random_candles(n, seed=7):
+    rng = random.Random(seed)
+    price = 100.0
+    out = []
+    for _ in range(n):
+        prev = price
+        price += rng.gauss(0, 1)
+        out.append((max(prev, price) + 0.5, min(prev, price) - 0.5, price))
+    return out
+
+
+class TestIndicators(unittest.TestCase):
+    def test_macd_warmup(self):
+        macd = MACD(fast=12, slow=26, signal=9)
+        candles = _random_candles(40)
+        for i, (h, l, c) in enumerate(candles, start=1):
+            value, _ = macd.add_candle(h, l, c)
+            if i < 26 + 9:
+                self.assertIsNone(value)
+                self.assertIsNone(macd.last_histogram)
+            else:
+                self.assertIsNotNone(value)
+                self.assertAlmostEqual(macd.last_histogram, value - macd.last_signal_line)
+
+    def test_fused_update_matches_individual_calls(self):
+        st_a, macd_a, adx_a = SuperTrend(7, 4), MACD(), ADX()
+        st_b, macd_b, adx_b = SuperTrend(7, 4), MACD(), ADX()
+        for h, l, c in _random_candles(120):
+            fused = update_st_macd_adx(st_a, macd_a, adx_a, h, l, c)
+            single = (st_b.add_candle(h, l, c), macd_b.add_candle(h, l, c), adx_b.add_candle(h, l, c))
+            self.assertEqual(fused, single)
+            self.assertEqual(st_a.direction, st_b.direction)
+            self.assertEqual(macd_a.last_histogram, macd_b.last_histogram)
+
+    def test_fused_st_macd_matches_individual_calls(self):
+        st_a, macd_a = SuperTrend(7, 4), MACD()
+        st_b, macd_b = SuperTrend(7, 4), MACD()
+        for h, l, c in _random_candles(120):
+            fused = update_st_macd(st_a, macd_a, h, l, c)
+            self.assertEqual(fused, (st_b.add_candle(h, l, c), macd_b.add_candle(h, l, c)))
+            self.assertEqual(st_a.direction, st_b.direction)
+            self.assertEqual(macd_a.last_histogram, macd_b.last_histogram)
+
+    def test_preview_matches_cloned_update_without_mutating(self):
+        st, macd = SuperTrend(7, 4), MACD()
+        for h, l, c in _random_candles(60):
+            st_clone, macd_clone = copy.deepcopy(st), copy.deepcopy(macd)
+            (st_value, _), (macd_value, _) = update_st_macd(st_clone, macd_clone, h, l, c)
+            expected = (st_value, st_clone.direction, macd_value, macd_clone.last_histogram)
+            state_before = (st._state.copy(), macd._state.copy())
+
+            self.assertEqual(preview_st_macd(st, macd, h, l, c), expected)
+            self.assertTrue((st._state == state_before[0]).all())
+            self.assertTrue((macd._state == state_before[1]).all())
+            update_st_macd(st, macd, h, l, c)
+
+    def test_deepcopy_detaches_stacked_state(self):
+        pairs = [(SuperTrend(7, 4), MACD())]
+        st_states, _ = stack_st_macd_states(pairs)
+        st = pairs[0][0]
+        clone = copy.deepcopy(st)
+        for h, l, c in _random_candles(20):
+            clone.add_candle(h, l, c)
+        self.assertFalse(np.shares_memory(clone._state, st_states))
+        self.assertTrue((st_states[0] == SuperTrend(7, 4)._state).all())
+
+    def test_batched_rows_match_per_pair_updates(self):
+        series = [_random_candles(80, seed=s) for s in (1, 2, 3)]
+        pairs = [(SuperTrend(7, 4), MACD()) for _ in series]
+        refs = [(SuperTrend(7, 4), MACD()) for _ in series]
+        # Warm one pair up before stacking; its state must carry over into the row
+        for h, l, c in series[0][:10]:
+            update_st_macd(*pairs[0], h, l, c)
+            update_st_macd(*refs[0], h, l, c)
+        st_states, macd_states = stack_st_macd_states(pairs)
+
+        for i in range(10, 80):
+            ohlc = np.array([(0.0, *candles[i]) for candles in series])
+            # Row 1 skips every other candle, as a contract without a ready candle would
+            rows = [0, 2] if i % 2 else [0, 1, 2]
+            results = update_st_macd_rows(pairs, st_states, macd_states, ohlc, rows)
+            expected = [update_st_macd(*refs[r], *series[r][i]) for r in rows]
+            self.assertEqual(results, expected)
+        for (st, macd), (st_ref, macd_ref) in zip(pairs, refs):
+            self.assertEqual(st.direction, st_ref.direction)
+            self.assertEqual(macd.last_histogram, macd_ref.last_histogram)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,24 @@
+import unittest
+
+from datetime import date
+
+from utils import _expiry_for
+
+
+class TestExpiryRollover(unittest.TestCase):
+    def test_expiry_day_rolls_after_close(self):
+        thursday = date(2026, 10, 15)
+        self.assertEqual(thursday.weekday(), 3)
+        # Before the close the contract expiring today is still current
+        self.assertEqual(_expiry_for(thursday, 3, False), "2026-10-15")
+        # From 15:30 on it has expired, so the next week's expiry is used
+        self.assertEqual(_expiry_for(thursday, 3, True), "2026-10-22")
+
+    def test_after_close_only_matters_on_expiry_day(self):
+        tuesday = date(2026, 10, 13)
+        self.assertEqual(_expiry_for(tuesday, 3, False), "2026-10-15")
+        self.assertEqual(_expiry_for(tuesday, 3, True), "2026-10-15")
+
+
+if __name__ == "__main__":
+    unittest.main()